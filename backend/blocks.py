@@ -0,0 +1,306 @@
+"""
+blocks.py
+=========
+Split Markdown source into independently renderable top-level blocks.
+
+Each block is a run of source lines that markdown2 renders the same way on
+its own as it does inside the full document: fenced code, ``$$`` display
+math, ATX headings, lists (including their indented continuation lines),
+pipe tables, indented code, raw HTML and ordinary paragraphs.  Blank lines
+between blocks are not part of any block.
+
+Raw HTML blocks start as in CommonMark (start conditions 1–7).  Types 1–5
+(``<script>``/``<pre>``/``<style>``/``<textarea>``, comments, processing
+instructions, declarations, CDATA) run to their end marker; types 6 and 7
+run to a blank line, except that an opening block-level tag such as
+``<div>`` or ``<details>`` first runs to its matching closing tag, since
+markdown2 keeps such an element whole across blank lines.
+
+The splitter is a single forward scan over the lines, so it is cheap enough
+to run on every keystroke even when only a handful of blocks changed.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+from backend.render_cache import content_digest
+
+_FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_HEADING_RE = re.compile(r"^ {0,3}#{1,6}(?:\s|$)")
+_LIST_RE = re.compile(r"^ {0,3}(?:[-*+]|\d{1,9}[.)])(?:\s|$)")
+_TABLE_SEPARATOR_RE = re.compile(r"^\s*\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?\s*$")
+_REF_DEF_RE = re.compile(r"^ {0,3}\[[^\]]+\]:\s*\S")
+
+# Kinds whose text is not Markdown: no link definitions or references inside.
+VERBATIM_KINDS = frozenset({"code", "math", "html"})
+
+# CommonMark HTML block start conditions 1-5, each with its end marker.
+_HTML_RAW_BLOCKS = (
+    (
+        re.compile(r"^ {0,3}<(?:script|pre|style|textarea)(?=\s|>|$)", re.I),
+        re.compile(r"</(?:script|pre|style|textarea)>", re.I),
+    ),
+    (re.compile(r"^ {0,3}<!--"), re.compile(r"-->")),
+    (re.compile(r"^ {0,3}<\?"), re.compile(r"\?>")),
+    (re.compile(r"^ {0,3}<![A-Za-z]"), re.compile(r">")),
+    (re.compile(r"^ {0,3}<!\[CDATA\["), re.compile(r"\]\]>")),
+)
+_HTML_BLOCK_TAGS = (
+    "address|article|aside|base|basefont|blockquote|body|caption|center|col"
+    "|colgroup|dd|details|dialog|dir|div|dl|dt|fieldset|figcaption|figure"
+    "|footer|form|frame|frameset|h[1-6]|head|header|hr|html|iframe|legend|li"
+    "|link|main|menu|menuitem|nav|noframes|ol|optgroup|option|p|param|search"
+    "|section|summary|table|tbody|td|tfoot|th|thead|title|tr|track|ul"
+)
+# Condition 6: a block-level tag, opening or closing.
+_HTML_BLOCK_RE = re.compile(rf"^ {{0,3}}<(/?)({_HTML_BLOCK_TAGS})(?=\s|/?>|$)", re.I)
+# Any line starting conditions 1-6, the HTML blocks that interrupt a paragraph.
+_HTML_INTERRUPT_RE = re.compile(
+    r"^ {0,3}<(?:(?:script|pre|style|textarea)(?=\s|>|$)|!--|\?|![A-Za-z]"
+    rf"|!\[CDATA\[|/?(?:{_HTML_BLOCK_TAGS})(?=\s|/?>|$))",
+    re.I,
+)
+# Condition 7: any other complete tag alone on its line.
+_HTML_TAG_LINE_RE = re.compile(
+    r"^ {0,3}(?:<[A-Za-z][A-Za-z0-9-]*"
+    r"(?:\s+[A-Za-z_:][\w.:-]*(?:\s*=\s*(?:[^\s\"'=<>`]+|'[^']*'|\"[^\"]*\"))?)*"
+    r"\s*/?>|</[A-Za-z][A-Za-z0-9-]*\s*>)\s*$"
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Block:
+    """A top-level Markdown block and the source lines it spans."""
+
+    kind: str
+    text: str
+    start_line: int  # 1-based, inclusive
+    end_line: int  # 1-based, inclusive
+
+    @property
+    def digest(self) -> str:
+        return content_digest(self.text)
+
+
+def _is_indented(line: str) -> bool:
+    return line.startswith(("    ", "\t"))
+
+
+def _starts_new_block(line: str) -> bool:
+    """Return True if *line* interrupts a paragraph."""
+    return bool(
+        _FENCE_RE.match(line)
+        or _HEADING_RE.match(line)
+        or line.lstrip().startswith("$$")
+        or _HTML_INTERRUPT_RE.match(line)
+    )
+
+
+def _scan_fence(lines: list[str], i: int) -> int:
+    fence = _FENCE_RE.match(lines[i]).group(1)  # type: ignore[union-attr]
+    i += 1
+    while i < len(lines):
+        close = _FENCE_RE.match(lines[i])
+        i += 1
+        if (
+            close
+            and close.group(1)[0] == fence[0]
+            and len(close.group(1)) >= len(fence)
+            and not lines[i - 1].strip()[len(close.group(1)) :].strip()
+        ):
+            break
+    return i
+
+
+def _scan_display_math(lines: list[str], i: int) -> int:
+    opening = lines[i].lstrip()[2:]
+    i += 1
+    if "$$" in opening:
+        return i
+    while i < len(lines):
+        i += 1
+        if "$$" in lines[i - 1]:
+            break
+    return i
+
+
+def _scan_list(lines: list[str], i: int) -> int:
+    n = len(lines)
+    i += 1
+    while i < n:
+        line = lines[i]
+        if line.strip():
+            if line.startswith((" ", "\t")) or _LIST_RE.match(line):
+                i += 1
+                continue
+            if _starts_new_block(line):
+                break
+            # Lazy continuation of the previous list item's paragraph.
+            i += 1
+            continue
+        # A blank line only continues the list if the next content line is
+        # indented under an item or starts another item.
+        j = i
+        while j < n and not lines[j].strip():
+            j += 1
+        if j < n and (lines[j].startswith((" ", "\t")) or _LIST_RE.match(lines[j])):
+            i = j
+            continue
+        break
+    return i
+
+
+def _scan_indented_code(lines: list[str], i: int) -> int:
+    n = len(lines)
+    end = i + 1
+    j = end
+    while j < n:
+        if _is_indented(lines[j]):
+            j += 1
+            end = j
+        elif not lines[j].strip():
+            j += 1
+        else:
+            break
+    return end
+
+
+def _scan_to_blank(lines: list[str], i: int) -> int:
+    while i < len(lines) and lines[i].strip():
+        i += 1
+    return i
+
+
+def _scan_element(lines: list[str], i: int, tag: str) -> int | None:
+    """Index after the line closing the ``<tag>`` element opened on line *i*.
+
+    Nested elements of the same name are counted.  Returns None if the
+    element is never closed.
+    """
+    opening = re.compile(rf"<{tag}(?=[\s>/])(?:[^<>]*[^<>/])?>", re.I)
+    closing = re.compile(rf"</{tag}\s*>", re.I)
+    depth = 0
+    for j in range(i, len(lines)):
+        depth += len(opening.findall(lines[j])) - len(closing.findall(lines[j]))
+        if depth <= 0:
+            return j + 1
+    return None
+
+
+def _scan_html(lines: list[str], i: int) -> int | None:
+    """End of the raw HTML block starting on line *i*, or None if none does."""
+    line = lines[i]
+    if not line.lstrip(" ").startswith("<"):
+        return None
+    for start, end in _HTML_RAW_BLOCKS:
+        match = start.match(line)
+        if match is None:
+            continue
+        if end.search(line, match.end()):
+            return i + 1
+        for j in range(i + 1, len(lines)):
+            if end.search(lines[j]):
+                return j + 1
+        return len(lines)
+    match = _HTML_BLOCK_RE.match(line)
+    if match is not None:
+        if not match.group(1):
+            closed = _scan_element(lines, i, match.group(2))
+            if closed is not None:
+                return _scan_to_blank(lines, closed)
+        return _scan_to_blank(lines, i + 1)
+    if _HTML_TAG_LINE_RE.match(line):
+        return _scan_to_blank(lines, i + 1)
+    return None
+
+
+def _scan_paragraph(lines: list[str], i: int) -> int:
+    i += 1
+    while i < len(lines) and lines[i].strip() and not _starts_new_block(lines[i]):
+        i += 1
+    return i
+
+
+def block_spans(lines: list[str]) -> Iterator[tuple[str, int, int]]:
+    """Yield ``(kind, start, end)`` for each top-level block in *lines*.
+
+    *start* and *end* are 0-based line indices (end exclusive).  This is
+    :func:`split_blocks` without building block text, for callers that only
+    need block boundaries (see ``backend.windowed``).
+    """
+    i = 0
+    n = len(lines)
+
+    while i < n:
+        line = lines[i]
+        if not line.strip():
+            i += 1
+            continue
+
+        start = i
+        if _FENCE_RE.match(line):
+            kind, i = "code", _scan_fence(lines, i)
+        elif line.lstrip().startswith("$$"):
+            kind, i = "math", _scan_display_math(lines, i)
+        elif _HEADING_RE.match(line):
+            kind, i = "heading", i + 1
+        elif _LIST_RE.match(line):
+            kind, i = "list", _scan_list(lines, i)
+        elif _is_indented(line):
+            kind, i = "code", _scan_indented_code(lines, i)
+        elif (html_end := _scan_html(lines, i)) is not None:
+            kind, i = "html", html_end
+        else:
+            i = _scan_paragraph(lines, i)
+            kind = "paragraph"
+            if (
+                i - start >= 2
+                and "|" in lines[start + 1]
+                and _TABLE_SEPARATOR_RE.match(lines[start + 1])
+            ):
+                kind = "table"
+            elif all(_REF_DEF_RE.match(ref) for ref in lines[start:i]):
+                kind = "reference"
+
+        # Lists and indented code may have swallowed trailing blank lines.
+        end = i
+        while end > start + 1 and not lines[end - 1].strip():
+            end -= 1
+
+        yield kind, start, end
+
+
+def split_blocks(markdown_text: str) -> list[Block]:
+    """Split *markdown_text* into top-level :class:`Block` objects in order."""
+    lines = (markdown_text or "").split("\n")
+    return [
+        Block(
+            kind=kind,
+            text="\n".join(lines[start:end]),
+            start_line=start + 1,
+            end_line=end,
+        )
+        for kind, start, end in block_spans(lines)
+    ]
+
+
+def is_reference_definition(line: str) -> bool:
+    """Return True if *line* is a link reference definition (``[id]: url``)."""
+    return _REF_DEF_RE.match(line) is not None
+
+
+def reference_definitions(blocks: list[Block]) -> str:
+    """Collect link reference definitions (``[id]: url``) from every block.
+
+    Blocks are rendered in isolation, so reference-style links need the
+    document's definitions appended to resolve.
+    """
+    refs: list[str] = []
+    for block in blocks:
+        if block.kind in VERBATIM_KINDS:
+            continue
+        refs.extend(line for line in block.text.split("\n") if _REF_DEF_RE.match(line))
+    return "\n".join(refs)
@@ -0,0 +1,211 @@
+"""
+documents.py
+============
+Server-side copies of open documents for patch-based saves.
+
+Autosave used to send the whole document to ``POST /api/files/write`` and
+rewrite the whole file, so a one-character change to a large document
+shipped and wrote megabytes.  ``POST /api/files/patch`` sends only the edits
+(the same ``{"offset", "delete", "insert"}`` form as the live preview, in
+Unicode code points) plus the hash of the text they apply to.
+
+:class:`DocumentStore` keeps the text last read or written through the API,
+keyed by path and checked against the file's mtime and size, so a patch is
+applied without reading the file again.  If the file changed on disk, or
+the client's base hash (or mtime) does not match the current text, the patch
+is rejected with :class:`StaleBaseError` and the client falls back to a full
+write.
+
+A full write rewrites the file in place, as it always has, which keeps its
+inode (hardlinks), owner, ACLs and extended attributes.  A patch goes to a
+temporary file in the same directory that then replaces the original
+(:func:`atomic_write_text`), so a crash mid-save never leaves a truncated
+document behind; where no temporary file can be created there (a writable
+file in a read-only directory, say) it is written in place instead.
+"""
+
+from __future__ import annotations
+
+import os
+import stat
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from backend.render_cache import content_digest
+
+_DEFAULT_MAX_CHARS = 64 * 1024 * 1024
+
+
+class StaleBaseError(RuntimeError):
+    """The patch was made against text that is no longer the file's."""
+
+
+@dataclass(frozen=True, slots=True)
+class Document:
+    text: str
+    digest: str
+    stamp: tuple[int, int]  # (mtime_ns, size) of the file holding *text*
+
+    def as_dict(self) -> dict:
+        return {"hash": self.digest, "mtime_ns": self.stamp[0]}
+
+
+def apply_text_edits(text: str, edits: list[dict]) -> str:
+    """Apply *edits* in order, each against the result of the previous one.
+
+    Raises ValueError if an edit is malformed or out of range.
+    """
+    for edit in edits:
+        offset = int(edit.get("offset", 0))
+        delete = int(edit.get("delete", 0))
+        insert = str(edit.get("insert", ""))
+        if offset < 0 or delete < 0 or offset + delete > len(text):
+            raise ValueError(
+                f"Edit out of range: offset={offset} delete={delete} length={len(text)}"
+            )
+        text = text[:offset] + insert + text[offset + delete :]
+    return text
+
+
+def write_text(path: str, text: str) -> os.stat_result:
+    """Write *text* to *path* in place and return the ``stat`` of the file."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return os.stat(path)
+
+
+def atomic_write_text(path: str, text: str) -> os.stat_result:
+    """Write *text* to *path* through a temporary file and ``os.replace``.
+
+    The file keeps its permission bits; a new file gets the usual
+    umask-derived ones.  If the temporary file cannot be created, falls
+    back to :func:`write_text`.  Returns the ``stat`` of the written file.
+    """
+    directory = os.path.dirname(path) or "."
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    try:
+        fd, tmp = tempfile.mkstemp(
+            dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+        )
+    except OSError:
+        return write_text(path, text)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return os.stat(path)
+
+
+class DocumentStore:
+    """Thread-safe LRU of :class:`Document` objects, bounded by total size."""
+
+    def __init__(self, max_chars: int = _DEFAULT_MAX_CHARS):
+        self.max_chars = max_chars
+        self._size = 0
+        self._entries: OrderedDict[str, Document] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _put(self, path: str, document: Document) -> None:
+        # Caller holds the lock.
+        previous = self._entries.pop(path, None)
+        if previous is not None:
+            self._size -= len(previous.text)
+        if len(document.text) > self.max_chars:
+            return
+        self._entries[path] = document
+        self._size += len(document.text)
+        while self._size > self.max_chars:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted.text)
+
+    def _current(self, path: str) -> Document:
+        """The document at *path*, re-read if the file changed on disk."""
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        document = self._entries.get(path)
+        if document is not None and document.stamp == stamp:
+            self._entries.move_to_end(path)
+            return document
+        with open(path, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        document = Document(text, content_digest(text), stamp)
+        self._put(path, document)
+        return document
+
+    def read(self, path: str) -> Document:
+        """Read *path* (from the cache when unchanged on disk)."""
+        path = os.path.realpath(path)
+        with self._lock:
+            return self._current(path)
+
+    def write(self, path: str, text: str) -> Document:
+        """Replace the contents of *path* with *text*, writing in place."""
+        path = os.path.realpath(path)
+        with self._lock:
+            st = write_text(path, text)
+            document = Document(
+                text, content_digest(text), (st.st_mtime_ns, st.st_size)
+            )
+            self._put(path, document)
+            return document
+
+    def patch(
+        self,
+        path: str,
+        edits: list[dict],
+        base_hash: str | None = None,
+        base_mtime_ns: int | None = None,
+    ) -> Document:
+        """Apply *edits* to the text of *path* and write the result.
+
+        *base_hash* (from a read, write or earlier patch) or *base_mtime_ns*
+        must describe the text the edits were made against; otherwise
+        raises :class:`StaleBaseError`.  Raises ValueError for bad edits and
+        OSError if the file cannot be read or written.
+        """
+        if base_hash is None and base_mtime_ns is None:
+            raise ValueError("Provide base_hash or base_mtime_ns")
+        path = os.path.realpath(path)
+        with self._lock:
+            document = self._current(path)
+            if base_hash is not None and base_hash != document.digest:
+                raise StaleBaseError(f"Base hash does not match {path}")
+            if base_mtime_ns is not None and base_mtime_ns != document.stamp[0]:
+                raise StaleBaseError(f"Base mtime does not match {path}")
+            if not edits:
+                return document
+            text = apply_text_edits(document.text, edits)
+            st = atomic_write_text(path, text)
+            document = Document(
+                text, content_digest(text), (st.st_mtime_ns, st.st_size)
+            )
+            self._put(path, document)
+            return document
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Process-wide store used by the read, write and patch endpoints.
+document_store = DocumentStore()
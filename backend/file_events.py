@@ -0,0 +1,285 @@
+"""
+file_events.py
+==============
+Debounced file-change notifications for ``GET /api/files/events``.
+
+The Tk app reloads a file when its ``watchdog`` handler sees it modified;
+the web frontend had no such channel and could only re-read files to notice
+external edits.  :class:`FileEventHub` watches the paths that connected
+clients ask for and pushes what changed to each of them as server-sent
+events.
+
+Events are collected for :data:`DEBOUNCE_SECONDS` after the first one and
+then merged per path, so an editor's save (often a burst of modified events,
+or a temporary file that is written and then moved over the original)
+arrives as one event.  Each carries the file's new mtime, size and the same
+content hash ``/api/files/read`` returns, so a client compares it with the
+hash of the text it holds and refetches only files that really changed::
+
+    {"type": "modified", "path": "/notes/a.md", "is_directory": false,
+     "exists": true, "mtime_ns": 1718000000000000000, "size": 1532,
+     "hash": "9f2c…"}
+
+``type`` is ``created``, ``modified``, ``deleted`` or ``moved``; a moved
+event also has ``dest_path``, and its mtime and hash describe the file
+there.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from dataclasses import dataclass
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+
+from backend.documents import document_store
+from backend.workspace_watcher import workspace_watcher
+
+logger = logging.getLogger(__name__)
+
+DEBOUNCE_SECONDS = 0.2
+# Seconds between keep-alive comments on an idle stream.
+KEEPALIVE_SECONDS = 15.0
+MAX_WATCHED_PATHS = 256
+# Larger files are reported without a hash.
+MAX_HASH_BYTES = 32 * 1024 * 1024
+
+
+def _is_within(path: str, directory: str) -> bool:
+    return path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+def describe(path: str, is_directory: bool = False) -> dict:
+    """The ``exists``/``mtime_ns``/``size``/``hash`` fields for *path*."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return {"exists": False, "mtime_ns": None, "size": None, "hash": None}
+    digest = None
+    if not is_directory and os.path.isfile(path) and st.st_size <= MAX_HASH_BYTES:
+        try:
+            digest = document_store.read(path).digest
+        except OSError:
+            pass
+    return {
+        "exists": True,
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "hash": digest,
+    }
+
+
+def _merge(previous: str | None, kind: str) -> str | None:
+    """Combine two events for one path within a debounce window."""
+    if previous == "created":
+        # Modified after creation is still new; deleted again is nothing.
+        return None if kind == "deleted" else "created"
+    if previous == "deleted" and kind == "created":
+        return "modified"
+    return kind
+
+
+def _deliver(subscription: Subscription, events: list[dict] | None) -> None:
+    """Hand *events* (None: end of stream) to the subscription's loop."""
+    try:
+        subscription.loop.call_soon_threadsafe(subscription.queue.put_nowait, events)
+    except RuntimeError:
+        # The loop is closed; the stream is already gone.
+        pass
+
+
+@dataclass(eq=False, slots=True)
+class Subscription:
+    """One client's watched paths and the queue its events are put on."""
+
+    files: frozenset[str]
+    directories: tuple[str, ...]
+    queue: asyncio.Queue
+    loop: asyncio.AbstractEventLoop
+
+    def wants(self, path: str | None) -> bool:
+        if path is None:
+            return False
+        return path in self.files or any(
+            path == d or _is_within(path, d) for d in self.directories
+        )
+
+
+class _Recorder(FileSystemEventHandler):
+    def __init__(self, hub: FileEventHub):
+        self.hub = hub
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.event_type in {"created", "modified", "deleted", "moved"}:
+            self.hub._record(event)
+
+
+class FileEventHub:
+    """Shares the watches of all subscriptions, watching each folder once."""
+
+    def __init__(self, debounce: float = DEBOUNCE_SECONDS):
+        self.debounce = debounce
+        self._subscriptions: list[Subscription] = []
+        # (folder, recursive) -> [watch, number of subscriptions using it]
+        self._watches: dict[tuple[str, bool], list] = {}
+        # path -> [kind, dest_path, is_directory] since the last flush
+        self._pending: dict[str, list] = {}
+        # Temporary files moved into place since the last flush.  A folder
+        # watched twice (a file's folder inside a watched tree) reports each
+        # event twice, and the second move must not undo the merge.
+        self._placed: set[tuple[str, str]] = set()
+        self._timer: threading.Timer | None = None
+        self._lock = threading.Lock()
+
+    # ── subscriptions ────────────────────────────────────────────────────────
+
+    def subscribe(
+        self, paths: list[str], loop: asyncio.AbstractEventLoop | None = None
+    ) -> Subscription:
+        """Start watching *paths* (files, or folders recursively).
+
+        Events are put on the subscription's queue from *loop*, by default
+        the running one.  Raises FileNotFoundError for a missing path,
+        ValueError for too many and OSError if a folder cannot be watched.
+        """
+        if not paths or len(paths) > MAX_WATCHED_PATHS:
+            raise ValueError(f"Watch between 1 and {MAX_WATCHED_PATHS} paths")
+        files, directories = set(), []
+        for path in paths:
+            real = os.path.realpath(path)
+            if os.path.isdir(real):
+                directories.append(real)
+            elif os.path.exists(real):
+                files.add(real)
+            else:
+                raise FileNotFoundError(f"Path not found: {path}")
+        subscription = Subscription(
+            frozenset(files),
+            tuple(directories),
+            asyncio.Queue(),
+            loop or asyncio.get_running_loop(),
+        )
+        with self._lock:
+            watched = []
+            try:
+                for key in self._keys(subscription):
+                    self._watch(key)
+                    watched.append(key)
+            except OSError:
+                self._release(watched)
+                raise
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+                self._release(self._keys(subscription))
+
+    @staticmethod
+    def _keys(subscription: Subscription) -> set[tuple[str, bool]]:
+        # A file is watched through its folder, which also sees it replaced.
+        keys = {(os.path.dirname(f), False) for f in subscription.files}
+        keys.update((d, True) for d in subscription.directories)
+        return keys
+
+    def _watch(self, key: tuple[str, bool]) -> None:
+        # Caller holds the lock.
+        entry = self._watches.get(key)
+        if entry is None:
+            watch = workspace_watcher.watch(key[0], _Recorder(self), recursive=key[1])
+            entry = self._watches[key] = [watch, 0]
+        entry[1] += 1
+
+    def _release(self, keys) -> None:
+        # Caller holds the lock.
+        for key in keys:
+            entry = self._watches[key]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._watches[key]
+                workspace_watcher.unwatch(entry[0])
+
+    def shutdown(self) -> None:
+        """Stop watching and end all streams (used on application shutdown)."""
+        with self._lock:
+            watches = [watch for watch, _count in self._watches.values()]
+            subscriptions, self._subscriptions = self._subscriptions, []
+            self._watches.clear()
+            self._pending.clear()
+            self._placed.clear()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        for watch in watches:
+            workspace_watcher.unwatch(watch)
+        for subscription in subscriptions:
+            _deliver(subscription, None)
+
+    # ── events ───────────────────────────────────────────────────────────────
+
+    def _record(self, event: FileSystemEvent) -> None:
+        src = os.fsdecode(event.src_path)
+        with self._lock:
+            pending = self._pending
+            if event.event_type == "moved":
+                dest = os.fsdecode(event.dest_path)
+                previous = pending.pop(src, None)
+                if (src, dest) in self._placed:
+                    pass  # the same move, reported by a second watch
+                elif previous is not None and previous[0] == "created":
+                    # A file written elsewhere and moved into place, as
+                    # atomic saves do: only the destination changed.
+                    self._put(dest, "modified", None, event.is_directory)
+                    self._placed.add((src, dest))
+                else:
+                    pending[src] = ["moved", dest, event.is_directory]
+            elif event.event_type == "modified" and event.is_directory:
+                # Folder mtimes change with every entry; the entries report.
+                return
+            else:
+                self._put(src, event.event_type, None, event.is_directory)
+            if self._timer is None and pending:
+                self._timer = threading.Timer(self.debounce, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _put(self, path: str, kind: str, dest: str | None, is_directory: bool) -> None:
+        # Caller holds the lock.
+        previous = self._pending.get(path)
+        merged = _merge(previous[0] if previous else None, kind)
+        if merged is None:
+            del self._pending[path]
+        else:
+            self._pending[path] = [merged, dest, is_directory]
+
+    def _flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._placed.clear()
+            self._timer = None
+            subscriptions = list(self._subscriptions)
+        if not subscriptions:
+            return
+        batches: dict[Subscription, list[dict]] = {}
+        for path, (kind, dest, is_directory) in pending.items():
+            # Only hash files someone is waiting for.
+            wanting = [s for s in subscriptions if s.wants(path) or s.wants(dest)]
+            if not wanting:
+                continue
+            event = {"type": kind, "path": path, "is_directory": is_directory}
+            if dest is not None:
+                event["dest_path"] = dest
+            event.update(describe(dest or path, is_directory))
+            for subscription in wanting:
+                batches.setdefault(subscription, []).append(event)
+        for subscription, events in batches.items():
+            _deliver(subscription, events)
+
+
+# Process-wide hub used by ``GET /api/files/events``.
+file_event_hub = FileEventHub()
@@ -0,0 +1,61 @@
+"""
+highlight.py
+============
+Server-side syntax highlighting for fenced code in the preview.
+
+markdown2 highlights fenced code that names a language with Pygments.  The
+markup uses CSS classes only (``<div class="codehilite">`` …
+``<span class="k">``), so the highlighted HTML of a block is the same in
+every theme and is memoised once in :data:`code_block_cache`, keyed by lexer
+and a digest of the code.  Editing prose around a code-heavy runbook, or
+switching the theme, therefore re-lexes nothing.
+
+Colours come from :func:`highlight_css`, which :func:`backend.theme.theme_css`
+includes, so the token stylesheet is generated once per theme and served
+with the rest of the theme stylesheet.
+
+Set ``MARKDOWN_READER_HIGHLIGHT_CACHE_MB`` to change the cache budget.
+"""
+
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+
+from backend.render_cache import RenderCache
+from markdown_reader import markdown_factory
+
+_DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+# Pygments styles used for the light and dark preview themes.
+LIGHT_STYLE = "default"
+DARK_STYLE = "monokai"
+
+
+def _env_max_bytes() -> int:
+    value = os.environ.get("MARKDOWN_READER_HIGHLIGHT_CACHE_MB", "").strip()
+    try:
+        return int(float(value) * 1024 * 1024) if value else _DEFAULT_MAX_BYTES
+    except ValueError:
+        return _DEFAULT_MAX_BYTES
+
+
+@lru_cache(maxsize=2)
+def highlight_css(*, dark_mode: bool) -> str:
+    """Return the Pygments token stylesheet for ``.codehilite`` blocks.
+
+    Only token colours are emitted; backgrounds and ``pre`` layout are left
+    to the theme.  Returns an empty string when Pygments is not installed.
+    """
+    try:
+        from pygments.formatters import HtmlFormatter
+    except ImportError:
+        return ""
+    style = DARK_STYLE if dark_mode else LIGHT_STYLE
+    return "\n".join(HtmlFormatter(style=style).get_token_style_defs(".codehilite"))
+
+
+# Process-wide cache of highlighted code blocks, shared by every render path
+# that converts through ``markdown_reader.markdown_factory``.
+code_block_cache = RenderCache(max_bytes=_env_max_bytes())
+markdown_factory.set_highlight_cache(code_block_cache)
@@ -0,0 +1,252 @@
+"""
+image_index.py
+==============
+Image dimension index for preview ``<img>`` tags.
+
+The preview only learns an image's size once the webview has decoded it, so
+notes with many images reflow (and the scroll position jumps) as each one
+arrives.  :func:`add_image_dimensions` adds ``width``/``height`` attributes
+to local images in rendered HTML so the layout is right on first paint; the
+theme's ``height: auto`` keeps the aspect ratio when ``max-width`` applies.
+
+Dimensions come from the image header only: PNG, GIF, JPEG, WebP, BMP and
+SVG (explicit pixel ``width``/``height``) are understood.  Results are kept
+in :data:`image_index`, keyed by path and validated against the file's
+mtime and size, so each image is probed once per change.  Images seen for
+the first time in a render are probed in parallel.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from html import unescape
+from urllib.parse import unquote
+
+# Large enough for JPEGs whose SOF marker follows EXIF/ICC segments.
+_HEADER_BYTES = 64 * 1024
+_MAX_WORKERS = 8
+
+Dimensions = tuple[int, int]
+
+
+# ── Header parsers ────────────────────────────────────────────────────────────
+
+
+def _png(head: bytes) -> Dimensions | None:
+    if head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+        return struct.unpack(">II", head[16:24])
+    return None
+
+
+def _gif(head: bytes) -> Dimensions | None:
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return struct.unpack("<HH", head[6:10])
+    return None
+
+
+def _bmp(head: bytes) -> Dimensions | None:
+    if head[:2] == b"BM" and len(head) >= 26:
+        width, height = struct.unpack("<ii", head[18:26])
+        return width, abs(height)
+    return None
+
+
+def _webp(head: bytes) -> Dimensions | None:
+    if head[:4] != b"RIFF" or head[8:12] != b"WEBP":
+        return None
+    chunk = head[12:16]
+    if chunk == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and head[20:21] == b"\x2f":
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return width, height
+    return None
+
+
+# SOFn markers carry the frame size; DHT (C4), JPG (C8) and DAC (CC) do not.
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _jpeg(head: bytes) -> Dimensions | None:
+    if head[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 9 < len(head):
+        if head[i] != 0xFF:
+            return None
+        marker = head[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker in (0x01, *range(0xD0, 0xD8)):  # markers without a length
+            i += 2
+            continue
+        (length,) = struct.unpack(">H", head[i + 2 : i + 4])
+        if marker in _JPEG_SOF:
+            height, width = struct.unpack(">HH", head[i + 5 : i + 9])
+            return width, height
+        i += 2 + length
+    return None
+
+
+_SVG_TAG_RE = re.compile(rb"<svg\b[^>]*>", re.IGNORECASE)
+_SVG_LENGTH_RE = rb'\s%s\s*=\s*["\']\s*([0-9.]+)\s*(?:px)?\s*["\']'
+_SVG_WIDTH_RE = re.compile(_SVG_LENGTH_RE % b"width")
+_SVG_HEIGHT_RE = re.compile(_SVG_LENGTH_RE % b"height")
+
+
+def _svg(head: bytes) -> Dimensions | None:
+    tag = _SVG_TAG_RE.search(head)
+    if tag is None:
+        return None
+    width = _SVG_WIDTH_RE.search(tag.group())
+    height = _SVG_HEIGHT_RE.search(tag.group())
+    if width is None or height is None:
+        return None  # relative or missing size: let the browser decide
+    return round(float(width.group(1))), round(float(height.group(1)))
+
+
+_PARSERS = (_png, _jpeg, _gif, _webp, _bmp, _svg)
+
+
+def read_dimensions(path: str) -> Dimensions | None:
+    """Return ``(width, height)`` of the image at *path* from its header.
+
+    Returns None for unreadable files and unrecognised formats.
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(_HEADER_BYTES)
+    except OSError:
+        return None
+    for parse in _PARSERS:
+        try:
+            size = parse(head)
+        except struct.error:
+            size = None
+        if size is not None:
+            width, height = size
+            return (width, height) if width > 0 and height > 0 else None
+    return None
+
+
+# ── Index ─────────────────────────────────────────────────────────────────────
+
+
+class ImageIndex:
+    """Thread-safe map of image path → dimensions, invalidated by mtime/size."""
+
+    def __init__(self, max_workers: int = _MAX_WORKERS):
+        self.max_workers = max_workers
+        self._entries: dict[str, tuple[int, int, Dimensions | None]] = {}
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self.probes = 0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="image-index"
+                )
+            return self._executor
+
+    def _probe(self, path: str, stamp: tuple[int, int]) -> Dimensions | None:
+        size = read_dimensions(path)
+        with self._lock:
+            self._entries[path] = (*stamp, size)
+            self.probes += 1
+        return size
+
+    def lookup(self, paths: list[str]) -> dict[str, Dimensions | None]:
+        """Return dimensions for every path in *paths*.
+
+        Cached entries whose file is unchanged are answered from memory; the
+        rest are probed concurrently.  Missing files map to None.
+        """
+        result: dict[str, Dimensions | None] = {}
+        stale: dict[str, tuple[int, int]] = {}
+        for path in dict.fromkeys(paths):
+            try:
+                st = os.stat(path)
+            except OSError:
+                result[path] = None
+                continue
+            stamp = (st.st_mtime_ns, st.st_size)
+            with self._lock:
+                entry = self._entries.get(path)
+            if entry is not None and entry[:2] == stamp:
+                result[path] = entry[2]
+            else:
+                stale[path] = stamp
+
+        if len(stale) == 1:
+            ((path, stamp),) = stale.items()
+            result[path] = self._probe(path, stamp)
+        elif stale:
+            pool = self._pool()
+            futures = {p: pool.submit(self._probe, p, s) for p, s in stale.items()}
+            for path, future in futures.items():
+                result[path] = future.result()
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.probes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# ── HTML rewriting ────────────────────────────────────────────────────────────
+
+_IMG_RE = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+_FILE_SRC_RE = re.compile(r'\ssrc="file://([^"]+)"')
+_HAS_SIZE_RE = re.compile(r"\s(?:width|height)\s*=", re.IGNORECASE)
+
+
+def _local_path(tag: str) -> str | None:
+    match = _FILE_SRC_RE.search(tag)
+    if match is None or _HAS_SIZE_RE.search(tag):
+        return None
+    path = unquote(unescape(match.group(1)))
+    # file:///C:/x.png → C:/x.png on Windows
+    if re.match(r"/[A-Za-z]:/", path):
+        path = path[1:]
+    return path
+
+
+def add_image_dimensions(html: str, index: ImageIndex | None = None) -> str:
+    """Add ``width``/``height`` to ``file://`` images in *html* that lack them."""
+    if "<img" not in html:
+        return html
+    tags = {m.group(): _local_path(m.group()) for m in _IMG_RE.finditer(html)}
+    paths = [p for p in tags.values() if p]
+    if not paths:
+        return html
+    sizes = (index or image_index).lookup(paths)
+
+    def replace(match: re.Match) -> str:
+        tag = match.group()
+        size = sizes.get(tags.get(tag) or "")
+        if size is None:
+            return tag
+        closing = " />" if tag.endswith("/>") else ">"
+        body = tag[: -len(closing.strip())].rstrip()
+        return f'{body} width="{size[0]}" height="{size[1]}"{closing}'
+
+    return _IMG_RE.sub(replace, html)
+
+
+# Process-wide index used by ``backend.renderer``.
+image_index = ImageIndex()
@@ -0,0 +1,197 @@
+"""
+incremental.py
+==============
+Block-level incremental Markdown rendering.
+
+The document is split into top-level blocks (see ``backend.blocks``) and each
+block's HTML is memoised by a digest of its source.  After a small edit only
+the blocks whose source changed miss the cache, so edit-to-preview latency
+tracks the size of the edit rather than the size of the document.
+
+Block ids are derived from block content, which keeps them stable across
+edits elsewhere in the document.  A client that already holds a block with a
+given id never needs its HTML again.
+
+The same per-block rendering backs source-mapped documents
+(:meth:`IncrementalRenderer.render_source_mapped`), whose top-level elements
+carry ``data-line``/``data-line-end`` attributes for editor scroll sync.
+"""
+
+from __future__ import annotations
+
+import re
+
+from backend.blocks import (
+    VERBATIM_KINDS,
+    Block,
+    reference_definitions,
+    split_blocks,
+)
+from backend.image_index import add_image_dimensions
+from backend.render_cache import RenderCache, content_digest
+from backend.renderer import render_fragment
+
+_DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+# First element of a block's HTML (markdown2 and Python-Markdown emit no
+# leading text at block level).
+_FIRST_TAG_RE = re.compile(r"^(\s*<[a-zA-Z][\w-]*)")
+# The attributes added by tag_source_lines.
+_SOURCE_LINES_RE = re.compile(
+    r'<[a-zA-Z][\w-]* data-line="(\d+)" data-line-end="(\d+)"'
+)
+
+
+def _may_use_references(block: Block) -> bool:
+    return block.kind not in VERBATIM_KINDS and "[" in block.text
+
+
+def tag_source_lines(html: str, block: Block) -> str:
+    """Add the block's 1-based source line range to its first element."""
+    return _FIRST_TAG_RE.sub(
+        rf'\1 data-line="{block.start_line}" data-line-end="{block.end_line}"',
+        html,
+        count=1,
+    )
+
+
+def line_map(html: str) -> list[list[int]]:
+    """Return the ``[start_line, end_line]`` of every block tagged in *html*.
+
+    Entries are read back from the rendered attributes, in document order,
+    so a block that rendered to nothing or to no element (a bare HTML
+    comment, say) is never listed without an element to scroll to.
+    """
+    return [[int(start), int(end)] for start, end in _SOURCE_LINES_RE.findall(html)]
+
+
+class IncrementalRenderer:
+    """Render Markdown block by block, re-rendering only unseen blocks."""
+
+    def __init__(self, max_bytes: int = _DEFAULT_MAX_BYTES):
+        self.cache = RenderCache(max_bytes=max_bytes)
+
+    def block_ids(self, blocks: list[Block], refs: str = "") -> list[str]:
+        """Return a stable, unique id for every block in *blocks*.
+
+        Identical blocks get an occurrence suffix so ids stay unique.  Blocks
+        that may contain reference-style links also fold the document's link
+        definitions into their id, since those change their rendered HTML.
+        """
+        refs_digest = content_digest(refs) if refs else ""
+        seen: dict[str, int] = {}
+        ids: list[str] = []
+        for block in blocks:
+            digest = block.digest
+            if refs_digest and _may_use_references(block):
+                digest = content_digest(digest + refs_digest)
+            base = f"b{digest[:12]}"
+            count = seen.get(base, 0)
+            seen[base] = count + 1
+            ids.append(base if count == 0 else f"{base}-{count}")
+        return ids
+
+    def render_block(
+        self,
+        block: Block,
+        *,
+        base_dir: str | None,
+        refs: str,
+        engine: str | None = None,
+        highlight: bool = True,
+        image_sizes: bool = True,
+    ) -> str:
+        """Return the HTML of a single block, rendering it only on a cache miss.
+
+        Image sizes are added after the lookup rather than cached, so a
+        resized image is picked up by the next render.
+        """
+        if block.kind == "reference":
+            return ""
+        if refs and _may_use_references(block):
+            source = f"{block.text}\n\n{refs}"
+        else:
+            source = block.text
+        key = (content_digest(source), base_dir or "", engine or "", highlight)
+        html = self.cache.get(key)
+        if html is None:
+            html = render_fragment(
+                source,
+                base_dir=base_dir,
+                engine=engine,
+                highlight=highlight,
+                image_sizes=False,
+            )
+            self.cache.put(key, html)
+        return add_image_dimensions(html) if image_sizes else html
+
+    def render_source_mapped(
+        self,
+        markdown_text: str,
+        *,
+        base_dir: str | None = None,
+        engine: str | None = None,
+        highlight: bool = True,
+        image_sizes: bool = True,
+    ) -> str:
+        """Render *markdown_text* to body HTML with source line attributes.
+
+        The first element of every block gets ``data-line`` and
+        ``data-line-end``; :func:`line_map` reads the ranges back.
+        """
+        blocks = split_blocks(markdown_text)
+        refs = reference_definitions(blocks)
+        parts = []
+        for block in blocks:
+            html = self.render_block(
+                block,
+                base_dir=base_dir,
+                refs=refs,
+                engine=engine,
+                highlight=highlight,
+                image_sizes=image_sizes,
+            )
+            if html:
+                parts.append(tag_source_lines(html, block))
+        return "\n".join(parts)
+
+    def render(
+        self,
+        markdown_text: str,
+        *,
+        base_dir: str | None = None,
+        known_ids: set[str] | frozenset[str] = frozenset(),
+    ) -> dict:
+        """Render *markdown_text* as an ordered list of blocks.
+
+        Blocks whose id is in *known_ids* are returned without HTML: the
+        caller already has it.  ``changed`` lists the ids whose HTML is
+        included in the response.
+        """
+        blocks = split_blocks(markdown_text)
+        refs = reference_definitions(blocks)
+        ids = self.block_ids(blocks, refs)
+
+        entries: list[dict] = []
+        changed: list[str] = []
+        for block, block_id in zip(blocks, ids, strict=True):
+            html = None
+            if block_id not in known_ids:
+                html = self.render_block(block, base_dir=base_dir, refs=refs)
+                changed.append(block_id)
+            entries.append(
+                {
+                    "id": block_id,
+                    "kind": block.kind,
+                    "start_line": block.start_line,
+                    "end_line": block.end_line,
+                    "html": html,
+                }
+            )
+
+        return {"blocks": entries, "changed": changed, "block_count": len(entries)}
+
+
+# Process-wide renderer used by ``/api/markdown/render/incremental``.
+incremental_renderer = IncrementalRenderer()
@@ -0,0 +1,237 @@
+"""
+line_index.py
+=============
+Ranged reads of large text files through a sparse line-offset index.
+
+``GET /api/files/read`` normally returns the whole file as one string, so a
+multi-hundred-megabyte log opened by accident costs several times its size
+in backend memory.  With ``start_line``/``line_count`` or ``offset``/
+``length`` it returns only that window instead, together with the file's
+total line count, so a viewer can lay out the whole file and fetch the rest
+lazily.
+
+:class:`LineIndex` memory-maps the file once and records how many newlines
+precede each :data:`_BLOCK_BYTES` block, which is a few kilobytes of index
+per hundred megabytes of text.  Finding the start of a line is then a
+bisect plus a scan of at most one block.  Indexes are cached by path, mtime
+and size in :data:`line_indexes`; the map itself is opened per request and
+closed again, so no file stays open (and locked, on Windows) between reads.
+
+Lines are numbered from 1 and split at ``"\\n"`` only; a file ending in a
+newline has an empty last line, as in :mod:`backend.windowed`.  ``"\\r\\n"``
+is returned as ``"\\n"``, like a full read.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+DEFAULT_RANGE_LINES = 1000
+MAX_RANGE_LINES = 20_000
+# A window never carries more than this much source, however few lines.
+MAX_RANGE_BYTES = 4 * 1024 * 1024
+
+_BLOCK_BYTES = 1 << 15
+_MAX_INDEXES = 16
+
+
+def _map(f) -> mmap.mmap | bytes:
+    """Read-only map of the open file *f* (``b""`` when it is empty)."""
+    if os.fstat(f.fileno()).st_size == 0:
+        # Zero-length files cannot be mapped.
+        return b""
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _char_start(data, pos: int, end: int) -> int:
+    """Move *pos* forward off UTF-8 continuation bytes (not past *end*)."""
+    while pos < end and 0x80 <= data[pos] < 0xC0:
+        pos += 1
+    return pos
+
+
+class LineIndex:
+    """Newline counts per fixed-size block of one file, built by one scan."""
+
+    def __init__(self, path: str, stamp: tuple[int, int], newlines: array):
+        self.path = path
+        self.stamp = stamp
+        # newlines[i]: "\n" bytes before block i; the last entry is the total.
+        self._newlines = newlines
+
+    @property
+    def size(self) -> int:
+        return self.stamp[1]
+
+    @property
+    def line_count(self) -> int:
+        return self._newlines[-1] + 1
+
+    @property
+    def version(self) -> str:
+        """Changes whenever the file's mtime or size does."""
+        return f"{self.stamp[0]:x}-{self.stamp[1]:x}"
+
+    @classmethod
+    def build(cls, path: str) -> LineIndex:
+        """Scan *path* once, a block at a time, without reading it into memory."""
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            data = _map(f)
+            try:
+                newlines = array("q", [0])
+                total = 0
+                for start in range(0, len(data), _BLOCK_BYTES):
+                    total += data[start : start + _BLOCK_BYTES].count(b"\n")
+                    newlines.append(total)
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+        if len(newlines) == 1:
+            newlines.append(0)
+        return cls(path, (st.st_mtime_ns, st.st_size), newlines)
+
+    def line_offset(self, data, line: int) -> int:
+        """Byte offset where 1-based *line* starts (the size, past the end)."""
+        if line <= 1:
+            return 0
+        if line > self.line_count:
+            return self.size
+        # The (line - 1)-th newline ends the previous line.
+        target = line - 1
+        block = bisect_left(self._newlines, target) - 1
+        pos = block * _BLOCK_BYTES - 1
+        for _ in range(target - self._newlines[block]):
+            pos = data.find(b"\n", pos + 1)
+        return pos + 1
+
+    def line_at(self, data, offset: int) -> int:
+        """1-based number of the line containing byte *offset*."""
+        offset = min(offset, self.size)
+        block = min(offset // _BLOCK_BYTES, len(self._newlines) - 2)
+        start = block * _BLOCK_BYTES
+        return self._newlines[block] + data[start:offset].count(b"\n") + 1
+
+    def _window(self, data, start: int, end: int, line_bounded: bool) -> dict:
+        limit = start + MAX_RANGE_BYTES
+        truncated = end > limit
+        if truncated:
+            end = limit
+            cut = data.rfind(b"\n", start, end) if line_bounded else -1
+            end = cut + 1 if cut >= start else end
+        # Never split a UTF-8 sequence at either edge.
+        start = _char_start(data, start, self.size)
+        end = max(start, _char_start(data, end, self.size))
+        content = bytes(data[start:end]).decode("utf-8", errors="replace")
+        start_line = self.line_at(data, start)
+        return {
+            "content": content.replace("\r\n", "\n"),
+            "start_line": start_line,
+            # The line of the window's last byte (its newline, if it has one).
+            "end_line": self.line_at(data, end - 1) if end > start else start_line,
+            "line_count": self.line_count,
+            "start_byte": start,
+            "end_byte": end,
+            "size": self.size,
+            "eof": end >= self.size,
+            "truncated": truncated,
+            "version": self.version,
+        }
+
+    def read_lines(self, data, start_line: int, line_count: int) -> dict:
+        """Window of *line_count* lines from 1-based *start_line*."""
+        start = self.line_offset(data, start_line)
+        end = self.line_offset(data, start_line + line_count)
+        return self._window(data, start, end, line_bounded=True)
+
+    def read_bytes(self, data, offset: int, length: int) -> dict:
+        """Window of *length* bytes from *offset*, snapped to whole characters."""
+        start = min(offset, self.size)
+        return self._window(data, start, min(start + length, self.size), False)
+
+
+class LineIndexCache:
+    """LRU of :class:`LineIndex` objects, invalidated by mtime/size."""
+
+    def __init__(self, max_entries: int = _MAX_INDEXES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, LineIndex] = OrderedDict()
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def get(self, path: str, stamp: tuple[int, int]) -> LineIndex:
+        """Return the index of *path* for *stamp*, building it if needed."""
+        with self._lock:
+            index = self._entries.get(path)
+            if index is not None and index.stamp == stamp:
+                self._entries.move_to_end(path)
+                return index
+        index = LineIndex.build(path)
+        with self._lock:
+            self.builds += 1
+            self._entries[path] = index
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+    def read(
+        self,
+        path: str,
+        *,
+        start_line: int | None = None,
+        line_count: int = DEFAULT_RANGE_LINES,
+        offset: int | None = None,
+        length: int = MAX_RANGE_BYTES,
+    ) -> dict:
+        """Read a line window (``start_line``) or a byte window (``offset``).
+
+        Raises OSError if the file cannot be read, ValueError for a bad range.
+        """
+        if (start_line is None) == (offset is None):
+            raise ValueError("Give exactly one of start_line or offset")
+        if start_line is not None and (start_line < 1 or line_count < 1):
+            raise ValueError("start_line and line_count must be at least 1")
+        if offset is not None and (offset < 0 or length < 1):
+            raise ValueError("offset must be >= 0 and length at least 1")
+        real = os.path.realpath(path)
+        for _attempt in range(2):
+            with open(real, "rb") as f:
+                st = os.fstat(f.fileno())
+                stamp = (st.st_mtime_ns, st.st_size)
+                index = self.get(real, stamp)
+                if index.stamp != stamp:
+                    # Changed while the index was being built; try again.
+                    continue
+                data = _map(f)
+                try:
+                    if start_line is not None:
+                        result = index.read_lines(
+                            data, start_line, min(line_count, MAX_RANGE_LINES)
+                        )
+                    else:
+                        result = index.read_bytes(
+                            data, offset, min(length, MAX_RANGE_BYTES)
+                        )
+                finally:
+                    if isinstance(data, mmap.mmap):
+                        data.close()
+                return {"path": path, **result}
+        raise OSError(f"File kept changing while it was read: {path}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.builds = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Process-wide cache used by ``GET /api/files/read`` for ranged reads.
+line_indexes = LineIndexCache()
@@ -0,0 +1,226 @@
+"""
+live_preview.py
+===============
+WebSocket live-preview sessions with server-pushed block patches.
+
+Each open editor tab keeps one WebSocket (``/api/markdown/live``) and one
+:class:`LivePreviewSession`.  The client sends its document once and then
+only text edits; the server answers with a patch that replaces the run of
+preview blocks that actually changed.  Per keystroke, traffic is roughly the
+size of the edit plus the HTML of the touched blocks, not the document.
+
+Protocol (JSON text frames)
+---------------------------
+Client → server::
+
+    {"type": "open", "content": "...", "base_dir": "/notes", "version": 0}
+    {"type": "edit", "version": 1,
+     "edits": [{"offset": 10, "delete": 0, "insert": "x"}]}
+
+Edits in one message apply in order, each against the text produced by the
+previous one; offsets count Unicode code points.
+
+Server → client::
+
+    {"type": "patch", "version": 1, "start": 3, "delete": 1,
+     "insert": [{"id": "b…", "kind": "paragraph", "start_line": 7,
+                 "end_line": 8, "html": "<p>…</p>"}],
+     "block_count": 42,
+     "outline_patches": [{"start": 2, "delete": 1, "line_delta": 0,
+                          "insert": [{"level": 2, "text": "Usage",
+                                      "anchor": "usage", "line": 7}]}]}
+    {"type": "error", "version": 0, "detail": "...", "resync": true}
+
+A patch means: remove ``delete`` blocks at index ``start`` and insert
+``insert`` there.  Edits that arrive while a render is running are queued
+and coalesced, so superseded intermediate states are never rendered.  After
+an error with ``resync`` the client should send a fresh ``open``.
+
+The first patch after an ``open`` carries the whole ``outline``; later ones
+carry ``outline_patches`` only when headings changed, to be applied in order
+(see :meth:`backend.outline.OutlineIndex.replace_lines`).  The outline is
+updated per edit from the edited lines only.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+
+from backend.blocks import reference_definitions, split_blocks
+from backend.incremental import IncrementalRenderer, incremental_renderer
+from backend.outline import OutlineIndex, edit_line_range
+
+
+class LivePreviewSession:
+    """Server-side copy of one tab's document and its rendered block ids."""
+
+    def __init__(self, renderer: IncrementalRenderer = incremental_renderer):
+        self.renderer = renderer
+        self.text = ""
+        self.base_dir: str | None = None
+        self.version = 0
+        self._ids: list[str] = []
+        self.outline = OutlineIndex()
+        self._outline_patches: list[dict] = []
+        self._send_outline = False
+
+    def open(self, content: str, base_dir: str | None = None, version: int = 0):
+        """Replace the whole document (first message, or after a resync)."""
+        self.text = content
+        self.base_dir = base_dir
+        self.version = version
+        self.outline.reset(content)
+        self._outline_patches = []
+        self._send_outline = True
+
+    def apply_edits(self, edits: list[dict], version: int) -> None:
+        """Apply *edits* in order; raises ValueError if one is out of range."""
+        text = self.text
+        for edit in edits:
+            offset = int(edit.get("offset", 0))
+            delete = int(edit.get("delete", 0))
+            insert = str(edit.get("insert", ""))
+            if offset < 0 or delete < 0 or offset + delete > len(text):
+                raise ValueError(
+                    f"Edit out of range: offset={offset} delete={delete} "
+                    f"length={len(text)}"
+                )
+            outline_patch = self.outline.replace_lines(
+                *edit_line_range(text, offset, delete, insert)
+            )
+            if outline_patch is not None:
+                self._outline_patches.append(outline_patch)
+            text = text[:offset] + insert + text[offset + delete :]
+        self.text = text
+        self.version = version
+
+    def process(self, messages: list[dict]) -> list[dict]:
+        """Apply queued client messages and return the replies to send.
+
+        All messages are applied before rendering once, so a burst of edits
+        produces a single patch for the latest version.
+        """
+        try:
+            for message in messages:
+                kind = message.get("type")
+                if kind == "open":
+                    self.open(
+                        str(message.get("content", "")),
+                        message.get("base_dir"),
+                        int(message.get("version", 0)),
+                    )
+                elif kind == "edit":
+                    self.apply_edits(
+                        list(message.get("edits", [])),
+                        int(message.get("version", self.version + 1)),
+                    )
+                else:
+                    raise ValueError(f"Unknown message type: {kind!r}")
+        except (TypeError, ValueError, AttributeError) as exc:
+            # The client's view of the document can no longer be trusted.
+            self._ids = []
+            return [
+                {
+                    "type": "error",
+                    "version": self.version,
+                    "detail": str(exc),
+                    "resync": True,
+                }
+            ]
+        return [self.patch()]
+
+    def patch(self) -> dict:
+        """Render the current text and diff its blocks against the last patch."""
+        blocks = split_blocks(self.text)
+        refs = reference_definitions(blocks)
+        ids = self.renderer.block_ids(blocks, refs)
+        old = self._ids
+
+        start = 0
+        limit = min(len(old), len(ids))
+        while start < limit and old[start] == ids[start]:
+            start += 1
+        end = 0
+        while end < limit - start and old[-1 - end] == ids[-1 - end]:
+            end += 1
+
+        inserted = []
+        for block, block_id in zip(
+            blocks[start : len(ids) - end], ids[start : len(ids) - end], strict=True
+        ):
+            inserted.append(
+                {
+                    "id": block_id,
+                    "kind": block.kind,
+                    "start_line": block.start_line,
+                    "end_line": block.end_line,
+                    "html": self.renderer.render_block(
+                        block, base_dir=self.base_dir, refs=refs
+                    ),
+                }
+            )
+
+        self._ids = ids
+        reply = {
+            "type": "patch",
+            "version": self.version,
+            "start": start,
+            "delete": len(old) - start - end,
+            "insert": inserted,
+            "block_count": len(ids),
+        }
+        if self._send_outline:
+            reply["outline"] = self.outline.outline()
+        elif self._outline_patches:
+            reply["outline_patches"] = self._outline_patches
+        self._send_outline = False
+        self._outline_patches = []
+        return reply
+
+
+async def serve_live_preview(websocket: WebSocket) -> None:
+    """Run one live-preview session until the client disconnects."""
+    await websocket.accept()
+    session = LivePreviewSession()
+    pending: list[dict] = []
+    wake = asyncio.Event()
+    closed = False
+
+    async def receive() -> None:
+        nonlocal closed
+        try:
+            while True:
+                raw = await websocket.receive_text()
+                try:
+                    message = json.loads(raw)
+                except ValueError:
+                    message = {"type": "invalid JSON"}
+                if not isinstance(message, dict):
+                    message = {"type": "invalid message"}
+                pending.append(message)
+                wake.set()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            closed = True
+            wake.set()
+
+    receiver = asyncio.create_task(receive())
+    try:
+        while True:
+            await wake.wait()
+            wake.clear()
+            if closed:
+                break
+            messages = pending[:]
+            pending.clear()
+            if not messages:
+                continue
+            for reply in await run_in_threadpool(session.process, messages):
+                await websocket.send_json(reply)
+    finally:
+        receiver.cancel()
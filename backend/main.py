@@ -11,10 +11,12 @@ or:
 
 from __future__ import annotations
 
+import multiprocessing
 import os
 import sys
 import threading
 import time
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 
@@ -26,15 +28,40 @@ if _ROOT not in sys.path:
     sys.path.insert(0, _ROOT)
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 
+from backend.file_events import file_event_hub
+from backend.live_preview import serve_live_preview
+from backend.process_render import process_renderer
+from backend.quick_open import quick_open_index
 from backend.routers import ai, export, files, markdown
+from backend.search_index import search_index
+from backend.workspace_index import workspace_index
+from backend.workspace_stats import workspace_stats
+from backend.workspace_watcher import workspace_watcher
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Start render workers in the background so the sidecar is reachable
+    # immediately; the first large document then skips process start-up.
+    threading.Thread(target=process_renderer.warm_up, daemon=True).start()
+    yield
+    process_renderer.shutdown()
+    workspace_stats.shutdown()
+    workspace_index.shutdown()
+    search_index.shutdown()
+    quick_open_index.shutdown()
+    file_event_hub.shutdown()
+    workspace_watcher.shutdown()
+
 
 app = FastAPI(
     title="Markdown Reader API",
     description="Local Python backend for Markdown Reader desktop application.",
     version="2.0.0",
+    lifespan=lifespan,
 )
 
 # Allow the Next.js dev server and Tauri webview to communicate with us.
@@ -63,6 +90,15 @@ def health() -> dict:
     return {"status": "ok"}
 
 
+@app.websocket("/api/markdown/live")
+async def live_preview(websocket: WebSocket) -> None:
+    """Per-tab live preview: client sends edits, server pushes block patches.
+
+    See ``backend/live_preview.py`` for the message protocol.
+    """
+    await serve_live_preview(websocket)
+
+
 def _find_free_port() -> int:
     """Ask the OS for an available TCP port on 127.0.0.1."""
     import socket
@@ -111,4 +147,6 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    # Required for the render process pool in PyInstaller-frozen builds.
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,406 @@
+"""
+outline.py
+==========
+Document outline (ATX headings) with linear-time and incremental extraction.
+
+:func:`extract_outline` is a single forward scan over the source lines that
+tracks fenced-code state, so ``#`` lines inside fenced code are not
+headings and the cost is linear in the document size.
+:func:`outline_from_blocks` reads the same headings off an existing
+``backend.blocks`` split, for callers that split the document anyway.
+
+:class:`OutlineIndex` keeps the lines, headings and fenced-code spans of
+one document.  :meth:`OutlineIndex.replace_lines` re-scans only the edited
+lines, continuing past them just until the fence state agrees with the
+previous scan again.  Headings after that point are reused, with their
+line numbers shifted.  Live-preview sessions (``backend.live_preview``) use
+it to keep the outline current on every keystroke.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from bisect import bisect_left
+from collections.abc import Iterable
+
+from backend.blocks import Block
+
+_FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})(.*)$")
+_ATX_RE = re.compile(r"^ {0,3}(#{1,6})\s+(.*?)(?:\s+#+)?\s*$")
+# Only lines starting with one of these can open/close a fence or be a heading.
+_CANDIDATE_STARTS = frozenset("#`~ ")
+
+# Inline Markdown stripped from heading labels.
+_INLINE_MARKUP_RE = re.compile(
+    r"\*{1,2}|_{1,2}|`|~~|!\[.*?\]\(.*?\)|\[([^\]]*)\]\(.*?\)"
+)
+# Characters that should be stripped when building a GitHub-style slug
+_NON_WORD_RE = re.compile(r"[^\w\s-]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# (level, plain text, base slug) of one heading.
+HeadingInfo = tuple[int, str, str]
+# Open fenced block: (fence run such as "```", 0-based line it opened on).
+_Fence = tuple[str, int]
+# Fenced-code span: (open line, close line), 0-based.
+_Span = tuple[int, int]
+# Close line of a fence left open at the end of the document.
+_UNCLOSED = 1 << 62
+
+
+def slugify(text: str) -> str:
+    """Produce a GitHub-compatible heading anchor from heading text."""
+    text = text.lower()
+    # Normalise Unicode so accented chars are preserved but combining marks
+    # that have no direct ASCII equivalent are stripped.
+    text = unicodedata.normalize("NFC", text)
+    text = _NON_WORD_RE.sub("", text)
+    text = _WHITESPACE_RE.sub("-", text.strip())
+    return text
+
+
+def heading_info(level: int, raw_text: str) -> HeadingInfo:
+    """Return ``(level, plain text, base slug)`` for a heading's source text."""
+    # Strip common inline Markdown so the label is readable plain text.
+    plain = _INLINE_MARKUP_RE.sub(r"\1", raw_text).strip()
+    return level, plain, slugify(plain)
+
+
+def outline_nodes(lines: list[int], infos: list[HeadingInfo]) -> list[dict]:
+    """Build outline nodes from 1-based heading *lines* and their *infos*.
+
+    Duplicate slugs get the ``-1``, ``-2`` … suffix (GitHub rule).
+    """
+    slug_counts: dict[str, int] = {}
+    nodes = []
+    for line, (level, text, base) in zip(lines, infos, strict=True):
+        count = slug_counts.get(base, 0)
+        slug_counts[base] = count + 1
+        nodes.append(
+            {
+                "level": level,
+                "text": text,
+                "anchor": base if count == 0 else f"{base}-{count}",
+                "line": line,
+            }
+        )
+    return nodes
+
+
+def _closes(line: str, fence: str) -> bool:
+    match = _FENCE_RE.match(line)
+    return (
+        match is not None
+        and match.group(1)[0] == fence[0]
+        and len(match.group(1)) >= len(fence)
+        and not match.group(2).strip()
+    )
+
+
+class _Scan:
+    """Result of scanning a run of lines."""
+
+    __slots__ = ("lines", "infos", "spans", "fence", "stop")
+
+    def __init__(self, fence: _Fence | None):
+        self.lines: list[int] = []  # 1-based heading lines
+        self.infos: list[HeadingInfo] = []
+        self.spans: list[_Span] = []
+        self.fence = fence
+        self.stop = 0
+
+
+def _scan(
+    lines: list[str],
+    start: int,
+    fence: _Fence | None = None,
+    min_stop: int | None = None,
+    synced=None,
+) -> _Scan:
+    """Scan *lines* from index *start* with the given fence state.
+
+    Without *synced* the scan runs to the end.  Otherwise it stops at the
+    first index ``>= min_stop`` outside fenced code for which
+    ``synced(index)`` is true.
+    """
+    result = _Scan(fence)
+    n = len(lines)
+    i = start
+    while i < n:
+        if synced is not None and i >= min_stop and fence is None and synced(i):
+            break
+        line = lines[i]
+        if line and line[0] in _CANDIDATE_STARTS:
+            if fence is not None:
+                if _closes(line, fence[0]):
+                    result.spans.append((fence[1], i))
+                    fence = None
+            else:
+                match = _FENCE_RE.match(line)
+                if match:
+                    fence = (match.group(1), i)
+                else:
+                    match = _ATX_RE.match(line)
+                    if match:
+                        result.lines.append(i + 1)
+                        result.infos.append(
+                            heading_info(len(match.group(1)), match.group(2))
+                        )
+        i += 1
+    if fence is not None and i >= n:
+        result.spans.append((fence[1], _UNCLOSED))
+        fence = None
+    result.fence = fence
+    result.stop = i
+    return result
+
+
+def extract_outline(markdown: str) -> list[dict]:
+    """Return a flat list of heading nodes extracted from *markdown*.
+
+    Each node has the following keys:
+
+    * ``level``  – heading depth (1–6)
+    * ``text``   – raw heading text (inline markup stripped)
+    * ``anchor`` – GitHub-style slug usable as ``#anchor`` in URLs / scroll targets
+    * ``line``   – 1-based line number of the heading in the source text
+    """
+    scan = _scan((markdown or "").split("\n"), 0)
+    return outline_nodes(scan.lines, scan.infos)
+
+
+def outline_from_blocks(blocks: Iterable[Block]) -> list[dict]:
+    """:func:`extract_outline` from the blocks of an existing
+    :func:`backend.blocks.split_blocks` scan.
+
+    An ATX heading is a block of its own, so no line is scanned again.
+    """
+    lines: list[int] = []
+    infos: list[HeadingInfo] = []
+    for block in blocks:
+        if block.kind == "heading":
+            match = _ATX_RE.match(block.text)
+            if match:
+                lines.append(block.start_line)
+                infos.append(heading_info(len(match.group(1)), match.group(2)))
+    return outline_nodes(lines, infos)
+
+
+def _anchor(base: str, count: int) -> str:
+    return base if count == 0 else f"{base}-{count}"
+
+
+class _ShiftedList:
+    """Sorted ints with a lazily applied shift, like a gap buffer.
+
+    Entries at index ``>= pivot`` are stored without the pending shift.
+    Splicing moves the pivot to the edit, so consecutive edits in the same
+    area touch only the entries between them instead of every later entry.
+    """
+
+    __slots__ = ("values", "pivot", "pending")
+
+    def __init__(self, values: list[int]):
+        self.values = values
+        self.pivot = len(values)
+        self.pending = 0
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, i: int) -> int:
+        value = self.values[i]
+        return value + self.pending if i >= self.pivot else value
+
+    def slice(self, lo: int, hi: int) -> list[int]:
+        self._move_pivot(hi)
+        return self.values[lo:hi]
+
+    def bisect_left(self, x: int) -> int:
+        """Index of the first entry ``>= x``."""
+        values, pivot = self.values, self.pivot
+        if pivot and values[pivot - 1] >= x:
+            return bisect_left(values, x, 0, pivot)
+        return bisect_left(values, x - self.pending, pivot)
+
+    def _move_pivot(self, index: int) -> None:
+        values, pivot, pending = self.values, self.pivot, self.pending
+        if pending and index > pivot:
+            values[pivot:index] = map(pending.__add__, values[pivot:index])
+        elif pending and index < pivot:
+            values[index:pivot] = map((-pending).__add__, values[index:pivot])
+        self.pivot = index
+
+    def splice(self, lo: int, hi: int, new: list[int], delta: int) -> None:
+        """Replace entries ``lo:hi`` with *new* and add *delta* to later ones."""
+        self._move_pivot(hi)
+        self.values[lo:hi] = new
+        self.pivot = lo + len(new)
+        self.pending += delta
+
+    def tolist(self) -> list[int]:
+        self._move_pivot(len(self.values))
+        return list(self.values)
+
+
+class OutlineIndex:
+    """Incrementally maintained outline of one document.
+
+    Headings are kept as parallel lists (line, info, anchor) and fenced code
+    as parallel lists of opening/closing lines.  An edit splices only the
+    entries in the re-scanned region; line numbers after it are shifted
+    lazily (see :class:`_ShiftedList`).
+    """
+
+    def __init__(self, text: str = ""):
+        self.reset(text)
+
+    def reset(self, text: str) -> None:
+        """Replace the whole document and scan it."""
+        self.lines = (text or "").split("\n")
+        scan = _scan(self.lines, 0)
+        self._heading_lines = _ShiftedList(scan.lines)
+        self._infos = scan.infos
+        self._bases = [info[2] for info in scan.infos]
+        counts: dict[str, int] = {}
+        self._anchors = []
+        for base in self._bases:
+            self._anchors.append(_anchor(base, counts.get(base, 0)))
+            counts[base] = counts.get(base, 0) + 1
+        self._opens = _ShiftedList([span[0] for span in scan.spans])
+        self._closes = _ShiftedList([span[1] for span in scan.spans])
+
+    def _fence_before(self, index: int) -> _Fence | None:
+        """Fence state just before line *index* (0-based), from the last scan."""
+        pos = self._opens.bisect_left(index) - 1
+        if pos >= 0 and self._closes[pos] >= index:
+            open_line = self._opens[pos]
+            fence = _FENCE_RE.match(self.lines[open_line])
+            return (fence.group(1), open_line)  # type: ignore[union-attr]
+        return None
+
+    def replace_lines(self, start: int, stop: int, new_lines: list[str]) -> dict | None:
+        """Replace lines ``start:stop`` (0-based) with *new_lines*.
+
+        Returns None if the outline is unchanged, otherwise a patch::
+
+            {"start": 3, "delete": 1, "insert": [<node>, …], "line_delta": 1}
+
+        meaning: replace ``delete`` nodes at index ``start`` with ``insert``,
+        then add ``line_delta`` to the ``line`` of every later node.
+        """
+        fence = self._fence_before(start)
+        delta = len(new_lines) - (stop - start)
+        opens, closes = self._opens, self._closes
+
+        def old_outside(i: int) -> bool:
+            old = i - delta
+            pos = opens.bisect_left(old) - 1
+            return pos < 0 or closes[pos] < old
+
+        self.lines[start:stop] = new_lines
+        scan = _scan(
+            self.lines,
+            start,
+            fence,
+            min_stop=start + len(new_lines),
+            synced=old_outside,
+        )
+        resume_old = scan.stop - delta  # first old line reused as-is
+
+        # A fence straddling *start* is re-derived by the scan.
+        span_lo = opens.bisect_left(fence[1] if fence is not None else start)
+        span_hi = opens.bisect_left(resume_old)
+        opens.splice(span_lo, span_hi, [span[0] for span in scan.spans], delta)
+        closes.splice(span_lo, span_hi, [span[1] for span in scan.spans], delta)
+
+        lines = self._heading_lines
+        lo = lines.bisect_left(start + 1)
+        hi = lines.bisect_left(resume_old + 1)
+        same_infos = self._infos[lo:hi] == scan.infos
+        shifted = delta != 0 and hi < len(lines)
+        if same_infos and lines.slice(lo, hi) == scan.lines and not shifted:
+            return None
+
+        lines.splice(lo, hi, scan.lines, delta)
+        end = lo + len(scan.lines)
+        deleted = hi - lo
+        if not same_infos:
+            end, deleted = self._splice_headings(lo, hi, scan.infos)
+        return {
+            "start": lo,
+            "delete": deleted,
+            "insert": self._nodes(lo, end),
+            "line_delta": delta,
+        }
+
+    def _splice_headings(
+        self, lo: int, hi: int, infos: list[HeadingInfo]
+    ) -> tuple[int, int]:
+        """Replace heading infos ``lo:hi`` and re-number duplicate anchors.
+
+        Returns ``(end, deleted)``: the new nodes ``lo:end`` replace the
+        ``deleted`` old nodes at *lo*.
+        """
+        bases = self._bases
+        affected = set(bases[lo:hi])
+        new_bases = [info[2] for info in infos]
+        affected.update(new_bases)
+        self._infos[lo:hi] = infos
+        bases[lo:hi] = new_bases
+        self._anchors[lo:hi] = new_bases
+        end = lo + len(infos)
+        changed_end = end
+        for base in affected:
+            occurrences = bases.count(base)
+            if occurrences == 0:
+                continue
+            if occurrences == 1:
+                positions = [bases.index(base)]
+            else:
+                positions = [i for i, b in enumerate(bases) if b == base]
+            for count, i in enumerate(positions):
+                anchor = _anchor(base, count)
+                if self._anchors[i] != anchor:
+                    self._anchors[i] = anchor
+                    if i >= end:
+                        changed_end = max(changed_end, i + 1)
+        return changed_end, (hi - lo) + (changed_end - end)
+
+    def _nodes(self, lo: int, hi: int) -> list[dict]:
+        return [
+            {"level": level, "text": text, "anchor": anchor, "line": line}
+            for line, (level, text, _base), anchor in zip(
+                self._heading_lines.slice(lo, hi),
+                self._infos[lo:hi],
+                self._anchors[lo:hi],
+                strict=True,
+            )
+        ]
+
+    def outline(self) -> list[dict]:
+        """Return the current outline nodes (see :func:`extract_outline`)."""
+        return self._nodes(0, len(self._heading_lines))
+
+    def __len__(self) -> int:
+        return len(self._heading_lines)
+
+
+def edit_line_range(
+    text: str, offset: int, delete: int, insert: str
+) -> tuple[int, int, list[str]]:
+    """Translate a character edit of *text* into a line replacement.
+
+    Returns ``(start, stop, new_lines)`` for :meth:`OutlineIndex.replace_lines`:
+    the 0-based lines ``start:stop`` of *text* that the edit touches and the
+    lines that replace them.
+    """
+    line_start = text.rfind("\n", 0, offset) + 1
+    line_end = text.find("\n", offset + delete)
+    if line_end == -1:
+        line_end = len(text)
+    start = text.count("\n", 0, line_start)
+    stop = start + text.count("\n", line_start, line_end) + 1
+    new = text[line_start:offset] + insert + text[offset + delete : line_end]
+    return start, stop, new.split("\n")
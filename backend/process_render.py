@@ -0,0 +1,208 @@
+"""
+process_render.py
+=================
+Out-of-process rendering for very large Markdown documents.
+
+Rendering is pure-Python CPU work that holds the GIL.  A multi-megabyte
+document rendered on a uvicorn worker thread stalls every other request,
+including the ``/api/health`` probe the Tauri shell polls.  Documents at or
+above a size threshold are therefore rendered in a warm
+``ProcessPoolExecutor`` whose workers have markdown2 and the render helpers
+imported up front.  Smaller documents keep the in-process fast path.
+
+A render that runs past the deadline is abandoned: its worker processes are
+terminated and the pool is rebuilt on next use.
+
+Configuration (environment variables):
+
+* ``MARKDOWN_READER_PROCESS_RENDER_THRESHOLD`` – size in characters at which
+  rendering moves to the pool (default 1,000,000; ``0`` disables the pool).
+* ``MARKDOWN_READER_RENDER_TIMEOUT`` – deadline in seconds (default 30).
+* ``MARKDOWN_READER_RENDER_WORKERS`` – number of worker processes (default 1).
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_THRESHOLD = 1_000_000
+_DEFAULT_TIMEOUT = 30.0
+_DEFAULT_WORKERS = 1
+
+
+class RenderTimeoutError(TimeoutError):
+    """Raised when an out-of-process render exceeds its deadline."""
+
+
+def _env_number(name: str, default: float) -> float:
+    value = os.environ.get(name, "").strip()
+    try:
+        return float(value) if value else default
+    except ValueError:
+        return default
+
+
+def _warm_worker() -> None:
+    """Pool initializer: pay the import cost before the first real job."""
+    import markdown2  # noqa: F401
+
+    import backend.render_helpers  # noqa: F401
+    import backend.renderer  # noqa: F401
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _render_in_worker(
+    text: str,
+    base_dir: str | None,
+    fragment: bool,
+    dark_mode: bool,
+    font_family: str,
+    font_size: int,
+    engine: str | None,
+    highlight: bool,
+    asset_origin: str,
+    source_map: bool,
+) -> str:
+    from backend.renderer import render_uncached
+
+    return render_uncached(
+        text,
+        base_dir=base_dir,
+        fragment=fragment,
+        engine=engine,
+        highlight=highlight,
+        asset_origin=asset_origin,
+        source_map=source_map,
+        dark_mode=dark_mode,
+        font_family=font_family,
+        font_size=font_size,
+    )
+
+
+class ProcessRenderer:
+    """Lazily started, self-healing process pool for large renders."""
+
+    def __init__(
+        self,
+        threshold: int = _DEFAULT_THRESHOLD,
+        timeout: float = _DEFAULT_TIMEOUT,
+        workers: int = _DEFAULT_WORKERS,
+    ):
+        self.threshold = threshold
+        self.timeout = timeout
+        self.workers = max(1, workers)
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def should_offload(self, text: str) -> bool:
+        """Return True if *text* is large enough to render out of process."""
+        return self.enabled and len(text) >= self.threshold
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # "spawn" avoids forking a process that is running uvicorn's
+                # thread pool, which can deadlock on inherited locks.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_worker,
+                )
+            return self._executor
+
+    def warm_up(self) -> None:
+        """Start every worker now so the first large render pays no startup."""
+        if not self.enabled:
+            return
+        pool = self._pool()
+        try:
+            for future in [pool.submit(_ping) for _ in range(self.workers)]:
+                future.result(timeout=max(self.timeout, 60))
+        except Exception:
+            logger.warning("Render worker warm-up failed", exc_info=True)
+
+    def _terminate(self) -> None:
+        """Kill the current workers (abandoning in-flight jobs) and drop the pool."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        terminate = getattr(executor, "terminate_workers", None)  # Python 3.14+
+        if terminate is not None:
+            terminate()
+            return
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def render(
+        self,
+        text: str,
+        *,
+        base_dir: str | None = None,
+        fragment: bool = False,
+        dark_mode: bool = False,
+        font_family: str = "system-ui, sans-serif",
+        font_size: int = 14,
+        engine: str | None = None,
+        highlight: bool = True,
+        asset_origin: str = "",
+        source_map: bool = False,
+    ) -> str:
+        """Render *text* in a worker process, raising on deadline overrun."""
+        future = self._pool().submit(
+            _render_in_worker,
+            text,
+            base_dir,
+            fragment,
+            dark_mode,
+            font_family,
+            font_size,
+            engine,
+            highlight,
+            asset_origin,
+            source_map,
+        )
+        try:
+            return future.result(timeout=self.timeout)
+        except FuturesTimeoutError:
+            if not future.cancel():
+                self._terminate()
+            raise RenderTimeoutError(
+                f"Rendering took longer than {self.timeout:g} s and was cancelled."
+            ) from None
+        except BrokenProcessPool:
+            self._terminate()
+            raise
+
+    def shutdown(self) -> None:
+        """Stop the pool (used on application shutdown)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Process-wide pool used by ``backend.renderer.render_markdown``.
+process_renderer = ProcessRenderer(
+    threshold=int(
+        _env_number("MARKDOWN_READER_PROCESS_RENDER_THRESHOLD", _DEFAULT_THRESHOLD)
+    ),
+    timeout=_env_number("MARKDOWN_READER_RENDER_TIMEOUT", _DEFAULT_TIMEOUT),
+    workers=int(_env_number("MARKDOWN_READER_RENDER_WORKERS", _DEFAULT_WORKERS)),
+)
@@ -0,0 +1,407 @@
+"""
+quick_open.py
+=============
+Fuzzy "quick open" file finder for ``GET /api/files/quick-open``.
+
+Finding a file by name used to mean expanding ``/api/files/list`` folder by
+folder.  :class:`QuickOpenIndex` crawls a workspace root once, keeps every
+file path below it in memory with a trigram index, and applies the
+``watchdog`` events for the root as they arrive, so the tree is never
+crawled again.
+
+A query is matched against paths relative to the root, case-insensitively
+and ignoring spaces, in two tiers:
+
+1. Paths that contain the query as a substring.  Candidates come from the
+   posting list of the query's rarest trigram, so only a small part of the
+   index is looked at.  Queries of one or two characters match file names
+   that start with them instead.
+2. Only if tier 1 has fewer results than requested: paths that contain the
+   query's characters in order (``rdme`` finds ``README.md``).  A bitmask per
+   character narrows these down to the paths containing every character of
+   the query before each candidate is checked.
+
+Results rank tier 1 first (file names starting with the query, then file
+names containing it, then other paths, shorter first) and fuzzy matches by
+how tightly the characters cluster.  Typing usually extends the previous
+query, and the matches of ``abc`` can only be among those of ``ab``, so the
+last few match sets are kept and filtered instead of searching again.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+
+from backend.workspace_watcher import workspace_watcher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESULTS = 50
+MAX_RESULTS = 500
+MAX_PATHS = 200_000
+_MAX_ROOTS = 4
+_CACHED_QUERIES = 16
+# Compact posting lists once this share of the ids are deleted paths.
+_COMPACT_RATIO = 0.5
+
+
+def _grams(lower: str, name_start: int) -> set[str]:
+    """Index keys of one lowercase relative path.
+
+    Every trigram, plus the first one and two characters of the file name
+    behind a ``"\\0"`` marker for short queries.
+    """
+    keys = {lower[i : i + 3] for i in range(len(lower) - 2)}
+    name = lower[name_start:]
+    keys.update(("\0" + name[:1], "\0" + name[:2]))
+    return keys
+
+
+def _fuzzy_pattern(query: str) -> re.Pattern:
+    """Regex matching text that contains *query*'s characters in order.
+
+    Each step skips characters other than the next one, so matching never
+    backtracks; group 1 spans the leftmost such match.
+    """
+    steps = [f"[^{re.escape(c)}]*+{re.escape(c)}" for c in query[1:]]
+    first = re.escape(query[0])
+    return re.compile(f"[^{first}]*+({first}{''.join(steps)})")
+
+
+def _subsequence(text: str, query: str) -> list[int] | None:
+    """Leftmost positions of *query*'s characters in *text*, in order."""
+    positions = []
+    pos = 0
+    for char in query:
+        pos = text.find(char, pos)
+        if pos == -1:
+            return None
+        positions.append(pos)
+        pos += 1
+    return positions
+
+
+@dataclass(slots=True)
+class _Matches:
+    # Ids of tier-1 matches (for queries under 3 characters: name prefixes).
+    substring: list[int]
+    # Ids of every in-order match, or None if tier 2 was not needed.
+    fuzzy: list[int] | None
+
+
+class _PathSet:
+    """Paths below one root, their trigram postings and recent matches.
+
+    Paths get consecutive ids; a deleted path leaves ``None`` behind until
+    the next compaction.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.paths: list[str | None] = []
+        self.lower: list[str | None] = []
+        self.name_starts: list[int] = []
+        self.ids: dict[str, int] = {}
+        self.postings: dict[str, list[int]] = {}
+        # chars[c][i] is 1 if path i contains c (one byte per path, so that
+        # masks AND together as integers and select ids without a loop).
+        self.chars: dict[str, bytearray] = {}
+        self.truncated = False
+        self.watch = None
+        self._queries: OrderedDict[str, _Matches] = OrderedDict()
+
+    # ── updates ──────────────────────────────────────────────────────────────
+
+    def add(self, relative: str) -> None:
+        if relative in self.ids:
+            return
+        if len(self.ids) >= MAX_PATHS:
+            self.truncated = True
+            return
+        index = len(self.paths)
+        lower = relative.lower()
+        name_start = lower.rfind("/") + 1
+        self.paths.append(relative)
+        self.lower.append(lower)
+        self.name_starts.append(name_start)
+        self.ids[relative] = index
+        postings = self.postings
+        for key in _grams(lower, name_start):
+            posting = postings.get(key)
+            if posting is None:
+                postings[key] = [index]
+            else:
+                posting.append(index)
+        for char in set(lower):
+            mask = self.chars.get(char)
+            if mask is None:
+                mask = self.chars[char] = bytearray()
+            if len(mask) <= index:
+                mask.extend(bytes(index + 4096 - len(mask)))
+            mask[index] = 1
+        self._queries.clear()
+
+    def remove(self, relative: str) -> None:
+        index = self.ids.pop(relative, None)
+        if index is None:
+            return
+        # Posting lists keep the id; lookups skip deleted paths.
+        for char in set(self.lower[index]):
+            self.chars[char][index] = 0
+        self.paths[index] = self.lower[index] = None
+        self._queries.clear()
+        if len(self.paths) - len(self.ids) > _COMPACT_RATIO * len(self.paths):
+            self._compact()
+
+    def remove_below(self, relative: str) -> None:
+        prefix = relative + "/"
+        for path in [p for p in self.ids if p.startswith(prefix)]:
+            self.remove(path)
+
+    def crawl(self, directory: str) -> None:
+        """Add every file below *directory*, skipping hidden entries."""
+        skip = len(self.root.rstrip(os.sep)) + 1
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                        continue
+                except OSError:
+                    continue
+                self.add(entry.path[skip:].replace(os.sep, "/"))
+
+    def relative(self, path: str) -> str:
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def _compact(self) -> None:
+        live = [p for p in self.paths if p is not None]
+        self.paths, self.lower, self.name_starts = [], [], []
+        self.ids, self.postings, self.chars = {}, {}, {}
+        for path in live:
+            self.add(path)
+
+    # ── matching ─────────────────────────────────────────────────────────────
+
+    def _containing(self, query: str) -> list[int]:
+        """Ids of the paths that contain every character of *query*."""
+        mask = -1
+        for char in set(query):
+            bits = self.chars.get(char)
+            if bits is None:
+                return []
+            mask &= int.from_bytes(bits, "little")
+        count = len(self.paths)
+        data = mask.to_bytes(count + 1, "little", signed=True)
+        return list(itertools.compress(range(count), data))
+
+    def _fuzzy_ids(self, query: str, candidates: list[int] | None = None) -> list[int]:
+        """Ids among *candidates* (default: all) matching *query* in order."""
+        if candidates is None:
+            candidates = self._containing(query)
+        texts = map(self.lower.__getitem__, candidates)
+        return list(
+            itertools.compress(candidates, map(_fuzzy_pattern(query).match, texts))
+        )
+
+    def _refine(self, query: str, limit: int) -> _Matches:
+        """Matches for *query*, filtered from a cached prefix when possible."""
+        cached = self._queries.get(query)
+        if cached is not None:
+            self._queries.move_to_end(query)
+            # A smaller limit may have been filled without the fuzzy tier.
+            if cached.fuzzy is None and len(cached.substring) < limit:
+                cached.fuzzy = self._fuzzy_ids(query)
+            return cached
+        lower = self.lower
+        previous = None
+        for length in range(len(query) - 1, 2, -1):
+            previous = self._queries.get(query[:length])
+            if previous is not None:
+                break
+        if previous is not None:
+            substring = [i for i in previous.substring if query in lower[i]]
+            fuzzy = previous.fuzzy
+        elif len(query) < 3:
+            posting = self.postings.get("\0" + query, [])
+            substring = [i for i in posting if lower[i] is not None]
+            fuzzy = []  # short queries have no fuzzy tier
+        else:
+            grams = [self.postings.get(query[i : i + 3]) for i in range(len(query) - 2)]
+            rarest = [] if None in grams else min(grams, key=len)
+            substring = [
+                i for i in rarest if lower[i] is not None and query in lower[i]
+            ]
+            fuzzy = None
+        if fuzzy is not None:
+            fuzzy = self._fuzzy_ids(query, fuzzy) if fuzzy else fuzzy
+        elif len(substring) < limit:
+            fuzzy = self._fuzzy_ids(query)
+        matches = _Matches(substring, fuzzy)
+        self._queries[query] = matches
+        while len(self._queries) > _CACHED_QUERIES:
+            self._queries.popitem(last=False)
+        return matches
+
+    def _ranked(self, query: str, matches: _Matches, limit: int) -> list[int]:
+        """The best *limit* ids, filling the result one rank group at a time."""
+        lower, starts = self.lower, self.name_starts
+
+        def shortest(ids: list[int], count: int) -> list[int]:
+            return heapq.nsmallest(count, ids, key=lambda i: (len(lower[i]), lower[i]))
+
+        found = [i for i in matches.substring if lower[i].find(query, starts[i]) >= 0]
+        prefix = [i for i in found if lower[i].startswith(query, starts[i])]
+        ranked = shortest(prefix, limit)
+        if len(ranked) < limit:
+            inside = [i for i in found if not lower[i].startswith(query, starts[i])]
+            ranked += shortest(inside, limit - len(ranked))
+        if len(ranked) < limit and len(found) < len(matches.substring):
+            named = set(found)
+            other = [i for i in matches.substring if i not in named]
+            ranked += shortest(other, limit - len(ranked))
+        if len(ranked) < limit and matches.fuzzy:
+            pattern = _fuzzy_pattern(query)
+            substring = set(matches.substring)
+
+            def span(i: int) -> tuple:
+                return (len(pattern.match(lower[i]).group(1)), len(lower[i]), lower[i])
+
+            fuzzy = [i for i in matches.fuzzy if i not in substring]
+            ranked += heapq.nsmallest(limit - len(ranked), fuzzy, key=span)
+        return ranked
+
+    def search(self, query: str, limit: int) -> list[dict]:
+        results = []
+        for index in self._ranked(query, self._refine(query, limit), limit):
+            text = self.lower[index]
+            found = text.find(query, self.name_starts[index])
+            if found == -1:
+                found = text.find(query)
+            if found != -1:
+                positions = list(range(found, found + len(query)))
+            else:
+                positions = _subsequence(text, query) or []
+            relative = self.paths[index]
+            results.append(
+                {
+                    "path": os.path.join(self.root, *relative.split("/")),
+                    "relative": relative,
+                    "name": relative.rsplit("/", 1)[-1],
+                    "positions": positions,
+                }
+            )
+        return results
+
+
+class _Updater(FileSystemEventHandler):
+    def __init__(self, index: QuickOpenIndex, root: str):
+        self.index = index
+        self.root = root
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        kind = event.event_type
+        if kind not in {"created", "deleted", "moved"}:
+            return
+        with self.index._lock:
+            paths = self.index._roots.get(self.root)
+            if paths is None:
+                return
+            if kind in {"deleted", "moved"}:
+                self._apply(paths, os.fsdecode(event.src_path), event, add=False)
+            if kind in {"created", "moved"}:
+                target = event.dest_path if kind == "moved" else event.src_path
+                self._apply(paths, os.fsdecode(target), event, add=True)
+
+    def _apply(self, paths: _PathSet, path: str, event, add: bool) -> None:
+        if not (path + os.sep).startswith(self.root.rstrip(os.sep) + os.sep):
+            return
+        relative = paths.relative(path)
+        if relative == "." or any(part.startswith(".") for part in relative.split("/")):
+            return
+        if not add:
+            paths.remove(relative)
+            paths.remove_below(relative)
+        elif event.is_directory:
+            paths.crawl(path)
+        elif os.path.isfile(path):
+            paths.add(relative)
+
+
+class QuickOpenIndex:
+    """Watched in-memory path indexes for up to :data:`_MAX_ROOTS` roots."""
+
+    def __init__(self, max_roots: int = _MAX_ROOTS):
+        self.max_roots = max_roots
+        self._roots: OrderedDict[str, _PathSet] = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _paths(self, root: str) -> _PathSet:
+        # Caller holds the lock.
+        paths = self._roots.get(root)
+        if paths is not None:
+            self._roots.move_to_end(root)
+            return paths
+        paths = _PathSet(root)
+        self._roots[root] = paths
+        try:
+            paths.watch = workspace_watcher.watch(root, _Updater(self, root))
+        except OSError:
+            logger.warning("Cannot watch %s; quick open may go stale", root)
+        paths.crawl(root)
+        while len(self._roots) > self.max_roots:
+            _, old = self._roots.popitem(last=False)
+            if old.watch is not None:
+                workspace_watcher.unwatch(old.watch)
+        return paths
+
+    def search(self, root: str, query: str, limit: int = DEFAULT_RESULTS) -> dict:
+        """Return the best matches for *query* among the files below *root*."""
+        started = time.perf_counter()
+        root = os.path.realpath(root)
+        needle = "".join(query.lower().split())
+        limit = max(1, min(limit, MAX_RESULTS))
+        with self._lock:
+            paths = self._paths(root)
+            results = paths.search(needle, limit) if needle else []
+            total, truncated = len(paths.ids), paths.truncated
+        return {
+            "root": root,
+            "query": query,
+            "results": results,
+            "total_paths": total,
+            "truncated": truncated,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def shutdown(self) -> None:
+        """Stop watching and drop the indexes (used on application shutdown)."""
+        with self._lock:
+            roots = list(self._roots.values())
+            self._roots.clear()
+        for paths in roots:
+            if paths.watch is not None:
+                workspace_watcher.unwatch(paths.watch)
+
+
+# Process-wide index used by ``GET /api/files/quick-open``.
+quick_open_index = QuickOpenIndex()
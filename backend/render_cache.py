@@ -0,0 +1,125 @@
+"""
+render_cache.py
+===============
+Bounded, content-addressed LRU cache for rendered Markdown previews.
+
+The frontend re-renders on every keystroke and tab switch, and most of those
+requests carry text that has already been rendered (switching back to a tab,
+undo/redo).  Entries are keyed by a digest of the Markdown source plus every
+render option that affects the output, and evicted least-recently-used once
+the total size of the cached HTML exceeds the configured budget.
+
+Set ``MARKDOWN_READER_RENDER_CACHE=0`` to disable the cache, or
+``MARKDOWN_READER_RENDER_CACHE_MB`` to change its budget.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable
+
+_DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+def content_digest(text: str) -> str:
+    """Return a short, stable digest of *text* suitable for cache keys."""
+    return hashlib.blake2b(
+        text.encode("utf-8", "surrogatepass"), digest_size=16
+    ).hexdigest()
+
+
+def _env_enabled() -> bool:
+    value = os.environ.get("MARKDOWN_READER_RENDER_CACHE", "1").strip().lower()
+    return value not in {"0", "false", "no", "off"}
+
+
+def _env_max_bytes() -> int:
+    value = os.environ.get("MARKDOWN_READER_RENDER_CACHE_MB", "").strip()
+    try:
+        return int(float(value) * 1024 * 1024) if value else _DEFAULT_MAX_BYTES
+    except ValueError:
+        return _DEFAULT_MAX_BYTES
+
+
+class RenderCache:
+    """Thread-safe LRU mapping of cache keys to rendered strings.
+
+    Size is measured in characters of the stored value, which is a close
+    enough proxy for memory use of the mostly-ASCII HTML we keep here.
+    """
+
+    def __init__(self, max_bytes: int = _DEFAULT_MAX_BYTES, enabled: bool = True):
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = 0
+        self._entries: OrderedDict[Hashable, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> str | None:
+        """Return the cached value for *key* (marking it recently used), or None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: str) -> None:
+        """Store *value* under *key*, evicting old entries to stay in budget."""
+        if not self.enabled:
+            return
+        size = len(value)
+        if size > self.max_bytes:
+            # A single oversized document would flush everything else.
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = value
+            self._size += size
+            while self._size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict:
+        """Return a JSON-serialisable snapshot of the cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Process-wide cache used by ``backend.renderer.render_markdown``.
+render_cache = RenderCache(max_bytes=_env_max_bytes(), enabled=_env_enabled())
@@ -8,42 +8,93 @@ sidecar cold starts.
 
 from __future__ import annotations
 
+import hashlib
 import os
 import re
-
-
-def protect_math(markdown_text: str) -> tuple[str, dict[str, str]]:
-    """Protect math expressions from being escaped by markdown2."""
+from functools import lru_cache
+
+# One alternation scanned left to right over the whole document.  Fenced code,
+# inline code and backslash escapes are matched (and passed through untouched)
+# so that ``$`` and ``![](...)`` inside them are never rewritten.
+_SCAN_RE = re.compile(
+    r"""
+      (?P<escape>\\[\\`$])
+    | (?P<fence>^[ ]{0,3}(?P<mark>`{3,}|~{3,})[^\n]*\n[\s\S]*?^[ ]{0,3}(?P=mark)[`~]*[ \t]*$)
+    | (?P<code>(?<!`)(?P<ticks>`+)(?!`)[^\n]*?(?<!`)(?P=ticks)(?!`))
+    | \$\$(?P<display>[\s\S]+?)\$\$
+    | (?<!\$)\$(?!\$)(?P<inline>[^$\n]+?)(?<!\$)\$(?!\$)
+    | !\[(?P<alt>[^\]]*)\]\((?P<src>[^)]+)\)
+    """,
+    re.MULTILINE | re.VERBOSE,
+)
+
+# A display placeholder on its own line comes back from markdown2 wrapped in
+# <p>…</p>; that wrapper is dropped so the math <div> is not nested in a <p>.
+_PLACEHOLDER_RE = re.compile(r"<p>(MATHPLACEHOLDER\d+X)</p>|MATHPLACEHOLDER\d+X")
+
+_ABSOLUTE_PREFIXES = ("http://", "https://", "file://", "/")
+
+
+def _absolute_image_url(src: str, base_path: str) -> str:
+    if src.startswith(_ABSOLUTE_PREFIXES):
+        return src
+    abs_path = os.path.abspath(os.path.join(base_path, src))
+    return "file://" + abs_path.replace("\\", "/")
+
+
+def preprocess_markdown(
+    markdown_text: str, base_path: str | None = None, *, math: bool = True
+) -> tuple[str, dict[str, str]]:
+    """Protect math and resolve image paths in a single linear sweep.
+
+    Math (``$$…$$`` and ``$…$``) is swapped for placeholders so markdown2
+    does not mangle it, and relative image sources are rewritten against
+    *base_path* when given.  Code fences, code spans and escaped ``\\$`` are
+    left exactly as written.  Pass the returned mapping to
+    :func:`restore_math` after conversion.
+    """
     replacements: dict[str, str] = {}
-    counter = 0
-
-    def make_placeholder(content: str, display: bool = False) -> str:
-        nonlocal counter
-        key = f"MATHPLACEHOLDER{counter}X"
-        counter += 1
-        if display:
-            replacements[key] = f'<div class="math-display">\\[{content}\\]</div>'
-        else:
-            replacements[key] = f'<span class="math-inline">\\({content}\\)</span>'
-        return key
 
-    def replace_block(match: re.Match[str]) -> str:
-        return make_placeholder(match.group(1), display=True)
+    def replace(match: re.Match[str]) -> str:
+        display = match.group("display")
+        if display is not None and math:
+            key = f"MATHPLACEHOLDER{len(replacements)}X"
+            replacements[key] = f'<div class="math-display">\\[{display}\\]</div>'
+            return key
+        inline = match.group("inline")
+        if inline is not None and math:
+            key = f"MATHPLACEHOLDER{len(replacements)}X"
+            replacements[key] = f'<span class="math-inline">\\({inline}\\)</span>'
+            return key
+        src = match.group("src")
+        if src is not None and base_path:
+            alt = match.group("alt")
+            return f"![{alt}]({_absolute_image_url(src, base_path)})"
+        return match.group(0)
+
+    return _SCAN_RE.sub(replace, markdown_text), replacements
 
-    def replace_inline(match: re.Match[str]) -> str:
-        return make_placeholder(match.group(1), display=False)
 
-    text = re.sub(r"\$\$([\s\S]+?)\$\$", replace_block, markdown_text)
-    text = re.sub(r"(?<!\$)\$(?!\$)([^\$\n]+?)(?<!\$)\$(?!\$)", replace_inline, text)
-    return text, replacements
+def protect_math(markdown_text: str) -> tuple[str, dict[str, str]]:
+    """Protect math expressions from being escaped by markdown2."""
+    return preprocess_markdown(markdown_text)
 
 
 def restore_math(html_content: str, replacements: dict[str, str]) -> str:
-    """Restore MathJax-compatible HTML placeholders."""
-    for key, value in replacements.items():
-        html_content = html_content.replace(key, value)
-        html_content = html_content.replace(f"<p>{key}</p>", value)
-    return html_content
+    """Restore MathJax-compatible HTML placeholders in one substitution pass."""
+    if not replacements:
+        return html_content
+
+    def replace(match: re.Match[str]) -> str:
+        key = match.group(1)
+        if key is None:
+            return replacements.get(match.group(0), match.group(0))
+        value = replacements.get(key)
+        if value is None:
+            return match.group(0)
+        return value if value.startswith("<div") else f"<p>{value}</p>"
+
+    return _PLACEHOLDER_RE.sub(replace, html_content)
 
 
 def get_math_styles() -> str:
@@ -60,35 +111,62 @@ def get_math_styles() -> str:
     """
 
 
-def get_mathjax_script() -> str:
-    return """
-        <script>
-            window.MathJax = {
-                tex: {
-                    inlineMath: [['\\\\(', '\\\\)']],
-                    displayMath: [['\\\\[', '\\\\]']],
-                    processEscapes: true,
-                    processEnvironments: true
-                },
-                options: {
-                    skipHtmlTags: ['script', 'noscript', 'style', 'textarea', 'pre', 'code']
-                }
-            };
-        </script>
-        <script defer src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-chtml.js"></script>
+MATHJAX_CDN_URL = "https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-chtml.js"
+
+# Vendored by scripts/vendor_mathjax.py and bundled into the packaged sidecar;
+# served from MATHJAX_ROUTE by backend/routers/markdown.py.
+MATHJAX_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "static", "mathjax"
+)
+MATHJAX_ROUTE = "/api/markdown/mathjax"
+
+MATHJAX_CONFIG_SCRIPT = """
+window.MathJax = {
+    tex: {
+        inlineMath: [['\\\\(', '\\\\)']],
+        displayMath: [['\\\\[', '\\\\]']],
+        processEscapes: true,
+        processEnvironments: true
+    },
+    options: {
+        skipHtmlTags: ['script', 'noscript', 'style', 'textarea', 'pre', 'code']
+    }
+};
+"""
+
+
+@lru_cache(maxsize=1)
+def mathjax_version() -> str | None:
+    """Return a digest of the vendored MathJax, or None if it is not vendored."""
+    try:
+        with open(os.path.join(MATHJAX_DIR, "tex-chtml.js"), "rb") as f:
+            return hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+    except OSError:
+        return None
+
+
+def mathjax_url(prefix: str = MATHJAX_ROUTE) -> str:
+    """Return the MathJax script URL: the local route if vendored, else the CDN.
+
+    The URL embeds :func:`mathjax_version`, so it can be cached forever.  The
+    fonts MathJax loads relative to it share that prefix.  *prefix* lets
+    callers make the URL absolute (full documents in a ``srcdoc`` iframe) or
+    relative to another script.
     """
+    version = mathjax_version()
+    if version is None:
+        return MATHJAX_CDN_URL
+    return f"{prefix}/{version}/tex-chtml.js"
 
 
-def fix_image_paths(markdown_text: str, base_path: str) -> str:
-    """Resolve relative Markdown image paths against a base directory."""
+def get_mathjax_script(origin: str = "") -> str:
+    """Return MathJax config and loader tags; *origin* is the backend's URL."""
+    return f"""
+        <script>{MATHJAX_CONFIG_SCRIPT}</script>
+        <script defer src="{mathjax_url(origin + MATHJAX_ROUTE)}"></script>
+    """
 
-    def replace_image(match: re.Match[str]) -> str:
-        alt = match.group(1)
-        src = match.group(2)
-        if src.startswith(("http://", "https://", "file://", "/")):
-            return match.group(0)
-        abs_path = os.path.abspath(os.path.join(base_path, src))
-        abs_url = "file://" + abs_path.replace("\\", "/")
-        return f"![{alt}]({abs_url})"
 
-    return re.sub(r"!\[([^\]]*)\]\(([^)]+)\)", replace_image, markdown_text)
+def fix_image_paths(markdown_text: str, base_path: str) -> str:
+    """Resolve relative Markdown image paths against a base directory."""
+    return preprocess_markdown(markdown_text, base_path, math=False)[0]
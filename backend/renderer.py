@@ -16,15 +16,16 @@ _ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if _ROOT not in sys.path:
     sys.path.insert(0, _ROOT)
 
-import markdown2
-
+from backend.image_index import add_image_dimensions
+from backend.process_render import process_renderer
+from backend.render_cache import content_digest, render_cache
 from backend.render_helpers import (
-    fix_image_paths,
-    get_math_styles,
     get_mathjax_script,
-    protect_math,
+    preprocess_markdown,
     restore_math,
 )
+from backend.theme import COPY_BUTTON_SCRIPT, theme_css
+from markdown_reader.markdown_engines import get_engine
 
 
 def render_markdown(
@@ -34,10 +35,32 @@ def render_markdown(
     dark_mode: bool = False,
     font_family: str = "system-ui, sans-serif",
     font_size: int = 14,
+    fragment: bool = False,
+    engine: str | None = None,
+    highlight: bool = True,
+    asset_origin: str = "",
+    source_map: bool = False,
+    use_cache: bool = True,
 ) -> str:
     """
     Convert Markdown text to a full, self-contained HTML document string.
 
+    With ``fragment=True`` only the body HTML is returned; the stylesheet and
+    scripts are served separately (see ``backend.theme``) and the theme
+    options are ignored, so fragments are cached once for every theme.
+
+    Results are memoised in :data:`backend.render_cache.render_cache`, keyed by
+    a digest of the source and every option below, so re-rendering text that
+    was seen recently (tab switches, undo/redo) costs a hash lookup.  Local
+    image sizes are not cached with the HTML: they are added on every call
+    (see ``backend.image_index``), so a resized image is picked up.
+
+    Documents above the process-render threshold are rendered in a worker
+    process (see ``backend.process_render``) so they do not hold the GIL of
+    the API server; such renders raise
+    :class:`backend.process_render.RenderTimeoutError` when they
+    run past the configured deadline.
+
     Parameters
     ----------
     markdown_text : str
@@ -50,182 +73,186 @@ def render_markdown(
         CSS font-family for the body text.
     font_size : int
         Base font size in pixels.
+    fragment : bool
+        Return body HTML only, without ``<head>`` styles and scripts.
+    engine : str | None
+        Name of the Markdown engine (see ``markdown_reader.markdown_engines``);
+        ``None`` uses the configured default.  Unknown names raise ValueError.
+    highlight : bool
+        Syntax-highlight fenced code on the server with Pygments (see
+        ``backend.highlight``).  When False, code keeps a ``language-…``
+        class for client-side highlighting instead.
+    asset_origin : str
+        Origin of this backend (e.g. ``http://127.0.0.1:8123``), prefixed to
+        the vendored MathJax URL so full documents shown in a ``srcdoc``
+        iframe can load it.  Ignored for fragments.
+    source_map : bool
+        Render block by block and tag the first element of every top-level
+        block with ``data-line``/``data-line-end`` (1-based, inclusive source
+        lines; see ``backend.incremental``).
+    use_cache : bool
+        Set to False to bypass the render cache for this call.
 
     Returns
     -------
     str
-        Full HTML document as a string.
+        Full HTML document (or body fragment) as a string.
     """
     text = markdown_text or ""
+    engine = get_engine(engine).name
+    # Theme options do not affect fragments, so leave them out of the key.
+    theme = () if fragment else (dark_mode, font_family, font_size, asset_origin)
 
-    if base_dir:
-        text = fix_image_paths(text, base_dir)
+    if use_cache:
+        key = (
+            content_digest(text),
+            base_dir or "",
+            engine,
+            highlight,
+            source_map,
+            fragment,
+            *theme,
+        )
+        html = render_cache.get(key)
+        if html is not None:
+            return add_image_dimensions(html)
 
-    # Protect math before markdown processing
-    protected, math_replacements = protect_math(text)
+    if process_renderer.should_offload(text):
+        render = process_renderer.render
+    else:
+        render = render_uncached
+    html = render(
+        text,
+        base_dir=base_dir,
+        fragment=fragment,
+        engine=engine,
+        highlight=highlight,
+        asset_origin=asset_origin,
+        source_map=source_map,
+        dark_mode=dark_mode,
+        font_family=font_family,
+        font_size=font_size,
+    )
 
-    try:
-        html_content = markdown2.markdown(
-            protected,
-            extras=[
-                "fenced-code-blocks",
-                "code-friendly",
-                "tables",
-                "break-on-newline",
-            ],
+    if use_cache:
+        render_cache.put(key, html)
+    return add_image_dimensions(html)
+
+
+def render_uncached(
+    text: str,
+    *,
+    base_dir: str | None,
+    fragment: bool,
+    dark_mode: bool,
+    font_family: str,
+    font_size: int,
+    engine: str | None = None,
+    highlight: bool = True,
+    asset_origin: str = "",
+    source_map: bool = False,
+) -> str:
+    """Render in the current process, bypassing the cache and process pool.
+
+    Images are left without ``width``/``height``; :func:`render_markdown`
+    adds them after the cache.
+    """
+    if fragment:
+        return _render_body(text, base_dir, engine, highlight, source_map)
+    return _render_document(
+        text,
+        base_dir or "",
+        dark_mode,
+        font_family,
+        font_size,
+        engine,
+        highlight,
+        asset_origin,
+        source_map,
+    )
+
+
+def _render_body(
+    text: str,
+    base_dir: str | None,
+    engine: str | None,
+    highlight: bool,
+    source_map: bool,
+) -> str:
+    if not source_map:
+        return render_fragment(
+            text,
+            base_dir=base_dir,
+            engine=engine,
+            highlight=highlight,
+            image_sizes=False,
         )
+    # Imported here because backend.incremental builds on this module.
+    from backend.incremental import incremental_renderer
+
+    return incremental_renderer.render_source_mapped(
+        text, base_dir=base_dir, engine=engine, highlight=highlight, image_sizes=False
+    )
+
+
+def render_fragment(
+    markdown_text: str,
+    *,
+    base_dir: str | None = None,
+    engine: str | None = None,
+    highlight: bool = True,
+    image_sizes: bool = True,
+) -> str:
+    """
+    Convert Markdown text to body HTML only (no ``<html>``/``<head>`` wrapper).
+
+    Local images get ``width``/``height`` attributes from
+    ``backend.image_index`` so the preview does not reflow as they load.
+    Callers that cache the HTML pass ``image_sizes=False`` and add them with
+    :func:`backend.image_index.add_image_dimensions` after the lookup, so
+    cached HTML never carries the size of an image that has since changed.
+
+    Conversion errors are reported inline as an HTML traceback rather than
+    raised, so a broken document still produces a preview.
+    """
+    # Protect math and resolve image paths before markdown processing
+    protected, math_replacements = preprocess_markdown(markdown_text or "", base_dir)
+    converter = get_engine(engine)
+
+    try:
+        html_content = converter.convert(protected, highlight=highlight)
         html_content = restore_math(html_content, math_replacements)
+        return add_image_dimensions(html_content) if image_sizes else html_content
     except Exception:
         import traceback
 
         tb = traceback.format_exc()
-        html_content = f"<h2>Error generating preview</h2><pre>{html_escape(tb)}</pre>"
-
-    # Colour scheme
-    if dark_mode:
-        bg_color = "#1e1e1e"
-        fg_color = "#dcdcdc"
-        code_bg = "#2d2d2d"
-        code_fg = "#dcdcdc"
-        table_header_bg = "#2a2a2a"
-        table_header_fg = "#ccc"
-        table_alt_bg = "#252525"
-        border_color = "#444"
-    else:
-        bg_color = "#ffffff"
-        fg_color = "#1a1a1a"
-        code_bg = "#f4f4f4"
-        code_fg = "#000000"
-        table_header_bg = "#f3f3f3"
-        table_header_fg = "#333"
-        table_alt_bg = "#fafafa"
-        border_color = "#ccc"
-
-    h1 = font_size + 18
-    h2 = font_size + 12
-    h3 = font_size + 8
-    h4 = font_size + 4
-    h5 = font_size + 2
-    h6 = font_size + 1
-    base = font_size + 2
+        return f"<h2>Error generating preview</h2><pre>{html_escape(tb)}</pre>"
+
+
+def _render_document(
+    text: str,
+    base_dir: str,
+    dark_mode: bool,
+    font_family: str,
+    font_size: int,
+    engine: str | None = None,
+    highlight: bool = True,
+    asset_origin: str = "",
+    source_map: bool = False,
+) -> str:
+    """Run the full Markdown → HTML pipeline without consulting the cache."""
+    html_content = _render_body(text, base_dir, engine, highlight, source_map)
 
+    css = theme_css(dark_mode=dark_mode, font_family=font_family, font_size=font_size)
     return f"""<!DOCTYPE html>
 <html lang="en">
 <head>
   <meta charset="UTF-8">
   <meta name="viewport" content="width=device-width, initial-scale=1.0">
-  <style>
-    {get_math_styles()}
-    .copy-button {{
-      position: absolute;
-      top: 8px;
-      right: 8px;
-      background: #cacbd0;
-      color: #313234;
-      font-size: 0.7em;
-      padding: 2px 6px;
-      border: none;
-      border-radius: 3px;
-      cursor: pointer;
-      z-index: 10;
-    }}
-    .copy-button:hover {{ background: #a5a8b6; }}
-    body {{
-      background-color: {bg_color};
-      color: {fg_color};
-      font-family: {font_family};
-      padding: 24px 32px;
-      font-size: {base}px;
-      line-height: 1.65;
-      max-width: 900px;
-      margin: 0 auto;
-    }}
-    h1 {{ font-size: {h1}px; }}
-    h2 {{ font-size: {h2}px; }}
-    h3 {{ font-size: {h3}px; }}
-    h4 {{ font-size: {h4}px; }}
-    h5 {{ font-size: {h5}px; }}
-    h6 {{ font-size: {h6}px; }}
-    b, strong {{ font-weight: bold; }}
-    i, em {{ font-style: italic; }}
-    u {{ text-decoration: underline; }}
-    pre {{
-      position: relative;
-    }}
-    pre code {{
-      background-color: {code_bg};
-      color: {code_fg};
-      font-family: 'Cascadia Code', 'Fira Code', 'Consolas', monospace;
-      font-size: {max(font_size - 2, 10)}px;
-      padding: 28px 14px 14px 14px;
-      border-radius: 6px;
-      overflow-x: auto;
-      display: block;
-      white-space: pre;
-    }}
-    code {{
-      background-color: {code_bg};
-      color: {code_fg};
-      font-family: 'Cascadia Code', 'Fira Code', 'Consolas', monospace;
-      font-size: {max(font_size - 2, 10)}px;
-      padding: 0 4px;
-      border-radius: 3px;
-    }}
-    img {{
-      max-width: 90%;
-      height: auto;
-      display: block;
-      margin: 12px 0;
-    }}
-    table {{
-      border-collapse: collapse;
-      width: 100%;
-      margin: 16px 0;
-      font-size: {base}px;
-    }}
-    th, td {{
-      text-align: left;
-      border: 1px solid {border_color};
-      padding: 10px 14px;
-      vertical-align: top;
-    }}
-    th {{
-      background-color: {table_header_bg};
-      color: {table_header_fg};
-    }}
-    tr:nth-child(even) td {{ background-color: {table_alt_bg}; }}
-    blockquote {{
-      border-left: 4px solid {border_color};
-      margin: 0;
-      padding: 4px 16px;
-      color: {"#aaa" if dark_mode else "#666"};
-    }}
-    hr {{
-      border: none;
-      border-top: 1px solid {border_color};
-      margin: 20px 0;
-    }}
-    a {{ color: {"#7ab3f5" if dark_mode else "#0070f3"}; text-decoration: none; }}
-    a:hover {{ text-decoration: underline; }}
-  </style>
-  <script>
-    document.addEventListener('DOMContentLoaded', function() {{
-      document.querySelectorAll('pre code').forEach(function(block) {{
-        var btn = document.createElement('button');
-        btn.className = 'copy-button';
-        btn.textContent = 'Copy';
-        var pre = block.parentElement;
-        pre.appendChild(btn);
-        btn.addEventListener('click', function() {{
-          navigator.clipboard.writeText(block.innerText).then(function() {{
-            btn.textContent = 'Copied!';
-            setTimeout(function() {{ btn.textContent = 'Copy'; }}, 1200);
-          }});
-        }});
-      }});
-    }});
-  </script>
-  {get_mathjax_script()}
+  <style>{css}</style>
+  <script>{COPY_BUTTON_SCRIPT}</script>
+  {get_mathjax_script(asset_origin)}
 </head>
 <body>
   {html_content}
@@ -15,16 +15,20 @@ Document import is handled by a two-level converter chain:
 
 from __future__ import annotations
 
+import asyncio
 import base64
 import json
 import logging
 import os
+import sqlite3
 import sys
 import tempfile
 from importlib import import_module
 from pathlib import Path
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
@@ -71,6 +75,19 @@ _ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__
 if _ROOT not in sys.path:
     sys.path.insert(0, _ROOT)
 
+from backend.documents import StaleBaseError, document_store
+from backend.file_events import KEEPALIVE_SECONDS, describe, file_event_hub
+from backend.line_index import DEFAULT_RANGE_LINES, line_indexes
+from backend.quick_open import DEFAULT_RESULTS, quick_open_index
+from backend.search_index import DEFAULT_LIMIT, search_index
+from backend.workspace_index import workspace_index
+from backend.workspace_stats import (
+    DEFAULT_EXTENSIONS,
+    MAX_FILES,
+    collect_files,
+    workspace_stats,
+)
+
 router = APIRouter()
 
 _RECENT_FILES_KEY = "recent_files"
@@ -146,12 +163,29 @@ class WritePayload(BaseModel):
     content: str
 
 
+class PatchPayload(BaseModel):
+    path: str
+    # Edits in order, each {"offset", "delete", "insert"} in code points.
+    edits: list[dict]
+    # The text the edits apply to: its hash, or the file's mtime in ns.
+    base_hash: str | None = None
+    base_mtime_ns: int | None = None
+
+
 class ConvertToMarkdownPayload(BaseModel):
     path: str | None = None
     filename: str | None = None
     content_base64: str | None = None
 
 
+class StatsPayload(BaseModel):
+    # A directory to scan recursively and/or explicit file paths.
+    path: str | None = None
+    paths: list[str] = []
+    extensions: str | None = DEFAULT_EXTENSIONS
+    max_files: int = MAX_FILES
+
+
 class FileEntry(BaseModel):
     name: str
     path: str
@@ -163,31 +197,91 @@ class FileEntry(BaseModel):
 
 
 @router.get("/read")
-def read_file(path: str = Query(..., description="Absolute path to the file")):
-    """Read a file and return its content."""
+def read_file(
+    path: str = Query(..., description="Absolute path to the file"),
+    start_line: int | None = Query(
+        None, description="Return a window of lines starting here (1-based)"
+    ),
+    line_count: int = Query(DEFAULT_RANGE_LINES, description="Lines per window"),
+    offset: int | None = Query(
+        None, description="Return a window of bytes starting here"
+    ),
+    length: int = Query(1024 * 1024, description="Bytes per window"),
+):
+    """Read a file and return its content.
+
+    Without ``start_line`` or ``offset`` the whole file is returned.  With
+    one of them only that window is read, through a memory-mapped line
+    index (see ``backend.line_index``), and the response adds
+    ``start_line``, ``end_line``, ``line_count`` (of the whole file),
+    ``start_byte``, ``end_byte``, ``size``, ``eof``, ``truncated`` and
+    ``version``.
+    """
     if not os.path.isfile(path):
         raise HTTPException(status_code=404, detail=f"File not found: {path}")
+    if start_line is not None or offset is not None:
+        try:
+            return line_indexes.read(
+                path,
+                start_line=start_line,
+                line_count=line_count,
+                offset=offset,
+                length=length,
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        except OSError as exc:
+            raise HTTPException(status_code=500, detail=str(exc))
     try:
-        with open(path, encoding="utf-8", errors="replace") as f:
-            content = f.read()
-        return {"path": path, "content": content}
+        document = document_store.read(path)
     except OSError as exc:
         raise HTTPException(status_code=500, detail=str(exc))
+    return {"path": path, "content": document.text, **document.as_dict()}
 
 
 @router.post("/write")
 def write_file(payload: WritePayload):
-    """Write (or overwrite) a file with the provided content."""
+    """Write (or overwrite) a file with the provided content.
+
+    The file is replaced atomically.  The response's ``hash`` is the base
+    for a following ``/patch``.
+    """
     path = payload.path
     parent = os.path.dirname(path)
     if parent:
         os.makedirs(parent, exist_ok=True)
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(payload.content)
-        return {"path": path, "written": True}
+        document = document_store.write(path, payload.content)
+    except OSError as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+    # Show a newly created file in the next listing without waiting for the
+    # watcher.
+    workspace_index.invalidate(path)
+    return {"path": path, "written": True, **document.as_dict()}
+
+
+@router.post("/patch")
+def patch_file(payload: PatchPayload):
+    """Apply text edits to a file and atomically replace it.
+
+    ``base_hash`` (from ``/read``, ``/write`` or a previous ``/patch``) or
+    ``base_mtime_ns`` must match the file's current text; otherwise the
+    response is 409 and the client should fall back to ``/write``.  Only
+    the edits travel over the wire; the server keeps a copy of the text.
+    """
+    if not os.path.isfile(payload.path):
+        raise HTTPException(status_code=404, detail=f"File not found: {payload.path}")
+    try:
+        document = document_store.patch(
+            payload.path, payload.edits, payload.base_hash, payload.base_mtime_ns
+        )
+    except StaleBaseError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     except OSError as exc:
         raise HTTPException(status_code=500, detail=str(exc))
+    return {"path": payload.path, "written": True, **document.as_dict()}
 
 
 def _docx_paragraph_to_markdown(paragraph) -> str:
@@ -356,39 +450,198 @@ def list_files(
         None,
         description="Comma-separated list of file extensions to include (e.g. md,txt)",
     ),
+    recursive: bool = Query(
+        False, description="List the whole tree below path, depth-first"
+    ),
 ):
-    """List entries in a directory (non-recursive, sorted: dirs first)."""
+    """List entries in a directory (sorted: dirs first).
+
+    Listings are served from the in-memory workspace index, which a
+    filesystem watcher keeps current (see ``backend.workspace_index``).
+    With ``recursive`` every entry below ``path`` is returned, each folder
+    followed by its contents, and ``truncated`` tells whether the listing
+    hit its size limit.
+    """
     if not os.path.isdir(path):
         raise HTTPException(status_code=404, detail=f"Directory not found: {path}")
 
-    allowed_exts: set[str] | None = None
-    if extensions:
-        allowed_exts = {e.strip().lower().lstrip(".") for e in extensions.split(",")}
-
-    entries: list[dict] = []
     try:
-        with os.scandir(path) as it:
-            for entry in sorted(it, key=lambda e: (not e.is_dir(), e.name.lower())):
-                if entry.name.startswith("."):
-                    continue
-                is_dir = entry.is_dir()
-                ext = Path(entry.name).suffix.lstrip(".").lower()
-                if not is_dir and allowed_exts and ext not in allowed_exts:
-                    continue
-                entries.append(
-                    {
-                        "name": entry.name,
-                        "path": entry.path,
-                        "is_dir": is_dir,
-                        "extension": ext,
-                    }
-                )
+        entries, truncated = workspace_index.list(path, extensions, recursive)
     except PermissionError:
         raise HTTPException(status_code=403, detail="Permission denied")
+    except OSError as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
 
+    if recursive:
+        return {"path": path, "entries": entries, "truncated": truncated}
     return {"path": path, "entries": entries}
 
 
+@router.get("/search")
+def search_files(
+    root: str = Query(..., description="Workspace folder to search"),
+    q: str = Query(..., description="Words to find; the last one may be a prefix"),
+    limit: int = Query(DEFAULT_LIMIT, description="Maximum number of results"),
+):
+    """Full-text search over the Markdown, text and HTML files under ``root``.
+
+    Backed by a persistent SQLite FTS5 index that a filesystem watcher keeps
+    current (see ``backend.search_index``); only the first search under a
+    root compares the tree with the index.  Results are ranked best first::
+
+        {"root": "/notes", "query": "install guide",
+         "results": [{"path": "/notes/setup.md", "title": "Setup",
+                      "score": 3.21,
+                      "snippet": "… the <mark>install</mark> <mark>guide</mark> …",
+                      "matches": [{"line": 12, "text": "Install guide"}]}],
+         "indexed_files": 1834, "elapsed_ms": 2.4}
+    """
+    if not os.path.isdir(root):
+        raise HTTPException(status_code=404, detail=f"Directory not found: {root}")
+    try:
+        return search_index.search(root, q, limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except (OSError, sqlite3.Error) as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+
+
+@router.get("/quick-open")
+def quick_open(
+    root: str = Query(..., description="Workspace folder to find files in"),
+    q: str = Query(..., description="Part of a path, or its characters in order"),
+    limit: int = Query(DEFAULT_RESULTS, description="Maximum number of results"),
+):
+    """Find files under ``root`` by name as the user types.
+
+    Backed by an in-memory trigram index of every path under the root that a
+    filesystem watcher keeps current (see ``backend.quick_open``); only the
+    first request for a root crawls it.  Paths containing ``q`` rank first,
+    then paths containing its characters in order.  ``positions`` are the
+    matched character offsets in ``relative``, for highlighting::
+
+        {"root": "/notes", "query": "rdme",
+         "results": [{"path": "/notes/README.md", "relative": "README.md",
+                      "name": "README.md", "positions": [0, 3, 4, 5]}],
+         "total_paths": 1834, "truncated": false, "elapsed_ms": 0.4}
+    """
+    if not os.path.isdir(root):
+        raise HTTPException(status_code=404, detail=f"Directory not found: {root}")
+    return quick_open_index.search(root, q, limit)
+
+
+def _server_sent_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.get("/events")
+async def file_events(
+    request: Request,
+    path: list[str] = Query(..., description="Files, or folders to watch recursively"),
+):
+    """Stream changes to the given paths (``path`` may repeat) as server-sent
+    events, debounced and merged per file (see ``backend.file_events``).
+
+    The stream opens with a ``ready`` event giving the current state of each
+    path, then sends one ``change`` event per changed file.  Event paths are
+    real paths, so ``ready`` maps each requested path to its ``real_path``::
+
+        event: ready
+        data: {"paths": [{"path": "/notes/a.md", "real_path": "/notes/a.md",
+                          "exists": true, "mtime_ns": ..., "size": 1532,
+                          "hash": "9f2c…"}]}
+
+        event: change
+        data: {"type": "modified", "path": "/notes/a.md", "is_directory": false,
+               "exists": true, "mtime_ns": ..., "size": 1540, "hash": "41ad…"}
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        subscription = await run_in_threadpool(file_event_hub.subscribe, path, loop)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except OSError as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+
+    def current_state() -> list[dict]:
+        states = []
+        for requested in path:
+            real = os.path.realpath(requested)
+            state = describe(real, os.path.isdir(real))
+            states.append({"path": requested, "real_path": real, **state})
+        return states
+
+    async def stream():
+        try:
+            ready = await run_in_threadpool(current_state)
+            yield _server_sent_event("ready", {"paths": ready})
+            while True:
+                try:
+                    events = await asyncio.wait_for(
+                        subscription.queue.get(), KEEPALIVE_SECONDS
+                    )
+                except TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                if events is None:  # the backend is shutting down
+                    break
+                for event in events:
+                    yield _server_sent_event("change", event)
+        finally:
+            file_event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@router.post("/stats")
+def workspace_statistics(payload: StatsPayload):
+    """Stream word, reading-time and heading statistics for many files.
+
+    Scans ``path`` recursively (hidden entries skipped, only ``extensions``)
+    plus any explicit ``paths``.  The response is newline-delimited JSON:
+    one record per file as soon as it is counted, then a summary::
+
+        {"type": "file", "path": "/docs/a.md", "cached": false, "size": 812,
+         "mtime": 1718000000.0, "words": 120, "cjk_characters": 0,
+         "chars_with_spaces": 790, "chars_without_spaces": 650,
+         "reading_time": "< 1 min read", "heading_count": 4}
+        {"type": "error", "path": "/docs/gone.md", "detail": "..."}
+        {"type": "summary", "files": 1, "cached": 0, "errors": 1,
+         "truncated": false, "size": 812, "words": 120, ...,
+         "reading_time": "< 1 min read", "elapsed_ms": 3.2}
+
+    Files are counted in a process pool and cached by path, mtime and size,
+    so rescanning an unchanged tree is close to free.
+    """
+    files = list(payload.paths)
+    truncated = False
+    if payload.path is not None:
+        if not os.path.isdir(payload.path):
+            raise HTTPException(
+                status_code=404, detail=f"Directory not found: {payload.path}"
+            )
+        found, truncated = collect_files(
+            payload.path, payload.extensions, payload.max_files
+        )
+        files.extend(found)
+    elif not files:
+        raise HTTPException(status_code=400, detail="Provide a path or paths")
+
+    lines = (
+        json.dumps(item) + "\n"
+        for item in workspace_stats.scan(files, truncated=truncated)
+    )
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
 @router.get("/recent")
 def get_recent_files():
     """Return the most-recently-opened file paths."""
@@ -9,18 +9,36 @@ from __future__ import annotations
 import os
 import re
 import sys
-import unicodedata
+from html import unescape as html_unescape
 from importlib import import_module
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel
 
 _ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 if _ROOT not in sys.path:
     sys.path.insert(0, _ROOT)
 
+from backend import render_helpers
+from backend.blocks import split_blocks
+from backend.highlight import code_block_cache
+from backend.image_index import image_index
+from backend.incremental import incremental_renderer, line_map
+from backend.outline import extract_outline, outline_from_blocks, slugify
+from backend.process_render import RenderTimeoutError
+from backend.render_cache import render_cache
 from backend.renderer import render_markdown
-from backend.word_count import count_words, reading_time, strip_markdown
+from backend.theme import (
+    theme_css,
+    theme_script,
+    theme_script_version,
+    theme_urls,
+    theme_version,
+)
+from backend.windowed import DEFAULT_WINDOW_LINES, render_window
+from backend.word_count import word_stats
+from markdown_reader.markdown_engines import available_engines, default_engine_name
 
 router = APIRouter()
 
@@ -34,6 +52,41 @@ class RenderPayload(BaseModel):
     dark_mode: bool = False
     font_family: str = "system-ui, sans-serif"
     font_size: int = 14
+    # Return body HTML only; fetch styles/scripts from the theme endpoints.
+    fragment: bool = False
+    # Markdown engine name (see /engines); None uses the configured default.
+    engine: str | None = None
+    # Pygments-highlight fenced code on the server (cached per code block).
+    highlight: bool = True
+    # Tag top-level blocks with data-line/data-line-end and return line_map.
+    source_map: bool = False
+
+
+class IncrementalRenderPayload(BaseModel):
+    """Input for the /render/incremental endpoint."""
+
+    content: str
+    base_dir: str | None = None
+    # Block ids the client already holds HTML for; those blocks come back
+    # without HTML.
+    known_ids: list[str] = []
+
+
+class WindowRenderPayload(BaseModel):
+    """Input for the /render/window endpoint."""
+
+    # Markdown file on disk; only the window's bytes are read per request.
+    path: str
+    start_line: int = 1
+    line_count: int = DEFAULT_WINDOW_LINES
+    # Estimated pixel offset (see total_height); overrides start_line.
+    offset: float | None = None
+    base_dir: str | None = None
+    dark_mode: bool = False
+    font_family: str = "system-ui, sans-serif"
+    font_size: int = 14
+    engine: str | None = None
+    highlight: bool = True
 
 
 class HtmlToMarkdownPayload(BaseModel):
@@ -53,79 +106,327 @@ class OutlinePayload(BaseModel):
 
 # ── Heading helpers ───────────────────────────────────────────────────────────
 
-# Matches ATX headings: `# Heading` … `###### Heading`
-_ATX_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)(?:\s+#+\s*)?$", re.MULTILINE)
+# Rendered headings; the opening tag may carry data-line attributes.
+_HTML_HEADING_RE = re.compile(r"<h([1-6])((?:\s[^>]*)?)>(.*?)</h\1>", re.DOTALL)
+_ID_ATTR_RE = re.compile(r"\sid\s*=")
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
 
-# Characters that should be stripped when building a GitHub-style slug
-_NON_WORD_RE = re.compile(r"[^\w\s-]")
-_WHITESPACE_RE = re.compile(r"\s+")
+def _add_heading_ids(html: str, outline: list[dict]) -> str:
+    """Give each rendered heading the ``id`` of its outline node.
 
+    Headings are paired in document order by level and slug, so a heading
+    that has no outline node (setext, or nested in a list) is left alone
+    instead of shifting every later anchor.
+    """
+    nodes = iter(outline)
+    pending = next(nodes, None)
 
-def _slugify(text: str) -> str:
-    """Produce a GitHub-compatible heading anchor from heading text."""
-    text = text.lower()
-    # Normalise Unicode so accented chars are preserved but combining marks
-    # that have no direct ASCII equivalent are stripped.
-    text = unicodedata.normalize("NFC", text)
-    text = _NON_WORD_RE.sub("", text)
-    text = _WHITESPACE_RE.sub("-", text.strip())
-    return text
+    def replace(match: re.Match) -> str:
+        nonlocal pending
+        if pending is None:
+            return match.group()
+        level, attrs, inner = int(match.group(1)), match.group(2), match.group(3)
+        text = html_unescape(_HTML_TAG_RE.sub("", inner))
+        if level != pending["level"] or slugify(text) != slugify(pending["text"]):
+            return match.group()
+        anchor = pending["anchor"]
+        pending = next(nodes, None)
+        if _ID_ATTR_RE.search(attrs):
+            return match.group()
+        return f'<h{level} id="{anchor}"{attrs}>{inner}</h{level}>'
 
+    return _HTML_HEADING_RE.sub(replace, html)
 
-def _extract_outline(markdown: str) -> list[dict]:
-    """Return a flat list of heading nodes extracted from *markdown*.
 
-    Each node has the following keys:
+# ── Theme helpers ─────────────────────────────────────────────────────────────
 
-    * ``level``  – heading depth (1–6)
-    * ``text``   – raw heading text (inline markup stripped)
-    * ``anchor`` – GitHub-style slug usable as ``#anchor`` in URLs / scroll targets
-    * ``line``   – 1-based line number of the heading in the source text
-    """
-    outline: list[dict] = []
-    # Track slugs so duplicates get the ``-1``, ``-2`` … suffix (GitHub rule).
-    slug_counts: dict[str, int] = {}
-
-    for match in _ATX_HEADING_RE.finditer(markdown):
-        level = len(match.group(1))
-        raw_text = match.group(2).strip()
-        # Strip common inline Markdown so the label is readable plain text.
-        plain = re.sub(r"\*{1,2}|_{1,2}|`|~~|!\[.*?\]\(.*?\)|\[([^\]]*)\]\(.*?\)", r"\1", raw_text)
-        plain = plain.strip()
-
-        base_slug = _slugify(plain)
-        count = slug_counts.get(base_slug, 0)
-        slug = base_slug if count == 0 else f"{base_slug}-{count}"
-        slug_counts[base_slug] = count + 1
-
-        line_number = markdown[: match.start()].count("\n") + 1
-
-        outline.append(
-            {
-                "level": level,
-                "text": plain,
-                "anchor": slug,
-                "line": line_number,
-            }
-        )
+_IMMUTABLE = "public, max-age=31536000, immutable"
 
-    return outline
+_ASSET_TYPES = {".js": "text/javascript", ".woff": "font/woff"}
+
+
+def _versioned_response(
+    request: Request, body: str, media_type: str, version: str, pinned: bool
+) -> Response:
+    """Serve *body* with an ETag, answering conditional requests with 304.
+
+    Requests that name the current version in their URL (``pinned``) can be
+    cached forever; anything else must revalidate.
+    """
+    etag = f'"{version}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": _IMMUTABLE if pinned else "no-cache",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
 
 
 # ── Endpoints ─────────────────────────────────────────────────────────────────
 
 
 @router.post("/render")
-def render(payload: RenderPayload):
-    """Render Markdown text to a full HTML document string."""
-    html = render_markdown(
+def render(payload: RenderPayload, request: Request):
+    """Render Markdown text to a full HTML document string.
+
+    With ``fragment: true`` the response carries body HTML only, plus a
+    ``theme`` object with versioned ``stylesheet`` and ``script`` URLs for the
+    requested theme.  The preview loads those once; later renders and theme
+    switches then only move body HTML or a stylesheet URL respectively.
+
+    With ``source_map: true`` the first element of every top-level block
+    carries ``data-line``/``data-line-end`` (1-based, inclusive) and the
+    response adds ``line_map``, the tagged ranges in document order::
+
+        {"html": "<h1 data-line=\"1\" data-line-end=\"1\">Intro</h1>\n…",
+         "line_map": [[1, 1], [3, 4]]}
+
+    The preview can binary-search ``line_map`` for the editor's top line and
+    scroll to the element whose ``data-line`` is that range's start.  Blocks
+    whose HTML does not start with an element (a bare HTML comment, say)
+    carry no attribute and are not listed.
+    """
+    return _render_response(payload, request)
+
+
+def _render_response(payload: RenderPayload, request: Request) -> dict:
+    try:
+        html = render_markdown(
+            payload.content,
+            base_dir=payload.base_dir,
+            dark_mode=payload.dark_mode,
+            font_family=payload.font_family,
+            font_size=payload.font_size,
+            fragment=payload.fragment,
+            engine=payload.engine,
+            highlight=payload.highlight,
+            asset_origin=str(request.base_url).rstrip("/"),
+            source_map=payload.source_map,
+        )
+    except RenderTimeoutError as exc:
+        raise HTTPException(status_code=504, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    result = {"html": html}
+    if payload.fragment:
+        result["theme"] = theme_urls(
+            dark_mode=payload.dark_mode,
+            font_family=payload.font_family,
+            font_size=payload.font_size,
+        )
+    if payload.source_map:
+        result["line_map"] = line_map(html)
+    return result
+
+
+@router.post("/document")
+def render_document(payload: RenderPayload, request: Request):
+    """Render HTML, outline and word statistics for one document in one call.
+
+    Accepts the same fields as ``/render``.  The outline and statistics are
+    fence-aware (``#`` lines in fenced code are not headings and code is not
+    counted as words), and the rendered headings get ``id`` attributes equal
+    to their outline anchors.
+
+    Example response::
+
+        {
+            "html": "<h1 id=\"intro\">Intro</h1>\n<p>Hello world</p>",
+            "outline": [
+                {"level": 1, "text": "Intro", "anchor": "intro", "line": 1}
+            ],
+            "heading_count": 1,
+            "stats": {"words": 3, "cjk_characters": 0, "chars_with_spaces": 22,
+                      "chars_without_spaces": 18, "reading_time": "< 1 min read"}
+        }
+
+    Fragment requests also carry ``theme`` and ``source_map`` requests carry
+    ``line_map``, as with ``/render``.
+    """
+    content = payload.content
+    outline = outline_from_blocks(split_blocks(content))
+    result = _render_response(payload, request)
+    result["html"] = _add_heading_ids(result["html"], outline)
+    result["outline"] = outline
+    result["heading_count"] = len(outline)
+    result["stats"] = word_stats(content)
+    return result
+
+
+@router.get("/engines")
+def list_engines():
+    """Return the selectable Markdown engines and the configured default."""
+    return {"engines": available_engines(), "default": default_engine_name()}
+
+
+@router.get("/theme.css")
+def get_theme_css(
+    request: Request,
+    dark_mode: bool = False,
+    font_family: str = "system-ui, sans-serif",
+    font_size: int = 14,
+    v: str | None = None,
+):
+    """Return the preview stylesheet for one theme/font combination."""
+    version = theme_version(
+        dark_mode=dark_mode, font_family=font_family, font_size=font_size
+    )
+    css = theme_css(dark_mode=dark_mode, font_family=font_family, font_size=font_size)
+    return _versioned_response(request, css, "text/css", version, pinned=v == version)
+
+
+@router.get("/theme.js")
+def get_theme_js(request: Request, v: str | None = None):
+    """Return the preview script bundle (copy buttons + MathJax loader)."""
+    version = theme_script_version()
+    return _versioned_response(
+        request,
+        theme_script(),
+        "text/javascript",
+        version,
+        pinned=v == version,
+    )
+
+
+@router.get("/mathjax/{version}/{path:path}")
+def get_mathjax_asset(request: Request, version: str, path: str):
+    """Serve the vendored MathJax bundle (see ``scripts/vendor_mathjax.py``).
+
+    URLs carry the bundle digest from ``render_helpers.mathjax_url()``, so
+    matching requests are cached as immutable.  The script is sent
+    pre-compressed when the client accepts gzip; fonts are already
+    compressed.  Returns 404 when MathJax has not been vendored.
+    """
+    root = os.path.realpath(render_helpers.MATHJAX_DIR)
+    file_path = os.path.realpath(os.path.join(root, path))
+    current = render_helpers.mathjax_version()
+    if (
+        current is None
+        or not file_path.startswith(root + os.sep)
+        or not os.path.isfile(file_path)
+    ):
+        raise HTTPException(status_code=404, detail="MathJax asset not found")
+
+    media_type = _ASSET_TYPES.get(os.path.splitext(file_path)[1])
+    headers = {
+        "Cache-Control": _IMMUTABLE if version == current else "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    compressed = file_path + ".gz"
+    if "gzip" in request.headers.get("accept-encoding", "") and os.path.isfile(
+        compressed
+    ):
+        headers["Content-Encoding"] = "gzip"
+        return FileResponse(compressed, media_type=media_type, headers=headers)
+    return FileResponse(file_path, media_type=media_type, headers=headers)
+
+
+@router.post("/render/incremental")
+def render_incremental(payload: IncrementalRenderPayload):
+    """Render Markdown block by block, returning HTML only for new blocks.
+
+    Each block carries a content-derived ``id`` that stays stable while the
+    block's source is unchanged, plus its ``kind`` and 1-based source line
+    range.  ``html`` is ``null`` for blocks listed in ``known_ids``; the
+    client keeps its existing DOM for those and patches in the rest in order.
+
+    Example response::
+
+        {
+            "blocks": [
+                {"id": "b3f2a…", "kind": "heading", "start_line": 1,
+                 "end_line": 1, "html": null},
+                {"id": "b91c0…", "kind": "paragraph", "start_line": 3,
+                 "end_line": 4, "html": "<p>Edited text</p>"}
+            ],
+            "changed": ["b91c0…"],
+            "block_count": 2
+        }
+    """
+    return incremental_renderer.render(
         payload.content,
         base_dir=payload.base_dir,
+        known_ids=frozenset(payload.known_ids),
+    )
+
+
+@router.post("/render/window")
+def render_window_endpoint(payload: WindowRenderPayload):
+    """Render only the blocks of a large file that overlap a line window.
+
+    The file is indexed once per change (block boundaries, byte offsets and
+    estimated heights; see ``backend.windowed``) and each request reads and
+    renders at most ``line_count`` lines' worth of blocks, so memory and
+    response size track the window rather than the file.  Blocks carry
+    ``data-line`` attributes like ``source_map`` renders, plus an estimated
+    ``top``/``height`` in pixels; ``total_height`` sizes the scrollbar.
+
+    Example response::
+
+        {
+            "version": "17f9c2a4b1e-1312d00",
+            "line_count": 412003,
+            "block_count": 98211,
+            "total_height": 6120448,
+            "first_block": 1200,
+            "blocks": [
+                {"kind": "heading", "start_line": 5001, "end_line": 5001,
+                 "top": 74880, "height": 56,
+                 "html": "<h2 data-line=\"5001\" …>v2.3.0</h2>"}
+            ],
+            "theme": {"version": "…", "stylesheet": "…", "script": "…"}
+        }
+
+    ``version`` changes whenever the file does, so a client can drop the
+    windows it holds.
+    """
+    if not os.path.isfile(payload.path):
+        raise HTTPException(status_code=404, detail=f"File not found: {payload.path}")
+    try:
+        result = render_window(
+            payload.path,
+            start_line=payload.start_line,
+            line_count=payload.line_count,
+            offset=payload.offset,
+            base_dir=payload.base_dir,
+            engine=payload.engine,
+            highlight=payload.highlight,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except OSError as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+    result["theme"] = theme_urls(
         dark_mode=payload.dark_mode,
         font_family=payload.font_family,
         font_size=payload.font_size,
     )
-    return {"html": html}
+    return result
+
+
+@router.get("/render/cache")
+def render_cache_stats():
+    """Return hit/miss counters and current size of the render cache.
+
+    ``code_blocks`` reports the separate cache of highlighted code blocks.
+    """
+    return {**render_cache.stats(), "code_blocks": code_block_cache.stats()}
+
+
+@router.delete("/render/cache")
+def clear_render_cache():
+    """Drop every cached preview (e.g. after changing images on disk).
+
+    Clears the whole-document and per-block render caches, the highlighted
+    code blocks and the image sizes, and returns the ``/render/cache`` stats.
+    """
+    render_cache.clear()
+    incremental_renderer.cache.clear()
+    code_block_cache.clear()
+    image_index.clear()
+    return render_cache_stats()
 
 
 @router.post("/convert/html")
@@ -160,18 +461,7 @@ def pdf_to_markdown(payload: PdfToMarkdownPayload):
 @router.post("/wordcount")
 def word_count(payload: RenderPayload):
     """Return word count statistics for the given Markdown text."""
-    stripped = strip_markdown(payload.content)
-    words = count_words(stripped)
-    chars_with = len(payload.content)
-    chars_without = len(
-        payload.content.replace(" ", "").replace("\n", "").replace("\t", "")
-    )
-    return {
-        "words": words,
-        "chars_with_spaces": chars_with,
-        "chars_without_spaces": chars_without,
-        "reading_time": reading_time(words),
-    }
+    return word_stats(payload.content)
 
 
 @router.post("/outline")
@@ -203,5 +493,5 @@ def get_outline(payload: OutlinePayload):
             "heading_count": 3
         }
     """
-    outline = _extract_outline(payload.content)
+    outline = extract_outline(payload.content)
     return {"outline": outline, "heading_count": len(outline)}
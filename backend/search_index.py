@@ -0,0 +1,477 @@
+"""
+search_index.py
+===============
+Persistent full-text search across a workspace, for ``GET /api/files/search``.
+
+Markdown, text and HTML files under a workspace root are indexed in an
+SQLite FTS5 table stored next to the app settings (or at
+``MARKDOWN_READER_SEARCH_DB``), so the index survives restarts.  The first
+search under a root syncs the index with the tree by comparing each file's
+mtime and size with the stored ones, re-reading only files that changed,
+and starts a ``watchdog`` watch on the root.  From then on the watcher only
+records which paths changed; they are re-indexed just before the next
+query, so a search never walks the tree again.  At most :data:`MAX_ROOTS`
+roots are watched; searching another stops watching the least recently
+searched one, which is synced again (by mtime and size) if searched later.
+
+Results are ranked by BM25 (headings weigh more than body text) and carry
+an HTML-escaped snippet with ``<mark>`` around the hits plus the first
+matching lines with their line numbers.  The query is plain words, all of which must
+match; the last word also matches as a prefix, for search-as-you-type.
+"""
+
+from __future__ import annotations
+
+import html
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+
+from backend.workspace_stats import MAX_FILES, collect_files
+from backend.workspace_watcher import Watch, workspace_watcher
+
+logger = logging.getLogger(__name__)
+
+SEARCH_EXTENSIONS = "md,markdown,txt,html,htm"
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# Roots watched at once.
+MAX_ROOTS = 8
+# Larger files are left out of the index.
+MAX_INDEX_BYTES = 10 * 1024 * 1024
+# Matching lines returned per result.
+_MAX_LINES = 3
+_LINE_CHARS = 200
+
+_SCHEMA_VERSION = 1
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(
+    title, body, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+_WORD_RE = re.compile(r"\w+")
+_HEADING_RE = re.compile(r"^ {0,3}#{1,6}[ \t]+(.+?)[ \t#]*$", re.MULTILINE)
+_HTML_TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r"<[^>]*>")
+_SNIPPET_CHARS = 160
+
+
+def _default_db_path() -> str:
+    value = os.environ.get("MARKDOWN_READER_SEARCH_DB", "").strip()
+    if value:
+        return value
+    from backend.routers.files import _settings_file_path
+
+    return str(_settings_file_path().parent / "search-index.sqlite3")
+
+
+def _extension(path: str) -> str:
+    return os.path.splitext(path)[1][1:].lower()
+
+
+def _document(path: str, text: str) -> tuple[str, str]:
+    """Return the ``(title, body)`` to index; HTML loses its tags.
+
+    Tags are replaced by the newlines they contained, so line numbers in the
+    body are line numbers in the file.
+    """
+    if _extension(path) in {"html", "htm"}:
+        match = _HTML_TITLE_RE.search(text)
+        title = html.unescape(match.group(1).strip()) if match else ""
+        body = html.unescape(_TAG_RE.sub(lambda m: "\n" * m[0].count("\n"), text))
+    else:
+        match = _HEADING_RE.search(text)
+        title = match.group(1) if match else ""
+        body = text
+    return title or os.path.splitext(os.path.basename(path))[0], body
+
+
+def build_query(text: str) -> tuple[str, list[str]]:
+    """Turn free text into an FTS5 query and the lowercase words it matches.
+
+    Raises ValueError if *text* contains no words.
+    """
+    words = [word.lower() for word in _WORD_RE.findall(text)]
+    if not words:
+        raise ValueError("Search query has no words")
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms), words
+
+
+def _fold(text: str) -> str:
+    """Lowercase *text* and drop diacritics, as the FTS tokenizer does."""
+    text = text.lower()
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _line_text(body: str, pos: int) -> str:
+    start = body.rfind("\n", 0, pos) + 1
+    end = body.find("\n", pos)
+    return body[start : end if end != -1 else len(body)].strip()[:_LINE_CHARS]
+
+
+def _snippet(body: str, pos: int, pattern: re.Pattern | None) -> str:
+    """Escaped text around *pos* with the hits of *pattern* in ``<mark>``."""
+    start = max(0, pos - _SNIPPET_CHARS // 3)
+    end = min(len(body), start + _SNIPPET_CHARS)
+    if start:
+        start = body.find(" ", start, pos) + 1 or start
+    text = " ".join(body[start:end].split())
+    if pattern is None:
+        parts = [html.escape(text)]
+    else:
+        parts, last = [], 0
+        for match in pattern.finditer(text):
+            parts.append(html.escape(text[last : match.start()]))
+            parts.append(f"<mark>{html.escape(match[0])}</mark>")
+            last = match.end()
+        parts.append(html.escape(text[last:]))
+    return ("…" if start else "") + "".join(parts) + ("…" if end < len(body) else "")
+
+
+def _hit_pattern(words: list[str]) -> re.Pattern:
+    """Match *words* where the index does: whole tokens, the last as a prefix.
+
+    The unicode61 tokenizer splits on everything but letters and digits, so
+    token boundaries are ``[^\\W_]`` rather than ``\\b`` (which treats ``_``
+    as part of a word).
+    """
+    *whole, last = map(re.escape, words)
+    alternatives = [rf"{word}(?![^\W_])" for word in whole]
+    alternatives.append(rf"{last}[^\W_]*")
+    return re.compile(rf"(?<![^\W_])(?:{'|'.join(alternatives)})", re.IGNORECASE)
+
+
+def _highlight(body: str, words: list[str]) -> tuple[str, list[dict]]:
+    """A snippet around the first hit and the first lines with hits."""
+    pattern = _hit_pattern(words)
+    hits: list[tuple[int, int]] = []  # (line number, offset)
+    line, pos = 1, 0
+    for match in pattern.finditer(body):
+        line += body.count("\n", pos, match.start())
+        pos = match.start()
+        if not hits or hits[-1][0] != line:
+            hits.append((line, pos))
+            if len(hits) == _MAX_LINES:
+                break
+    if not hits and not body.isascii():
+        # The index ignores diacritics ("resume" finds "Résumé"): so do we,
+        # on a slower line-by-line path.
+        folded = _hit_pattern([_fold(word) for word in words])
+        pattern = None
+        offset = 0
+        for number, text in enumerate(body.split("\n"), start=1):
+            if folded.search(_fold(text)):
+                hits.append((number, offset))
+                if len(hits) == _MAX_LINES:
+                    break
+            offset += len(text) + 1
+    if not hits:
+        return _snippet(body, 0, None), []
+    matches = [{"line": n, "text": _line_text(body, offset)} for n, offset in hits]
+    return _snippet(body, hits[0][1], pattern), matches
+
+
+def _path_range(root: str) -> tuple[str, str]:
+    """Bounds selecting every path below *root* with ``>=`` and ``<``."""
+    prefix = root.rstrip(os.sep) + os.sep
+    return prefix, prefix + "\U0010ffff"
+
+
+def _is_hidden(path: str, root: str) -> bool:
+    relative = os.path.relpath(path, root)
+    return any(part.startswith(".") for part in relative.split(os.sep))
+
+
+class _ChangeRecorder(FileSystemEventHandler):
+    def __init__(self, index: SearchIndex):
+        self.index = index
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.event_type not in {"created", "modified", "deleted", "moved"}:
+            return
+        if event.is_directory and event.event_type == "modified":
+            # Its entries report their own events.
+            return
+        paths = [os.fsdecode(event.src_path)]
+        if event.event_type == "moved":
+            paths.append(os.fsdecode(event.dest_path))
+        self.index._mark_dirty(paths, event.is_directory)
+
+
+class SearchIndex:
+    """FTS5 index of the files under one or more workspace roots."""
+
+    def __init__(self, db_path: str | None = None, max_roots: int = MAX_ROOTS):
+        self.db_path = db_path
+        self.max_roots = max_roots
+        self._db: sqlite3.Connection | None = None
+        # Watched roots, least recently searched first.
+        self._roots: OrderedDict[str, Watch | None] = OrderedDict()
+        self._dirty_files: set[str] = set()
+        self._dirty_dirs: set[str] = set()
+        self._lock = threading.RLock()
+        # Files read and indexed so far (for tests and diagnostics).
+        self.indexed = 0
+
+    # ── storage ──────────────────────────────────────────────────────────────
+
+    def _connect(self) -> sqlite3.Connection:
+        # Caller holds the lock.
+        if self._db is not None:
+            return self._db
+        path = self.db_path or _default_db_path()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        try:
+            db = self._open(path)
+        except sqlite3.DatabaseError:
+            # A corrupt index is only a cache: start over.
+            logger.warning("Rebuilding unreadable search index %s", path)
+            os.remove(path)
+            db = self._open(path)
+        self._db = db
+        return db
+
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        try:
+            if db.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+                db.executescript(
+                    "DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS docs;"
+                )
+                db.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            db.execute("PRAGMA journal_mode = WAL")
+            db.executescript(_SCHEMA)
+        except sqlite3.Error:
+            db.close()
+            raise
+        return db
+
+    def _delete(self, db: sqlite3.Connection, path: str) -> None:
+        row = db.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None:
+            db.execute("DELETE FROM docs WHERE rowid = ?", row)
+            db.execute("DELETE FROM files WHERE id = ?", row)
+
+    def _delete_below(self, db: sqlite3.Connection, directory: str) -> None:
+        bounds = _path_range(directory)
+        db.execute(
+            "DELETE FROM docs WHERE rowid IN "
+            "(SELECT id FROM files WHERE path >= ? AND path < ?)",
+            bounds,
+        )
+        db.execute("DELETE FROM files WHERE path >= ? AND path < ?", bounds)
+
+    def _refresh(self, db: sqlite3.Connection, path: str, root: str) -> None:
+        """Bring the entry for *path* in line with the file on disk."""
+        if _extension(path) not in SEARCH_EXTENSIONS.split(",") or _is_hidden(
+            path, root
+        ):
+            return
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._delete(db, path)
+            return
+        if not os.path.isfile(path) or st.st_size > MAX_INDEX_BYTES:
+            self._delete(db, path)
+            return
+        row = db.execute(
+            "SELECT id, mtime_ns, size FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        if row is not None and row[1:] == (st.st_mtime_ns, st.st_size):
+            return
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        except OSError:
+            self._delete(db, path)
+            return
+        title, body = _document(path, text)
+        if row is None:
+            file_id = db.execute(
+                "INSERT INTO files (path, mtime_ns, size) VALUES (?, ?, ?)",
+                (path, st.st_mtime_ns, st.st_size),
+            ).lastrowid
+        else:
+            file_id = row[0]
+            db.execute(
+                "UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?",
+                (st.st_mtime_ns, st.st_size, file_id),
+            )
+            db.execute("DELETE FROM docs WHERE rowid = ?", (file_id,))
+        db.execute(
+            "INSERT INTO docs (rowid, title, body) VALUES (?, ?, ?)",
+            (file_id, title, body),
+        )
+        self.indexed += 1
+
+    # ── keeping up to date ───────────────────────────────────────────────────
+
+    def _root_of(self, path: str) -> str | None:
+        for root in self._roots:
+            if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                return root
+        return None
+
+    def _sync(self, db: sqlite3.Connection, directory: str, root: str) -> None:
+        """Index new and changed files below *directory*, drop vanished ones."""
+        files, _truncated = collect_files(directory, SEARCH_EXTENSIONS, MAX_FILES)
+        present = set(files)
+        low, high = _path_range(directory)
+        db.execute("BEGIN")
+        try:
+            for (path,) in db.execute(
+                "SELECT path FROM files WHERE path >= ? AND path < ?", (low, high)
+            ).fetchall():
+                if path not in present:
+                    self._delete(db, path)
+            for path in files:
+                self._refresh(db, path, root)
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def _mark_dirty(self, paths: list[str], is_directory: bool) -> None:
+        with self._lock:
+            (self._dirty_dirs if is_directory else self._dirty_files).update(paths)
+
+    def _flush(self, db: sqlite3.Connection) -> None:
+        """Re-index the paths the watcher reported since the last query."""
+        dirs, self._dirty_dirs = self._dirty_dirs, set()
+        files, self._dirty_files = self._dirty_files, set()
+        for directory in dirs:
+            root = self._root_of(directory)
+            if root is None:
+                continue
+            if os.path.isdir(directory):
+                self._sync(db, directory, root)
+            else:
+                self._delete_below(db, directory)
+        if not files:
+            return
+        db.execute("BEGIN")
+        try:
+            for path in files:
+                root = self._root_of(path)
+                if root is not None:
+                    self._refresh(db, path, root)
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def _ensure_root(self, db: sqlite3.Connection, root: str) -> None:
+        covering = self._root_of(root)
+        if covering is not None:
+            self._roots.move_to_end(covering)
+            return
+        try:
+            watch = workspace_watcher.watch(root, _ChangeRecorder(self))
+        except OSError:
+            logger.warning("Cannot watch %s; search results may go stale", root)
+            watch = None
+        for nested in [r for r in self._roots if r.startswith(root + os.sep)]:
+            old = self._roots.pop(nested)
+            if old is not None:
+                workspace_watcher.unwatch(old)
+        self._roots[root] = watch
+        while len(self._roots) > self.max_roots:
+            _, old = self._roots.popitem(last=False)
+            if old is not None:
+                workspace_watcher.unwatch(old)
+        self._sync(db, root, root)
+
+    # ── public API ───────────────────────────────────────────────────────────
+
+    def search(self, root: str, query: str, limit: int = DEFAULT_LIMIT) -> dict:
+        """Search the files below *root*, indexing or updating them first.
+
+        Raises ValueError for a query without words, OSError or
+        ``sqlite3.Error`` if the index cannot be used.
+        """
+        started = time.perf_counter()
+        fts_query, words = build_query(query)
+        root = os.path.realpath(root)
+        limit = max(1, min(limit, MAX_LIMIT))
+        low, high = _path_range(root)
+        with self._lock:
+            db = self._connect()
+            self._ensure_root(db, root)
+            self._flush(db)
+            # Rank first, then fetch the bodies of the top rows only.
+            top = db.execute(
+                "SELECT d.rowid, f.path, bm25(docs, 5.0, 1.0) AS score "
+                "FROM docs d JOIN files f ON f.id = d.rowid "
+                "WHERE docs MATCH ? AND f.path >= ? AND f.path < ? "
+                "ORDER BY score LIMIT ?",
+                (fts_query, low, high, limit),
+            ).fetchall()
+            details = {
+                rowid: rest
+                for rowid, *rest in db.execute(
+                    "SELECT rowid, title, body FROM docs WHERE rowid IN "
+                    f"({','.join('?' * len(top))})",
+                    [row[0] for row in top],
+                )
+            }
+            total = db.execute(
+                "SELECT count(*) FROM files WHERE path >= ? AND path < ?", (low, high)
+            ).fetchone()[0]
+        results = []
+        for rowid, path, score in top:
+            title, body = details[rowid]
+            snippet, matches = _highlight(body, words)
+            results.append(
+                {
+                    "path": path,
+                    "title": title,
+                    "score": -score,
+                    "snippet": snippet,
+                    "matches": matches,
+                }
+            )
+        return {
+            "root": root,
+            "query": query,
+            "results": results,
+            "indexed_files": total,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    def shutdown(self) -> None:
+        """Stop watching and close the database (used on application shutdown)."""
+        with self._lock:
+            watches = list(self._roots.values())
+            self._roots.clear()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+        for watch in watches:
+            if watch is not None:
+                workspace_watcher.unwatch(watch)
+
+
+# Process-wide index used by ``GET /api/files/search``.
+search_index = SearchIndex()
@@ -0,0 +1,240 @@
+"""
+theme.py
+========
+Preview stylesheet and scripts, separated from the rendered Markdown body.
+
+The full-page renderer inlines these into every document.  In fragment mode
+the frontend fetches them once per theme from ``/api/markdown/theme.css`` and
+``/api/markdown/theme.js`` instead, so each keystroke only ships body HTML and
+switching theme or font size does not re-render any Markdown.
+"""
+
+from __future__ import annotations
+
+import json
+from functools import lru_cache
+from urllib.parse import urlencode
+
+from backend.highlight import highlight_css
+from backend.render_cache import content_digest
+from backend.render_helpers import MATHJAX_CONFIG_SCRIPT, get_math_styles, mathjax_url
+
+# Adds a "Copy" button to every code block under ``root``.  Idempotent, so the
+# fragment-mode preview can call it again after swapping in new HTML.
+COPY_BUTTON_SCRIPT = """
+window.markdownReaderAddCopyButtons = function(root) {
+  (root || document).querySelectorAll('pre code').forEach(function(block) {
+    var pre = block.parentElement;
+    if (pre.querySelector('.copy-button')) return;
+    var btn = document.createElement('button');
+    btn.className = 'copy-button';
+    btn.textContent = 'Copy';
+    pre.appendChild(btn);
+    btn.addEventListener('click', function() {
+      navigator.clipboard.writeText(block.innerText).then(function() {
+        btn.textContent = 'Copied!';
+        setTimeout(function() { btn.textContent = 'Copy'; }, 1200);
+      });
+    });
+  });
+};
+document.addEventListener('DOMContentLoaded', function() {
+  window.markdownReaderAddCopyButtons(document);
+});
+"""
+
+# Loads MathJax on first use and re-typesets a subtree after a fragment swap.
+# A relative MathJax URL is resolved against this script's own URL, i.e. the
+# backend, not the page that included it.
+_ENHANCE_SCRIPT = """
+(function() {
+  var src = %s;
+  var current = document.currentScript;
+  var script = document.createElement('script');
+  script.src = current ? new URL(src, current.src).href : src;
+  script.defer = true;
+  document.head.appendChild(script);
+})();
+window.markdownReaderEnhance = function(root) {
+  window.markdownReaderAddCopyButtons(root);
+  if (window.MathJax && window.MathJax.typesetPromise) {
+    window.MathJax.typesetPromise(root ? [root] : undefined);
+  }
+};
+"""
+
+
+@lru_cache(maxsize=64)
+def theme_css(*, dark_mode: bool, font_family: str, font_size: int) -> str:
+    """Return the preview stylesheet for one theme/font combination."""
+    # Colour scheme
+    if dark_mode:
+        bg_color = "#1e1e1e"
+        fg_color = "#dcdcdc"
+        code_bg = "#2d2d2d"
+        code_fg = "#dcdcdc"
+        table_header_bg = "#2a2a2a"
+        table_header_fg = "#ccc"
+        table_alt_bg = "#252525"
+        border_color = "#444"
+    else:
+        bg_color = "#ffffff"
+        fg_color = "#1a1a1a"
+        code_bg = "#f4f4f4"
+        code_fg = "#000000"
+        table_header_bg = "#f3f3f3"
+        table_header_fg = "#333"
+        table_alt_bg = "#fafafa"
+        border_color = "#ccc"
+
+    h1 = font_size + 18
+    h2 = font_size + 12
+    h3 = font_size + 8
+    h4 = font_size + 4
+    h5 = font_size + 2
+    h6 = font_size + 1
+    base = font_size + 2
+
+    return f"""
+    {get_math_styles()}
+    {highlight_css(dark_mode=dark_mode)}
+    .copy-button {{
+      position: absolute;
+      top: 8px;
+      right: 8px;
+      background: #cacbd0;
+      color: #313234;
+      font-size: 0.7em;
+      padding: 2px 6px;
+      border: none;
+      border-radius: 3px;
+      cursor: pointer;
+      z-index: 10;
+    }}
+    .copy-button:hover {{ background: #a5a8b6; }}
+    body {{
+      background-color: {bg_color};
+      color: {fg_color};
+      font-family: {font_family};
+      padding: 24px 32px;
+      font-size: {base}px;
+      line-height: 1.65;
+      max-width: 900px;
+      margin: 0 auto;
+    }}
+    h1 {{ font-size: {h1}px; }}
+    h2 {{ font-size: {h2}px; }}
+    h3 {{ font-size: {h3}px; }}
+    h4 {{ font-size: {h4}px; }}
+    h5 {{ font-size: {h5}px; }}
+    h6 {{ font-size: {h6}px; }}
+    b, strong {{ font-weight: bold; }}
+    i, em {{ font-style: italic; }}
+    u {{ text-decoration: underline; }}
+    pre {{
+      position: relative;
+    }}
+    pre code {{
+      background-color: {code_bg};
+      color: {code_fg};
+      font-family: 'Cascadia Code', 'Fira Code', 'Consolas', monospace;
+      font-size: {max(font_size - 2, 10)}px;
+      padding: 28px 14px 14px 14px;
+      border-radius: 6px;
+      overflow-x: auto;
+      display: block;
+      white-space: pre;
+    }}
+    code {{
+      background-color: {code_bg};
+      color: {code_fg};
+      font-family: 'Cascadia Code', 'Fira Code', 'Consolas', monospace;
+      font-size: {max(font_size - 2, 10)}px;
+      padding: 0 4px;
+      border-radius: 3px;
+    }}
+    img {{
+      max-width: 90%;
+      height: auto;
+      display: block;
+      margin: 12px 0;
+    }}
+    table {{
+      border-collapse: collapse;
+      width: 100%;
+      margin: 16px 0;
+      font-size: {base}px;
+    }}
+    th, td {{
+      text-align: left;
+      border: 1px solid {border_color};
+      padding: 10px 14px;
+      vertical-align: top;
+    }}
+    th {{
+      background-color: {table_header_bg};
+      color: {table_header_fg};
+    }}
+    tr:nth-child(even) td {{ background-color: {table_alt_bg}; }}
+    blockquote {{
+      border-left: 4px solid {border_color};
+      margin: 0;
+      padding: 4px 16px;
+      color: {"#aaa" if dark_mode else "#666"};
+    }}
+    hr {{
+      border: none;
+      border-top: 1px solid {border_color};
+      margin: 20px 0;
+    }}
+    a {{ color: {"#7ab3f5" if dark_mode else "#0070f3"}; text-decoration: none; }}
+    a:hover {{ text-decoration: underline; }}
+"""
+
+
+@lru_cache(maxsize=1)
+def theme_script() -> str:
+    """Return the preview script bundle used in fragment mode.
+
+    It configures MathJax, injects the MathJax loader and defines
+    ``window.markdownReaderEnhance(root)`` for the host page to call after
+    inserting freshly rendered HTML.
+    """
+    return (
+        MATHJAX_CONFIG_SCRIPT
+        + COPY_BUTTON_SCRIPT
+        + _ENHANCE_SCRIPT % json.dumps(mathjax_url("mathjax"))
+    )
+
+
+@lru_cache(maxsize=64)
+def theme_version(*, dark_mode: bool, font_family: str, font_size: int) -> str:
+    """Return a short digest identifying this theme's CSS and script."""
+    css = theme_css(dark_mode=dark_mode, font_family=font_family, font_size=font_size)
+    return content_digest(css + theme_script())[:16]
+
+
+@lru_cache(maxsize=1)
+def theme_script_version() -> str:
+    """Return a short digest identifying :func:`theme_script`."""
+    return content_digest(theme_script())[:16]
+
+
+def theme_urls(*, dark_mode: bool, font_family: str, font_size: int) -> dict:
+    """Return versioned stylesheet/script URLs for a fragment-mode preview."""
+    version = theme_version(
+        dark_mode=dark_mode, font_family=font_family, font_size=font_size
+    )
+    query = urlencode(
+        {
+            "dark_mode": str(dark_mode).lower(),
+            "font_family": font_family,
+            "font_size": font_size,
+            "v": version,
+        }
+    )
+    return {
+        "version": version,
+        "stylesheet": f"/api/markdown/theme.css?{query}",
+        "script": f"/api/markdown/theme.js?v={theme_script_version()}",
+    }
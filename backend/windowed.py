@@ -0,0 +1,370 @@
+"""
+windowed.py
+===========
+Windowed rendering for Markdown files too large to preview in one piece.
+
+A multi-megabyte file rendered with ``render_markdown`` becomes one giant
+HTML string that is serialised to JSON and injected into the webview at once.
+Instead, :class:`DocumentIndex` scans the file once and keeps only block
+boundaries: kind, 1-based source lines, byte offsets and an estimated
+rendered height.  :func:`render_window` then reads just the bytes of the
+blocks that overlap a requested line window (or pixel offset), renders them
+through the incremental block cache and returns them with their estimated
+position, so the preview can lay out a scrollbar for the whole document
+while only the visible part exists.
+
+Per-request memory is bounded by the window (at most :data:`MAX_WINDOW_LINES`
+lines and roughly :data:`MAX_WINDOW_BYTES` of source), not by the file.
+Building an index scans the whole file, once per change of its mtime or
+size, but through a memory map as :mod:`backend.line_index` does: lines are
+decoded :data:`_CHUNK_LINES` at a time as the block scan reaches them, so
+the text is never held in memory as a whole.  Indexes for the most recently
+used files are kept in :data:`window_indexes`.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from backend.blocks import (
+    VERBATIM_KINDS,
+    Block,
+    block_spans,
+    is_reference_definition,
+)
+from backend.incremental import incremental_renderer, tag_source_lines
+from backend.line_index import _map
+from markdown_reader.markdown_engines import get_engine
+
+DEFAULT_WINDOW_LINES = 200
+MAX_WINDOW_LINES = 2000
+# Blocks are added to a window until its source exceeds this many bytes (the
+# first block is always included, however large).
+MAX_WINDOW_BYTES = 2 * 1024 * 1024
+_MAX_INDEXES = 8
+# Lines decoded at a time while indexing, and decoded runs kept around for
+# the scan's look-back and look-ahead.
+_CHUNK_LINES = 4096
+_CACHED_CHUNKS = 4
+
+# Height estimate, in CSS pixels at the default 14 px theme.  The preview
+# positions blocks by these estimates alone, so they only need to be close
+# enough for a stable scrollbar.
+_LINE_PX = 24
+_CODE_LINE_PX = 20
+_TABLE_ROW_PX = 33
+_HEADING_PX = 40
+_BLOCK_MARGIN_PX = 16
+_WRAP_CHARS = 90
+
+
+class StaleIndexError(RuntimeError):
+    """The file changed after its index was built."""
+
+
+def estimate_height(kind: str, line_count: int, byte_count: int) -> int:
+    """Return the estimated rendered height of a block in pixels."""
+    if kind == "reference":
+        return 0
+    if kind == "heading":
+        return _HEADING_PX + _BLOCK_MARGIN_PX
+    if kind == "code":
+        return line_count * _CODE_LINE_PX + 2 * _BLOCK_MARGIN_PX
+    if kind == "table":
+        return max(1, line_count - 1) * _TABLE_ROW_PX + _BLOCK_MARGIN_PX
+    wrapped = max(line_count, -(-byte_count // _WRAP_CHARS))
+    return wrapped * _LINE_PX + _BLOCK_MARGIN_PX
+
+
+class _MappedLines(Sequence):
+    """The ``"\\n"``-separated lines of a mapped file, decoded on demand.
+
+    Only :data:`_CACHED_CHUNKS` runs of :data:`_CHUNK_LINES` decoded lines
+    exist at a time; ``line_starts`` holds the byte offset of every line.
+    """
+
+    def __init__(self, data, line_starts: array):
+        self._data = data
+        self.line_starts = line_starts
+        self._length = len(line_starts)
+        self._chunks: OrderedDict[int, list[str]] = OrderedDict()
+        # The chunk of the last lookup: the scan mostly moves line by line.
+        self._number = -1
+        self._current: list[str] = []
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _chunk(self, number: int) -> list[str]:
+        chunk = self._chunks.get(number)
+        if chunk is not None:
+            self._chunks.move_to_end(number)
+            return chunk
+        first = number * _CHUNK_LINES
+        last = first + _CHUNK_LINES
+        end = self.line_starts[last] - 1 if last < self._length else len(self._data)
+        raw = self._data[self.line_starts[first] : end]
+        chunk = raw.decode("utf-8", errors="replace").split("\n")
+        self._chunks[number] = chunk
+        if len(self._chunks) > _CACHED_CHUNKS:
+            self._chunks.popitem(last=False)
+        return chunk
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        number, offset = divmod(index, _CHUNK_LINES)
+        if number != self._number:
+            self._current = self._chunk(number)
+            self._number = number
+        return self._current[offset]
+
+
+@dataclass(frozen=True, slots=True)
+class BlockSpan:
+    """Where a top-level block lives in the file and in the estimated layout."""
+
+    kind: str
+    start_line: int  # 1-based, inclusive
+    end_line: int  # 1-based, inclusive
+    start_byte: int
+    end_byte: int  # exclusive, before the newline that ends the block
+    top: int
+    height: int
+
+
+def _scan(data) -> tuple[list[BlockSpan], str, int]:
+    """Return the block spans, reference definitions and line count of *data*."""
+    # Byte offset of the start of every line; "\n" is one byte in UTF-8,
+    # so line numbers agree between the bytes and the decoded text.
+    line_starts = array("q", [0])
+    pos = data.find(b"\n")
+    while pos != -1:
+        line_starts.append(pos + 1)
+        pos = data.find(b"\n", pos + 1)
+    lines = _MappedLines(data, line_starts)
+
+    spans: list[BlockSpan] = []
+    refs: list[str] = []
+    top = 0
+    for kind, start, end in block_spans(lines):
+        start_byte = line_starts[start]
+        end_byte = line_starts[end] - 1 if end < len(line_starts) else len(data)
+        if kind not in VERBATIM_KINDS:
+            refs.extend(
+                line for line in lines[start:end] if is_reference_definition(line)
+            )
+        height = estimate_height(kind, end - start, end_byte - start_byte)
+        spans.append(BlockSpan(kind, start + 1, end, start_byte, end_byte, top, height))
+        top += height
+    return spans, "\n".join(refs), len(lines)
+
+
+class DocumentIndex:
+    """Block boundaries of one file, built by a single scan."""
+
+    def __init__(
+        self,
+        path: str,
+        stamp: tuple[int, int],
+        spans: list[BlockSpan],
+        refs: str,
+        line_count: int,
+    ):
+        self.path = path
+        self.stamp = stamp
+        self.spans = spans
+        self.refs = refs
+        self.line_count = line_count
+        self.total_height = spans[-1].top + spans[-1].height if spans else 0
+        self._end_lines = [span.end_line for span in spans]
+        self._bottoms = [span.top + span.height for span in spans]
+
+    @property
+    def version(self) -> str:
+        """Changes whenever the file's mtime or size does."""
+        return f"{self.stamp[0]:x}-{self.stamp[1]:x}"
+
+    @classmethod
+    def build(cls, path: str) -> DocumentIndex:
+        """Scan *path* and index its blocks, without reading it into memory."""
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            data = _map(f)
+            try:
+                spans, refs, line_count = _scan(data)
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+        return cls(path, (st.st_mtime_ns, st.st_size), spans, refs, line_count)
+
+    def first_block_at_line(self, line: int) -> int:
+        """Index of the first block that ends on or after *line*."""
+        return bisect_left(self._end_lines, line)
+
+    def first_block_at_offset(self, offset: float) -> int:
+        """Index of the block whose estimated extent contains *offset* px."""
+        return bisect_right(self._bottoms, offset)
+
+    def window(self, first: int, line_count: int) -> list[BlockSpan]:
+        """Return the blocks from index *first* covering *line_count* lines."""
+        if first >= len(self.spans):
+            return []
+        last_line = max(self.spans[first].start_line, 1) + line_count - 1
+        selected = [self.spans[first]]
+        size = selected[0].end_byte - selected[0].start_byte
+        for span in self.spans[first + 1 :]:
+            size += span.end_byte - span.start_byte
+            if span.start_line > last_line or size > MAX_WINDOW_BYTES:
+                break
+            selected.append(span)
+        return selected
+
+    def read_blocks(self, spans: list[BlockSpan]) -> list[Block]:
+        """Read the source of *spans* (consecutive blocks) from the file.
+
+        Raises :class:`StaleIndexError` if the file changed since indexing.
+        """
+        if not spans:
+            return []
+        base = spans[0].start_byte
+        with open(self.path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if (st.st_mtime_ns, st.st_size) != self.stamp:
+                raise StaleIndexError(self.path)
+            f.seek(base)
+            data = f.read(spans[-1].end_byte - base)
+        return [
+            Block(
+                kind=span.kind,
+                text=data[span.start_byte - base : span.end_byte - base]
+                .decode("utf-8", errors="replace")
+                .replace("\r\n", "\n"),
+                start_line=span.start_line,
+                end_line=span.end_line,
+            )
+            for span in spans
+        ]
+
+
+class WindowIndexCache:
+    """LRU of :class:`DocumentIndex` objects, invalidated by mtime/size."""
+
+    def __init__(self, max_entries: int = _MAX_INDEXES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, DocumentIndex] = OrderedDict()
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def get(self, path: str) -> DocumentIndex:
+        """Return the index of *path*, rebuilding it if the file changed.
+
+        Raises OSError if the file cannot be read.
+        """
+        path = os.path.realpath(path)
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            index = self._entries.get(path)
+            if index is not None and index.stamp == stamp:
+                self._entries.move_to_end(path)
+                return index
+        index = DocumentIndex.build(path)
+        with self._lock:
+            self.builds += 1
+            self._entries[path] = index
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.builds = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def render_window(
+    path: str,
+    *,
+    start_line: int = 1,
+    line_count: int = DEFAULT_WINDOW_LINES,
+    offset: float | None = None,
+    base_dir: str | None = None,
+    engine: str | None = None,
+    highlight: bool = True,
+) -> dict:
+    """Render the blocks of *path* that overlap a window of source lines.
+
+    The window starts at the block containing *start_line*, or, when
+    *offset* is given, at the block whose estimated extent contains that
+    pixel offset.  *line_count* is clamped to ``1..MAX_WINDOW_LINES``.
+    Relative images resolve against *base_dir* (default: the file's
+    directory).  Raises OSError if the file cannot be read and ValueError
+    for unknown engines.
+    """
+    engine = get_engine(engine).name
+    line_count = min(max(line_count, 1), MAX_WINDOW_LINES)
+    for attempt in range(2):
+        index = window_indexes.get(path)
+        if offset is not None:
+            first = index.first_block_at_offset(max(offset, 0))
+        else:
+            first = index.first_block_at_line(max(start_line, 1))
+        spans = index.window(first, line_count)
+        try:
+            sources = index.read_blocks(spans)
+            break
+        except StaleIndexError:
+            # Saved between stat and read: re-index once, then give up.
+            if attempt:
+                raise OSError(f"File keeps changing: {path}") from None
+    if base_dir is None:
+        base_dir = os.path.dirname(index.path)
+
+    blocks = []
+    for span, block in zip(spans, sources, strict=True):
+        html = incremental_renderer.render_block(
+            block,
+            base_dir=base_dir,
+            refs=index.refs,
+            engine=engine,
+            highlight=highlight,
+        )
+        blocks.append(
+            {
+                "kind": span.kind,
+                "start_line": span.start_line,
+                "end_line": span.end_line,
+                "top": span.top,
+                "height": span.height,
+                "html": tag_source_lines(html, block) if html else "",
+            }
+        )
+
+    return {
+        "version": index.version,
+        "line_count": index.line_count,
+        "block_count": len(index.spans),
+        "total_height": index.total_height,
+        "first_block": first,
+        "blocks": blocks,
+    }
+
+
+# Process-wide index cache used by ``/api/markdown/render/window``.
+window_indexes = WindowIndexCache()
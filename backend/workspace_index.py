@@ -0,0 +1,285 @@
+"""
+workspace_index.py
+==================
+In-memory directory listings for ``GET /api/files/list``, kept current by
+``watchdog``.
+
+The sidebar lists the same folders over and over (every expand, every
+refresh), and each listing used to be an ``os.scandir`` plus an ``is_dir``
+stat per entry plus a sort.  :class:`WorkspaceIndex` scans each directory
+once, keeps its sorted entries, and drops them again when the observer
+reports that something inside was created, deleted or moved.  Listing an
+already-indexed folder, or the whole tree with ``recursive=true``, is then
+served from memory.
+
+The first listing of a folder that is not yet watched makes that folder a
+*root*.  A flat listing watches only the folder itself, which is one
+inotify watch however large the tree below is (browsing up to ``~`` or
+``/`` must not walk it).  A recursive listing walks the tree anyway, so it
+schedules one recursive watch, and later listings anywhere below it reuse
+that watch.  At most :data:`MAX_ROOTS` recursive and :data:`MAX_FOLDERS`
+flat roots are watched, the least recently used ones being dropped.  If a
+watch cannot be started (for example when the inotify watch limit is
+reached), listings under that root are checked against the directory's
+mtime on every request instead.
+
+Events arrive with a small delay, so the write endpoints invalidate the
+parent folder themselves (:meth:`WorkspaceIndex.invalidate`) to make a saved
+file show up in the next listing at once.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+
+from backend.workspace_watcher import Watch, workspace_watcher
+
+logger = logging.getLogger(__name__)
+
+MAX_ROOTS = 8
+MAX_FOLDERS = 128
+# Recursive listings stop after this many entries.
+MAX_RECURSIVE_ENTRIES = 50_000
+
+
+@dataclass(frozen=True, slots=True)
+class _Entry:
+    name: str
+    is_dir: bool
+    is_link: bool
+    extension: str
+
+
+@dataclass(frozen=True, slots=True)
+class _Listing:
+    entries: tuple[_Entry, ...]
+    mtime_ns: int
+
+
+@dataclass(frozen=True, slots=True)
+class _Root:
+    watch: Watch | None  # None if the folder could not be watched
+    recursive: bool
+
+    def covers(self, path: str, directory: str) -> bool:
+        """Whether this root, at *path*, sees changes in *directory*."""
+        return directory == path or (self.recursive and _is_within(directory, path))
+
+
+def _scan(directory: str) -> _Listing:
+    """Read *directory*, sorted dirs first then by name, hidden entries skipped."""
+    mtime_ns = os.stat(directory).st_mtime_ns
+    entries = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.name.startswith("."):
+                continue
+            try:
+                is_dir = entry.is_dir()
+                is_link = entry.is_symlink()
+            except OSError:
+                continue
+            extension = os.path.splitext(entry.name)[1][1:].lower()
+            entries.append(_Entry(entry.name, is_dir, is_link, extension))
+    entries.sort(key=lambda e: (not e.is_dir, e.name.lower()))
+    return _Listing(tuple(entries), mtime_ns)
+
+
+def _is_within(path: str, root: str) -> bool:
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+class _Invalidator(FileSystemEventHandler):
+    def __init__(self, index: WorkspaceIndex):
+        self.index = index
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.event_type in {"created", "deleted", "moved"}:
+            self.index._changed(os.fsdecode(event.src_path), event.is_directory)
+            if event.event_type == "moved":
+                self.index._changed(os.fsdecode(event.dest_path), event.is_directory)
+        elif event.event_type == "modified" and event.is_directory:
+            # Some platforms only report that a folder's contents changed.
+            self.index._forget(os.fsdecode(event.src_path), subtree=False)
+
+
+class WorkspaceIndex:
+    """Watched, lazily filled cache of directory listings."""
+
+    def __init__(self, max_roots: int = MAX_ROOTS, max_folders: int = MAX_FOLDERS):
+        self.max_roots = max_roots
+        self.max_folders = max_folders
+        self.scans = 0
+        self._listings: dict[str, _Listing] = {}
+        # Watched roots, least recently used first.
+        self._roots: OrderedDict[str, _Root] = OrderedDict()
+        # Bumped by every invalidation, so a scan that raced with an event
+        # is not stored.
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._watch_lock = threading.Lock()
+
+    # ── watching ─────────────────────────────────────────────────────────────
+
+    def _root_for(self, directory: str, recursive: bool) -> _Root:
+        """Return the root watching *directory* (and, if *recursive*, the
+        tree below it), adding one if needed."""
+        # Serialises scheduling, so one folder is never watched twice.
+        with self._watch_lock:
+            return self._add_root(directory, recursive)
+
+    def _add_root(self, directory: str, recursive: bool) -> _Root:
+        with self._lock:
+            for path, root in self._roots.items():
+                if root.covers(path, directory) and (root.recursive or not recursive):
+                    self._roots.move_to_end(path)
+                    return root
+        try:
+            watch = workspace_watcher.watch(
+                directory, _Invalidator(self), recursive=recursive
+            )
+        except OSError:
+            logger.warning("Cannot watch %s; validating by mtime", directory)
+            watch = None
+        added = _Root(watch, recursive)
+        dropped = []
+        with self._lock:
+            # A new root replaces the roots it covers.
+            for path in [
+                p for p, r in self._roots.items() if added.covers(directory, p)
+            ]:
+                dropped.append(self._roots.pop(path))
+            self._roots[directory] = added
+            dropped += self._evict(recursive)
+        for old in dropped:
+            if old.watch is not None:
+                workspace_watcher.unwatch(old.watch)
+        return added
+
+    def _evict(self, recursive: bool) -> list[_Root]:
+        # Caller holds the lock.
+        limit = self.max_roots if recursive else self.max_folders
+        paths = [p for p, r in self._roots.items() if r.recursive == recursive]
+        evicted = []
+        for path in paths[: max(0, len(paths) - limit)]:
+            evicted.append(self._roots.pop(path))
+            if recursive:
+                self._drop_subtree(path)
+            else:
+                self._listings.pop(path, None)
+        return evicted
+
+    def shutdown(self) -> None:
+        """Stop watching (used on application shutdown)."""
+        with self._lock:
+            roots = list(self._roots.values())
+            self._roots.clear()
+            self._listings.clear()
+        for root in roots:
+            if root.watch is not None:
+                workspace_watcher.unwatch(root.watch)
+
+    # ── invalidation ─────────────────────────────────────────────────────────
+
+    def _drop_subtree(self, directory: str) -> None:
+        # Caller holds the lock.
+        for path in [p for p in self._listings if _is_within(p, directory)]:
+            del self._listings[path]
+
+    def _forget(self, directory: str, subtree: bool) -> None:
+        with self._lock:
+            self._generation += 1
+            if subtree:
+                self._drop_subtree(directory)
+            else:
+                self._listings.pop(directory, None)
+
+    def _changed(self, path: str, is_directory: bool) -> None:
+        """*path* appeared or went away: its folder's listing is stale."""
+        self._forget(os.path.dirname(path), subtree=False)
+        if is_directory:
+            self._forget(path, subtree=True)
+
+    def invalidate(self, path: str) -> None:
+        """Forget the listing of the folder containing *path*."""
+        self._changed(os.path.realpath(path), os.path.isdir(path))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._listings.clear()
+
+    # ── listing ──────────────────────────────────────────────────────────────
+
+    def _listing(self, directory: str, watched: bool) -> _Listing:
+        with self._lock:
+            listing = self._listings.get(directory)
+            generation = self._generation
+        if listing is not None and (
+            watched or os.stat(directory).st_mtime_ns == listing.mtime_ns
+        ):
+            return listing
+        listing = _scan(directory)
+        with self._lock:
+            self.scans += 1
+            if self._generation == generation:
+                self._listings[directory] = listing
+        return listing
+
+    def list(
+        self, path: str, extensions: str | None = None, recursive: bool = False
+    ) -> tuple[list[dict], bool]:
+        """Return the entries of *path* like ``/api/files/list``, and whether
+        a recursive listing stopped at :data:`MAX_RECURSIVE_ENTRIES`.
+
+        Entry paths are built from *path* as given.  Recursive listings are
+        depth-first, each folder followed by its contents, and do not descend
+        into symlinked folders.  Raises OSError if *path* cannot be read.
+        """
+        allowed = None
+        if extensions:
+            allowed = {e.strip().lower().lstrip(".") for e in extensions.split(",")}
+        directory = os.path.realpath(path)
+        watched = self._root_for(directory, recursive).watch is not None
+
+        entries: list[dict] = []
+        top = self._listing(directory, watched)
+        stack = [(directory, path, iter(top.entries))]
+        while stack:
+            real, shown, it = stack[-1]
+            entry = next(it, None)
+            if entry is None:
+                stack.pop()
+                continue
+            if not entry.is_dir and allowed and entry.extension not in allowed:
+                continue
+            if recursive and len(entries) >= MAX_RECURSIVE_ENTRIES:
+                return entries, True
+            entry_path = os.path.join(shown, entry.name)
+            entries.append(
+                {
+                    "name": entry.name,
+                    "path": entry_path,
+                    "is_dir": entry.is_dir,
+                    "extension": entry.extension,
+                }
+            )
+            if recursive and entry.is_dir and not entry.is_link:
+                child = os.path.join(real, entry.name)
+                try:
+                    listing = self._listing(child, watched)
+                except OSError:
+                    continue
+                # The folder's contents come right after it.
+                stack.append((child, entry_path, iter(listing.entries)))
+        return entries, False
+
+
+# Process-wide index used by ``GET /api/files/list``.
+workspace_index = WorkspaceIndex()
@@ -0,0 +1,344 @@
+"""
+workspace_stats.py
+==================
+Word, reading-time and heading statistics for many files at once.
+
+``POST /api/files/stats`` takes a directory (scanned recursively) and/or a
+list of paths and streams one JSON line per file as results finish,
+followed by one aggregate ``summary`` line.  Counting is pure-Python work
+that holds the GIL, so uncached files are counted in a pool of worker
+processes, handed out in small batches to keep per-task overhead low.
+Scans with little uncached text are counted in-process instead of paying
+the pool's start-up.
+
+Results are cached by path, modification time and size, so rescanning an
+unchanged tree costs one ``stat`` per file.
+
+Configuration (environment variables):
+
+* ``MARKDOWN_READER_STATS_WORKERS`` – number of worker processes (default:
+  the CPU count, at most 8).
+
+The same scan is available from the command line, e.g. for CI audits::
+
+    python -m backend.workspace_stats docs/ --extensions md,markdown
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import stat
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+from backend.outline import extract_outline
+from markdown_reader.text_stats import reading_time, text_stats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXTENSIONS = "md,markdown"
+MAX_FILES = 20_000
+
+# Files per worker task, and the byte budget that closes a batch early.
+_BATCH_FILES = 32
+_BATCH_BYTES = 4 * 1024 * 1024
+# Below this much uncached text the pool is not worth starting.
+_INLINE_BYTES = 1_000_000
+_CACHE_ENTRIES = 50_000
+
+# Per-file fields that are summed into the summary line.
+_SUMMED = (
+    "size",
+    "words",
+    "cjk_characters",
+    "chars_with_spaces",
+    "chars_without_spaces",
+    "heading_count",
+)
+
+
+def file_stats(path: str) -> dict:
+    """Return the statistics of one UTF-8 text file."""
+    with open(path, encoding="utf-8", errors="replace") as handle:
+        text = handle.read()
+    stats = text_stats(text).as_dict()
+    stats["heading_count"] = len(extract_outline(text))
+    return stats
+
+
+def _stats_batch(paths: list[str]) -> list[tuple[str, dict | None, str | None]]:
+    """Worker task: ``(path, stats, error)`` for each of *paths*."""
+    results = []
+    for path in paths:
+        try:
+            results.append((path, file_stats(path), None))
+        except OSError as exc:
+            results.append((path, None, str(exc)))
+    return results
+
+
+def _warm_worker() -> None:
+    """Pool initializer: pay the import cost before the first batch."""
+    import backend.outline  # noqa: F401
+    import markdown_reader.text_stats  # noqa: F401
+
+
+def collect_files(
+    root: str, extensions: str | None = DEFAULT_EXTENSIONS, max_files: int = MAX_FILES
+) -> tuple[list[str], bool]:
+    """List files under *root* recursively, sorted, skipping hidden entries.
+
+    *extensions* is a comma-separated list like ``/api/files/list`` takes
+    (empty or ``None`` keeps every file).  Returns the paths and whether the
+    listing stopped at *max_files*.  Symlinked directories are not followed.
+    """
+    allowed = None
+    if extensions:
+        allowed = {e.strip().lower().lstrip(".") for e in extensions.split(",")}
+    files: list[str] = []
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name.lower(), reverse=True)
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif allowed is None or (
+                os.path.splitext(entry.name)[1].lstrip(".").lower() in allowed
+            ):
+                if len(files) >= max_files:
+                    return files, True
+                files.append(entry.path)
+    return files, False
+
+
+class WorkspaceStats:
+    """Cached, process-parallel statistics scanner."""
+
+    def __init__(
+        self,
+        workers: int = 1,
+        inline_bytes: int = _INLINE_BYTES,
+        cache_entries: int = _CACHE_ENTRIES,
+    ):
+        self.workers = max(1, workers)
+        self.inline_bytes = inline_bytes
+        self.cache_entries = cache_entries
+        self._cache: OrderedDict[str, tuple[tuple[int, int], dict]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    # ── cache ────────────────────────────────────────────────────────────────
+
+    def _lookup(self, path: str, key: tuple[int, int]) -> dict | None:
+        with self._cache_lock:
+            entry = self._cache.get(path)
+            if entry is None or entry[0] != key:
+                return None
+            self._cache.move_to_end(path)
+            return entry[1]
+
+    def _store(self, path: str, key: tuple[int, int], stats: dict) -> None:
+        with self._cache_lock:
+            self._cache[path] = (key, stats)
+            self._cache.move_to_end(path)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._cache_lock:
+            self._cache.clear()
+
+    # ── pool ─────────────────────────────────────────────────────────────────
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # "spawn" for the same reason as the render pool: forking a
+                # process that runs uvicorn's thread pool can deadlock.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_worker,
+                )
+            return self._executor
+
+    def shutdown(self) -> None:
+        """Stop the pool (used on application shutdown)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _count(
+        self, pending: list[tuple[str, int]]
+    ) -> Iterator[tuple[str, dict | None, str | None]]:
+        """Count *pending* ``(path, size)`` files, yielding as batches finish."""
+        if sum(size for _, size in pending) < self.inline_bytes:
+            for path, _size in pending:
+                yield from _stats_batch([path])
+            return
+
+        batches: list[list[str]] = [[]]
+        batch_bytes = 0
+        for path, size in pending:
+            if len(batches[-1]) >= _BATCH_FILES or batch_bytes >= _BATCH_BYTES:
+                batches.append([])
+                batch_bytes = 0
+            batches[-1].append(path)
+            batch_bytes += size
+
+        pool = self._pool()
+        futures: dict[Future, list[str]] = {
+            pool.submit(_stats_batch, batch): batch for batch in batches
+        }
+        try:
+            for future in as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception:
+                    # A crashed worker breaks the whole pool; finish this
+                    # batch here and let the next scan start a fresh pool.
+                    logger.warning("Stats worker failed", exc_info=True)
+                    self.shutdown()
+                    results = _stats_batch(futures[future])
+                yield from results
+        finally:
+            # The client went away (or we failed): drop queued batches.
+            for future in futures:
+                future.cancel()
+
+    # ── scanning ─────────────────────────────────────────────────────────────
+
+    def scan(self, paths: Iterable[str], *, truncated: bool = False) -> Iterator[dict]:
+        """Yield a record per path as it becomes ready, then a summary.
+
+        Cached files come first.  Records are ``{"type": "file", "path",
+        "cached", "size", "mtime", ...}`` with the fields of
+        :meth:`markdown_reader.text_stats.TextStats.as_dict` plus
+        ``heading_count``, or ``{"type": "error", "path", "detail"}``.
+        """
+        started = time.perf_counter()
+        totals = dict.fromkeys(_SUMMED, 0)
+        counts = {"files": 0, "cached": 0, "errors": 0}
+
+        def record(path: str, info: os.stat_result, stats: dict, cached: bool):
+            counts["files"] += 1
+            counts["cached"] += cached
+            result = {
+                "type": "file",
+                "path": path,
+                "cached": cached,
+                "size": info.st_size,
+                "mtime": info.st_mtime,
+                **stats,
+            }
+            for field in _SUMMED:
+                totals[field] += result[field]
+            return result
+
+        def error(path: str, detail: str) -> dict:
+            counts["errors"] += 1
+            return {"type": "error", "path": path, "detail": detail}
+
+        infos: dict[str, os.stat_result] = {}
+        pending: list[tuple[str, int]] = []
+        for path in dict.fromkeys(paths):
+            try:
+                info = os.stat(path)
+            except OSError as exc:
+                yield error(path, str(exc))
+                continue
+            if not stat.S_ISREG(info.st_mode):
+                yield error(path, f"Not a file: {path}")
+                continue
+            stats = self._lookup(path, (info.st_mtime_ns, info.st_size))
+            if stats is not None:
+                yield record(path, info, stats, cached=True)
+            else:
+                infos[path] = info
+                pending.append((path, info.st_size))
+
+        for path, stats, detail in self._count(pending):
+            if stats is None:
+                yield error(path, detail or "Unreadable file")
+                continue
+            info = infos[path]
+            # Keyed by the stat taken before reading: if the file changed in
+            # between, the next scan sees a new key and counts it again.
+            self._store(path, (info.st_mtime_ns, info.st_size), stats)
+            yield record(path, info, stats, cached=False)
+
+        yield {
+            "type": "summary",
+            **counts,
+            "truncated": truncated,
+            **totals,
+            "reading_time": reading_time(totals["words"]),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+
+def _default_workers() -> int:
+    value = os.environ.get("MARKDOWN_READER_STATS_WORKERS", "").strip()
+    try:
+        return int(value) if value else min(8, os.cpu_count() or 1)
+    except ValueError:
+        return 1
+
+
+# Process-wide scanner used by ``POST /api/files/stats``.
+workspace_stats = WorkspaceStats(workers=_default_workers())
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Print word and heading statistics as JSON lines."
+    )
+    parser.add_argument("paths", nargs="+", help="directories and/or files")
+    parser.add_argument("--extensions", default=DEFAULT_EXTENSIONS)
+    parser.add_argument("--max-files", type=int, default=MAX_FILES)
+    parser.add_argument(
+        "--summary", action="store_true", help="print only the summary line"
+    )
+    args = parser.parse_args(argv)
+
+    files: list[str] = []
+    truncated = False
+    for path in args.paths:
+        if os.path.isdir(path):
+            found, cut = collect_files(path, args.extensions, args.max_files)
+            files.extend(found)
+            truncated = truncated or cut
+        else:
+            files.append(path)
+    try:
+        for item in workspace_stats.scan(files, truncated=truncated):
+            if not args.summary or item["type"] == "summary":
+                print(json.dumps(item), flush=True)
+    finally:
+        workspace_stats.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
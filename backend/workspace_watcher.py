@@ -0,0 +1,133 @@
+"""
+workspace_watcher.py
+====================
+One ``watchdog`` observer for the whole backend.
+
+The listing cache, the search index, quick open and the change-event hub
+all follow the files under the folders the sidebar shows, usually the same
+workspace.  Each used to start its own observer with its own recursive
+watch on that folder, so every change was picked up and decoded several
+times over, and each copy costs inotify watches.  :class:`WorkspaceWatcher`
+runs a single observer, schedules each ``(folder, recursive)`` pair once and
+fans its events out to every handler registered for it.
+
+Callers register before reading the tree they index, so that nothing
+changes unseen between the read and the first event.  The observer holds
+its own lock while it dispatches, and callers register while holding
+theirs, so handlers are run on a separate thread: a handler waiting for
+an index's lock must never hold up that index scheduling a watch.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from dataclasses import dataclass
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+
+logger = logging.getLogger(__name__)
+
+
+class _FanOut(FileSystemEventHandler):
+    """The handler scheduled for one folder, passing events to its users."""
+
+    def __init__(self, events: queue.SimpleQueue):
+        self.events = events
+        self.handlers: tuple[FileSystemEventHandler, ...] = ()
+        self.watch = None
+
+    def dispatch(self, event: FileSystemEvent) -> None:
+        self.events.put((self.handlers, event))
+
+
+def _run_handlers(events: queue.SimpleQueue) -> None:
+    while (item := events.get()) is not None:
+        handlers, event = item
+        for handler in handlers:
+            try:
+                handler.dispatch(event)
+            except Exception:
+                logger.exception("File event handler %r failed", handler)
+
+
+@dataclass(eq=False, slots=True)
+class Watch:
+    """One handler's registration, as returned by :meth:`WorkspaceWatcher.watch`."""
+
+    path: str
+    recursive: bool
+    handler: FileSystemEventHandler
+
+
+class WorkspaceWatcher:
+    """A lazily started observer shared by every watching component."""
+
+    def __init__(self):
+        # (folder, recursive) -> the scheduled fan-out handler
+        self._watches: dict[tuple[str, bool], _FanOut] = {}
+        self._observer: Observer | None = None
+        self._events: queue.SimpleQueue | None = None
+        self._lock = threading.Lock()
+
+    def watch(
+        self, path: str, handler: FileSystemEventHandler, recursive: bool = True
+    ) -> Watch:
+        """Pass the events under folder *path* to *handler*.
+
+        Raises OSError if the folder cannot be watched (for example when the
+        inotify watch limit is reached).
+        """
+        key = (path, recursive)
+        with self._lock:
+            fan_out = self._watches.get(key)
+            if fan_out is None:
+                if self._observer is None:
+                    self._events = queue.SimpleQueue()
+                    threading.Thread(
+                        target=_run_handlers, args=(self._events,), daemon=True
+                    ).start()
+                    self._observer = Observer()
+                    self._observer.daemon = True
+                    self._observer.start()
+                fan_out = _FanOut(self._events)
+                fan_out.watch = self._observer.schedule(
+                    fan_out, path, recursive=recursive
+                )
+                self._watches[key] = fan_out
+            fan_out.handlers += (handler,)
+        return Watch(path, recursive, handler)
+
+    def unwatch(self, watch: Watch) -> None:
+        """Stop passing events to *watch*'s handler; a no-op if already stopped."""
+        key = (watch.path, watch.recursive)
+        with self._lock:
+            fan_out = self._watches.get(key)
+            if fan_out is None or watch.handler not in fan_out.handlers:
+                return
+            fan_out.handlers = tuple(
+                h for h in fan_out.handlers if h is not watch.handler
+            )
+            if fan_out.handlers:
+                return
+            del self._watches[key]
+            try:
+                self._observer.unschedule(fan_out.watch)
+            except (KeyError, OSError):
+                pass
+
+    def shutdown(self) -> None:
+        """Stop the observer (used on application shutdown)."""
+        with self._lock:
+            observer, self._observer = self._observer, None
+            events, self._events = self._events, None
+            self._watches.clear()
+        if observer is not None:
+            observer.stop()
+            events.put(None)
+
+
+# Process-wide watcher shared by the indexes and the event hub.
+workspace_watcher = WorkspaceWatcher()
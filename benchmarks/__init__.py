@@ -0,0 +1 @@
+"""Performance benchmarks for the Markdown Reader backend (not shipped)."""
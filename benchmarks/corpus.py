@@ -0,0 +1,173 @@
+"""
+benchmarks/corpus.py
+====================
+Deterministic synthetic Markdown corpus for render benchmarks.
+
+Documents are assembled from weighted section kinds (prose, CJK prose, pipe
+tables, fenced code, inline math, display math, images, headings) until they
+reach the requested size, so the same ``size``/``mix``/``seed`` always yields
+the same text.
+
+Write a sample document to stdout:
+    python -m benchmarks.corpus --size 200k --mix prose=4,code=2,math=1
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from collections.abc import Callable
+
+_WORDS = (
+    "markdown reader preview render latency block table outline heading "
+    "editor window pane scroll token parser buffer cache budget profile "
+    "document section paragraph release notes audit throughput baseline"
+).split()
+
+_CJK = "中文文档渲染预览速度测试日本語の文章を表示する한국어문서미리보기"
+
+_LANGUAGES = ("python", "javascript", "rust", "bash", "")
+
+DEFAULT_MIX: dict[str, float] = {
+    "prose": 5,
+    "cjk": 1,
+    "table": 1,
+    "code": 2,
+    "inline_math": 1,
+    "display_math": 1,
+    "image": 1,
+    "heading": 2,
+}
+
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.choices(_WORDS, k=rng.randint(6, 16))
+    if rng.random() < 0.3:
+        i = rng.randrange(len(words))
+        words[i] = f"**{words[i]}**"
+    if rng.random() < 0.2:
+        i = rng.randrange(len(words))
+        words[i] = f"`{words[i]}`"
+    if rng.random() < 0.15:
+        i = rng.randrange(len(words))
+        words[i] = f"[{words[i]}](https://example.com/{words[i]})"
+    return " ".join(words).capitalize() + "."
+
+
+def _prose(rng: random.Random) -> str:
+    return " ".join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+
+
+def _cjk(rng: random.Random) -> str:
+    return "".join(rng.choices(_CJK, k=rng.randint(40, 160))) + "。"
+
+
+def _table(rng: random.Random) -> str:
+    cols = rng.randint(2, 5)
+    header = "| " + " | ".join(rng.choices(_WORDS, k=cols)) + " |"
+    separator = "|" + "---|" * cols
+    rows = [
+        "| " + " | ".join(str(rng.randint(0, 9999)) for _ in range(cols)) + " |"
+        for _ in range(rng.randint(3, 12))
+    ]
+    return "\n".join([header, separator, *rows])
+
+
+def _code(rng: random.Random) -> str:
+    lang = rng.choice(_LANGUAGES)
+    lines = [
+        f"{rng.choice(_WORDS)}_{i} = {rng.randint(0, 100)}  # $not math$"
+        for i in range(rng.randint(3, 20))
+    ]
+    return f"```{lang}\n" + "\n".join(lines) + "\n```"
+
+
+def _inline_math(rng: random.Random) -> str:
+    formulas = [
+        f"${rng.choice('abcxyz')}_{i}^{rng.randint(2, 9)}$"
+        for i in range(rng.randint(2, 8))
+    ]
+    return f"{_sentence(rng)} Inline math: " + ", ".join(formulas) + "."
+
+
+def _display_math(rng: random.Random) -> str:
+    n = rng.randint(2, 9)
+    return f"$$\n\\sum_{{i=1}}^{{{n}}} \\frac{{x_i^2}}{{{n}}} = \\int_0^1 f(t)\\,dt\n$$"
+
+
+def _image(rng: random.Random) -> str:
+    name = rng.choice(_WORDS)
+    if rng.random() < 0.5:
+        return f"![{name}](images/{name}.png)"
+    return f"![{name}](https://example.com/{name}.png)"
+
+
+def _heading(rng: random.Random) -> str:
+    level = rng.randint(1, 4)
+    return "#" * level + " " + " ".join(rng.choices(_WORDS, k=rng.randint(1, 5)))
+
+
+SECTIONS: dict[str, Callable[[random.Random], str]] = {
+    "prose": _prose,
+    "cjk": _cjk,
+    "table": _table,
+    "code": _code,
+    "inline_math": _inline_math,
+    "display_math": _display_math,
+    "image": _image,
+    "heading": _heading,
+}
+
+
+def parse_size(value: str) -> int:
+    """Parse ``"10k"``, ``"2m"`` or ``"5000"`` into a size in characters."""
+    value = value.strip().lower()
+    factor = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    number = value[:-1] if factor != 1 else value
+    return int(float(number) * factor)
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """Parse ``"prose=4,code=2"`` into a mix; unknown kinds raise ValueError."""
+    mix: dict[str, float] = {}
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in SECTIONS:
+            raise ValueError(f"Unknown section kind: {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def generate_document(
+    size: int, mix: dict[str, float] | None = None, seed: int = 0
+) -> str:
+    """Return a Markdown document of about *size* characters."""
+    mix = {k: w for k, w in (mix or DEFAULT_MIX).items() if w > 0}
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    rng = random.Random(seed)
+
+    parts: list[str] = []
+    total = 0
+    while total < size:
+        section = SECTIONS[rng.choices(kinds, weights)[0]](rng)
+        parts.append(section)
+        total += len(section) + 2
+    return "\n\n".join(parts) + "\n"
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic Markdown doc.")
+    parser.add_argument("--size", default="100k", help="e.g. 5000, 10k, 2m")
+    parser.add_argument("--mix", default="", help="e.g. prose=4,code=2,table=1")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix) if args.mix else None
+    sys.stdout.write(generate_document(parse_size(args.size), mix, args.seed))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
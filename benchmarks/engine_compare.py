@@ -0,0 +1,202 @@
+"""
+benchmarks/engine_compare.py
+============================
+Conformance and throughput comparison of the Markdown engines.
+
+Every document in the corpus is rendered through each engine in
+``markdown_reader.markdown_engines`` using the same pre-processing the
+preview applies (``render_fragment``).  The report lists, per engine:
+
+* documents per second and MB per second over ``--iterations`` passes;
+* how many documents render differently from the reference engine (the
+  first one named in ``--engines``), after normalising insignificant
+  whitespace and attribute order, with the first few differing lines of each.
+
+The corpus is synthetic documents from ``benchmarks.corpus`` plus any
+Markdown files given with ``--files`` (e.g. ``--files docs/*.md``).
+
+Usage:
+    python -m benchmarks.engine_compare --files 'docs/*.md' --output engines.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import difflib
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.renderer import render_fragment
+from benchmarks.corpus import generate_document, parse_mix, parse_size
+from markdown_reader.markdown_engines import available_engines, get_engine
+
+_BLOCK_TAGS = "div|pre|p|h[1-6]|ul|ol|li|table|thead|tbody|tr|th|td|blockquote|hr"
+_BETWEEN_TAGS_RE = re.compile(rf">\s*(?=</?(?:{_BLOCK_TAGS})\b)")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+_TAG_RE = re.compile(r"<([a-zA-Z][\w-]*)((?:\s+[\w-]+=\"[^\"]*\")+)\s*(/?)>")
+_ATTR_RE = re.compile(r"[\w-]+=\"[^\"]*\"")
+
+
+def _sort_attributes(match: re.Match) -> str:
+    attrs = sorted(_ATTR_RE.findall(match.group(2)))
+    closing = " /" if match.group(3) else ""
+    return f"<{match.group(1)} {' '.join(attrs)}{closing}>"
+
+
+def normalise_html(html: str) -> str:
+    """Drop differences that do not change how *html* renders.
+
+    Whitespace before block-level tags is unified (one per line) and
+    attributes are sorted, so only structural and textual differences remain.
+    """
+    html = _TAG_RE.sub(_sort_attributes, html.strip())
+    html = _BETWEEN_TAGS_RE.sub(">\n", html)
+    return _BLANK_LINES_RE.sub("\n", html)
+
+
+def build_corpus(
+    count: int, size: int, mix: dict[str, float] | None, files: list[str]
+) -> dict[str, str]:
+    """Return ``{name: markdown}`` for *count* synthetic docs plus *files*."""
+    corpus = {
+        f"synthetic-{seed}": generate_document(size, mix, seed) for seed in range(count)
+    }
+    for pattern in files:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                corpus[path] = f.read()
+    return corpus
+
+
+def _throughput(engine: str, corpus: dict[str, str], iterations: int) -> dict:
+    total_bytes = sum(len(text.encode("utf-8")) for text in corpus.values())
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text in corpus.values():
+            render_fragment(text, engine=engine)
+    elapsed = time.perf_counter() - start
+    docs = len(corpus) * iterations
+    return {
+        "seconds": round(elapsed, 4),
+        "docs_per_second": round(docs / elapsed, 2) if elapsed else None,
+        "mb_per_second": (
+            round(total_bytes * iterations / elapsed / 1e6, 3) if elapsed else None
+        ),
+    }
+
+
+def _diff(reference: str, other: str, context_lines: int) -> list[str]:
+    lines = difflib.unified_diff(
+        reference.splitlines(), other.splitlines(), lineterm="", n=0
+    )
+    changed = [
+        line
+        for line in lines
+        if line[:1] in "+-" and not line.startswith(("+++", "---"))
+    ]
+    return changed[:context_lines]
+
+
+def compare_engines(
+    engines: list[str],
+    corpus: dict[str, str],
+    iterations: int = 3,
+    diff_lines: int = 6,
+) -> dict:
+    """Render *corpus* through each engine; return throughput and differences."""
+    reference, *others = engines
+    outputs = {
+        engine: {
+            name: normalise_html(render_fragment(text, engine=engine))
+            for name, text in corpus.items()
+        }
+        for engine in engines
+    }
+
+    report: dict[str, dict] = {}
+    for engine in engines:
+        entry = _throughput(engine, corpus, iterations)
+        if engine in others:
+            differing = {
+                name: _diff(outputs[reference][name], html, diff_lines)
+                for name, html in outputs[engine].items()
+                if html != outputs[reference][name]
+            }
+            entry["identical"] = len(corpus) - len(differing)
+            entry["differing"] = differing
+        report[engine] = entry
+
+    return {
+        "reference": reference,
+        "documents": len(corpus),
+        "iterations": iterations,
+        "engines": report,
+    }
+
+
+def print_report(result: dict) -> None:
+    print(
+        f"{result['documents']} documents × {result['iterations']} iterations, "
+        f"reference engine: {result['reference']}"
+    )
+    for engine, entry in result["engines"].items():
+        conformance = ""
+        if "differing" in entry:
+            conformance = f"  identical {entry['identical']}/{result['documents']}"
+        print(
+            f"{engine:<18} {entry['docs_per_second']:>10.1f} docs/s  "
+            f"{entry['mb_per_second']:>8.2f} MB/s{conformance}"
+        )
+        for name, lines in entry.get("differing", {}).items():
+            print(f"  {name}:")
+            for line in lines:
+                print(f"    {line[:120]}")
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Compare the Markdown engines.")
+    parser.add_argument(
+        "--engines",
+        default=",".join(available_engines()),
+        help="comma-separated engine names; the first is the reference",
+    )
+    parser.add_argument("--count", type=int, default=5, help="synthetic documents")
+    parser.add_argument("--size", default="50k", help="size of each synthetic doc")
+    parser.add_argument("--mix", default="", help="e.g. prose=4,code=2,cjk=1")
+    parser.add_argument(
+        "--files", action="append", default=[], help="glob of Markdown files"
+    )
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--output", help="write the full report as JSON")
+    args = parser.parse_args(argv)
+
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    try:
+        engines = [get_engine(e).name for e in engines]
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    corpus = build_corpus(
+        args.count,
+        parse_size(args.size),
+        parse_mix(args.mix) if args.mix else None,
+        args.files,
+    )
+    result = compare_engines(engines, corpus, args.iterations)
+    print_report(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
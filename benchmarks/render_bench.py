@@ -0,0 +1,306 @@
+"""
+benchmarks/render_bench.py
+==========================
+Latency and peak-memory benchmarks for the Markdown render path.
+
+Targets
+-------
+* ``render``          – ``backend.renderer.render_markdown`` (cache bypassed)
+* ``wordcount``       – the ``/api/markdown/wordcount`` handler
+* ``outline``         – the ``/api/markdown/outline`` handler
+* ``outline_edit``    – typing and deleting one character mid-document in an
+  ``OutlineIndex`` built beforehand (``backend.outline``)
+* ``legacy_preview``  – ``markdown_reader.logic.update_preview`` (tkinter-era
+  path; skipped when its dependencies cannot be imported)
+
+Each target runs on synthetic documents from ``benchmarks.corpus``. The
+benchmark reports p50/p95/p99 latency over the timed iterations. Peak Python
+heap use is measured with ``tracemalloc`` in one extra, untimed iteration.
+Renders that go to the process pool only count the parent process's memory.
+
+Usage:
+    python -m benchmarks.render_bench --sizes 10k,100k,1m --output before.json
+    # … apply an optimisation …
+    python -m benchmarks.render_bench --sizes 10k,100k,1m --output after.json \\
+        --compare before.json --threshold 0.10
+
+With ``--compare`` the exit status is 1 if any target's p50 or p95 grew by
+more than ``--threshold`` (a fraction) against the baseline file.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from datetime import UTC, datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import DEFAULT_MIX, generate_document, parse_mix, parse_size
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+Target = Callable[[str], object]
+
+
+# ── Targets ───────────────────────────────────────────────────────────────────
+
+
+def _render_target() -> Target:
+    from backend.renderer import render_markdown
+
+    return lambda text: render_markdown(text, use_cache=False)
+
+
+def _wordcount_target() -> Target:
+    from backend.routers.markdown import RenderPayload, word_count
+
+    return lambda text: word_count(RenderPayload(content=text))
+
+
+def _outline_target() -> Target:
+    from backend.routers.markdown import OutlinePayload, get_outline
+
+    return lambda text: get_outline(OutlinePayload(content=text))
+
+
+def _outline_edit_target() -> Target:
+    from backend.outline import OutlineIndex, edit_line_range
+
+    prepared: dict[str, tuple] = {}
+
+    def run(text: str) -> object:
+        if text not in prepared:
+            # Type a character mid-document and delete it again, so the index
+            # stays in sync with *text*; only the index update is timed.
+            offset = len(text) // 2
+            typed = text[:offset] + "x" + text[offset:]
+            prepared.clear()
+            prepared[text] = (
+                OutlineIndex(text),
+                edit_line_range(text, offset, 0, "x"),
+                edit_line_range(typed, offset, 1, ""),
+            )
+        index, type_edit, undo_edit = prepared[text]
+        index.replace_lines(*type_edit)
+        return index.replace_lines(*undo_edit)
+
+    return run
+
+
+class _LegacyEditor:
+    """Stands in for the tk.Text widget ``update_preview`` reads from."""
+
+    def __init__(self) -> None:
+        self.text = ""
+
+    def get(self, _start: str, _end: str) -> str:
+        return self.text
+
+
+def _legacy_preview_target() -> Target:
+    from markdown_reader import logic
+
+    editor = _LegacyEditor()
+    fd, preview_file = tempfile.mkstemp(suffix=".html")
+    os.close(fd)
+    app = SimpleNamespace(
+        editors=[editor],
+        notebook=SimpleNamespace(select=lambda: 0, index=lambda _tab: 0),
+        file_paths=[None],
+        preview_file=preview_file,
+    )
+
+    def run(text: str) -> object:
+        editor.text = text
+        return logic.update_preview(app)
+
+    return run
+
+
+TARGETS: dict[str, Callable[[], Target]] = {
+    "render": _render_target,
+    "wordcount": _wordcount_target,
+    "outline": _outline_target,
+    "outline_edit": _outline_edit_target,
+    "legacy_preview": _legacy_preview_target,
+}
+
+
+# ── Measurement ───────────────────────────────────────────────────────────────
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of *samples* (which need not be sorted)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def measure(target: Target, text: str, iterations: int, warmup: int = 1) -> dict:
+    """Time *target* on *text* and record its peak traced memory."""
+    for _ in range(warmup):
+        target(text)
+
+    samples: list[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        target(text)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    try:
+        target(text)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "mean_ms": round(sum(samples) / len(samples), 3),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(
+    sizes: list[int],
+    targets: list[str],
+    iterations: int,
+    mix: dict[str, float] | None = None,
+    seed: int = 0,
+    log: Callable[[str], None] = print,
+) -> dict:
+    """Run every target on a document of every size; return a results dict."""
+    loaded: dict[str, Target] = {}
+    skipped: dict[str, str] = {}
+    for name in targets:
+        try:
+            loaded[name] = TARGETS[name]()
+        except Exception as exc:  # missing optional deps (tkinter, docx, …)
+            skipped[name] = f"{type(exc).__name__}: {exc}"
+            log(f"skipping {name}: {skipped[name]}")
+
+    results: dict[str, dict] = {}
+    for size in sizes:
+        text = generate_document(size, mix, seed)
+        for name, target in loaded.items():
+            key = f"{name}@{size}"
+            results[key] = measure(target, text, iterations)
+            r = results[key]
+            log(
+                f"{key:<24} p50 {r['p50_ms']:>9.2f} ms  p95 {r['p95_ms']:>9.2f} ms  "
+                f"p99 {r['p99_ms']:>9.2f} ms  peak {r['peak_kib']:>10.1f} KiB"
+            )
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "iterations": iterations,
+            "mix": mix or DEFAULT_MIX,
+            "seed": seed,
+            "skipped": skipped,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Return a description of every p50/p95 regression beyond *threshold*."""
+    regressions: list[str] = []
+    for key, now in current["results"].items():
+        before = baseline.get("results", {}).get(key)
+        if not before:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            old, new = before[metric], now[metric]
+            if old > 0 and new > old * (1 + threshold):
+                regressions.append(
+                    f"{key} {metric}: {old:.2f} → {new:.2f} ms "
+                    f"(+{(new / old - 1):.0%}, limit +{threshold:.0%})"
+                )
+    return regressions
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Markdown render path.")
+    parser.add_argument("--sizes", default="10k,100k,1m", help="e.g. 5k,200k,2m")
+    parser.add_argument(
+        "--targets", default=",".join(TARGETS), help=f"subset of {','.join(TARGETS)}"
+    )
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--mix", default="", help="e.g. prose=4,code=2,cjk=1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results JSON to this path")
+    parser.add_argument("--compare", help="baseline results JSON to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="allowed fractional slowdown before --compare fails (default 0.10)",
+    )
+    args = parser.parse_args(argv)
+
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = [t for t in targets if t not in TARGETS]
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(unknown)}")
+
+    results = run_suite(
+        sizes=[parse_size(s) for s in args.sizes.split(",") if s.strip()],
+        targets=targets,
+        iterations=args.iterations,
+        mix=parse_mix(args.mix) if args.mix else None,
+        seed=args.seed,
+    )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"no regressions beyond +{args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
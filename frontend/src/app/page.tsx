@@ -696,6 +696,9 @@ export default function HomePage() {
             showPreview ? (
               <PreviewPane
                 html={editor.previewHtml}
+                windowPath={editor.previewWindowPath}
+                darkMode={editor.darkMode}
+                fontSize={editor.fontSize}
                 loading={isLikelyTauriRuntime && backendStatus === "starting"}
                 error={backendStatus === "error" ? backendMessage : null}
               />
@@ -4,15 +4,29 @@
  * PreviewPane.tsx
  * ===============
  * Rendered Markdown HTML preview in an isolated iframe.
+ * Large files on disk are shown through WindowedPreview instead.
  */
 
+import WindowedPreview from "@/components/WindowedPreview";
+
 type Props = {
   html: string;
   loading?: boolean;
   error?: string | null;
+  /** Render this file window by window instead of showing `html`. */
+  windowPath?: string | null;
+  darkMode?: boolean;
+  fontSize?: number;
 };
 
-export default function PreviewPane({ html, loading = false, error = null }: Props) {
+export default function PreviewPane({
+  html,
+  loading = false,
+  error = null,
+  windowPath = null,
+  darkMode = false,
+  fontSize = 14,
+}: Props) {
   const placeholder = error
     ? `<p style='color:#b91c1c;padding:24px;font-family:sans-serif'>Local engine unavailable.</p>`
     : loading
@@ -21,12 +35,16 @@ export default function PreviewPane({ html, loading = false, error = null }: Pro
 
   return (
     <div className="flex-1 overflow-hidden h-full bg-white dark:bg-[#1e1e1e] border-l border-gray-200 dark:border-gray-700">
-      <iframe
-        title="Markdown Preview"
-        srcDoc={html || placeholder}
-        className="w-full h-full border-none"
-        sandbox="allow-scripts"
-      />
+      {windowPath && !error ? (
+        <WindowedPreview path={windowPath} darkMode={darkMode} fontSize={fontSize} />
+      ) : (
+        <iframe
+          title="Markdown Preview"
+          srcDoc={html || placeholder}
+          className="w-full h-full border-none"
+          sandbox="allow-scripts"
+        />
+      )}
     </div>
   );
 }
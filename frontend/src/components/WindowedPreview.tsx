@@ -0,0 +1,174 @@
+"use client";
+
+/**
+ * WindowedPreview.tsx
+ * ===================
+ * Preview for files too large to render in one piece.
+ *
+ * The iframe holds a spacer sized to the backend's height estimate (so the
+ * scrollbar covers the whole document) and only the blocks around the
+ * current scroll position, fetched from /api/markdown/render/window as the
+ * user scrolls.
+ */
+
+import { useEffect, useRef } from "react";
+import { getBaseUrl, Markdown } from "@/lib/api";
+
+// Source lines fetched per window; comfortably more than one screen.
+const WINDOW_LINES = 400;
+
+// Runs inside the sandboxed iframe: reports the scroll position to the
+// parent when the viewport leaves the part already rendered, and swaps in
+// the window HTML it sends back.  The theme script adds copy buttons and
+// typesets math; it is loaded once and its enhance hook is run on every
+// window swapped in.
+const SHELL = `<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8">
+  <link rel="stylesheet" id="theme">
+</head>
+<body>
+  <div id="spacer" style="position:relative">
+    <div id="window" style="position:absolute;left:0;right:0"></div>
+  </div>
+  <script>
+    const spacer = document.getElementById("spacer");
+    const win = document.getElementById("window");
+    let pending = false;
+    let script = null;
+    // Extent of the rendered window, and the scroll position last reported
+    // while its answer is outstanding.
+    let covered = null;
+    let requested = null;
+    function enhance() {
+      if (window.markdownReaderEnhance) window.markdownReaderEnhance(win);
+    }
+    function loadScript(src) {
+      if (script) return;
+      script = document.createElement("script");
+      script.src = src;
+      // Windows that arrived while the script was loading.
+      script.onload = enhance;
+      document.head.appendChild(script);
+    }
+    function report() {
+      pending = false;
+      const top = window.scrollY;
+      const bottom = top + window.innerHeight;
+      if (covered && top >= covered.top && bottom <= covered.bottom) return;
+      if (requested !== null) return;
+      requested = top;
+      // Start one screen above the viewport so scrolling up is covered too.
+      const offset = Math.max(0, top - window.innerHeight);
+      parent.postMessage({ type: "preview-window", offset }, "*");
+    }
+    window.addEventListener("scroll", () => {
+      if (!pending) {
+        pending = true;
+        requestAnimationFrame(report);
+      }
+    });
+    window.addEventListener("message", (event) => {
+      const data = event.data;
+      if (data && data.type === "preview-window-failed") requested = null;
+      if (!data || data.type !== "preview-window-html") return;
+      const theme = document.getElementById("theme");
+      if (theme.href !== data.stylesheet) theme.href = data.stylesheet;
+      spacer.style.height = data.totalHeight + "px";
+      win.style.top = data.top + "px";
+      // Drop MathJax's record of the math being replaced.
+      if (window.MathJax && window.MathJax.typesetClear) {
+        window.MathJax.typesetClear([win]);
+      }
+      win.innerHTML = data.html;
+      loadScript(data.script);
+      enhance();
+      covered = {
+        top: data.top,
+        bottom: data.atEnd ? Infinity : data.top + win.offsetHeight,
+      };
+      // Scrolled on while this window was fetched: it may not cover the
+      // viewport any more.  Otherwise wait for the next scroll, so a window
+      // shorter than the viewport is not fetched again and again.
+      const moved = requested !== null && requested !== window.scrollY;
+      requested = null;
+      if (moved) report();
+    });
+    report();
+  </script>
+</body>
+</html>`;
+
+type Props = {
+  path: string;
+  darkMode?: boolean;
+  fontSize?: number;
+};
+
+export default function WindowedPreview({ path, darkMode = false, fontSize = 14 }: Props) {
+  const iframeRef = useRef<HTMLIFrameElement>(null);
+  const offsetRef = useRef(0);
+
+  useEffect(() => {
+    let latest = 0;
+    let active = true;
+
+    const fetchWindow = async (offset: number) => {
+      const request = ++latest;
+      const [base, result] = await Promise.all([
+        getBaseUrl(),
+        Markdown.renderWindow({
+          path,
+          offset,
+          line_count: WINDOW_LINES,
+          dark_mode: darkMode,
+          font_size: fontSize,
+        }),
+      ]);
+      // Drop responses overtaken by a newer scroll position.
+      if (!active || request !== latest) return;
+      iframeRef.current?.contentWindow?.postMessage(
+        {
+          type: "preview-window-html",
+          html: result.blocks.map((block) => block.html).join("\n"),
+          top: result.blocks[0]?.top ?? 0,
+          totalHeight: result.total_height,
+          atEnd: result.first_block + result.blocks.length >= result.block_count,
+          stylesheet: `${base}${result.theme.stylesheet}`,
+          script: `${base}${result.theme.script}`,
+        },
+        "*"
+      );
+    };
+
+    const onMessage = (event: MessageEvent) => {
+      if (event.source !== iframeRef.current?.contentWindow) return;
+      if (event.data?.type !== "preview-window") return;
+      offsetRef.current = event.data.offset;
+      fetchWindow(offsetRef.current).catch((error) => {
+        console.error(error);
+        // Let the shell ask again on its next scroll.
+        iframeRef.current?.contentWindow?.postMessage({ type: "preview-window-failed" }, "*");
+      });
+    };
+
+    window.addEventListener("message", onMessage);
+    // Theme or file changed while the shell is already loaded.
+    fetchWindow(offsetRef.current).catch(console.error);
+    return () => {
+      active = false;
+      window.removeEventListener("message", onMessage);
+    };
+  }, [path, darkMode, fontSize]);
+
+  return (
+    <iframe
+      ref={iframeRef}
+      title="Markdown Preview"
+      srcDoc={SHELL}
+      className="w-full h-full border-none"
+      sandbox="allow-scripts"
+    />
+  );
+}
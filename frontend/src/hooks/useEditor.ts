@@ -8,8 +8,17 @@
  *          recent files, dirty state, word count stats.
  */
 
-import { useState, useCallback, useRef } from "react";
-import { Files, Markdown, Export, type ExportPayload, type WordCountResult } from "@/lib/api";
+import { useState, useCallback, useEffect, useRef } from "react";
+import {
+  Files,
+  Markdown,
+  Export,
+  diffTextEdit,
+  watchFiles,
+  type ExportPayload,
+  type OutlineNode,
+  type WordCountResult,
+} from "@/lib/api";
 
 export type Tab = {
   id: string;
@@ -18,10 +27,17 @@ export type Tab = {
   browserHandle?: FileSystemFileHandle | null;
   content: string;
   dirty: boolean;
+  // Text last read from or written to filePath, and its backend hash:
+  // saves send only the edits since then (see Files.patch).
+  saved?: { content: string; hash: string } | null;
 };
 
 const CONVERTIBLE_EXTENSIONS = new Set(["pdf", "html", "htm", "docx"]);
 
+// Saved files at least this long are previewed window by window
+// (see WindowedPreview) instead of as one HTML document.
+const WINDOWED_PREVIEW_CHARS = 2 * 1024 * 1024;
+
 function fileExtension(name: string) {
   return name.split(".").pop()?.toLowerCase() ?? "";
 }
@@ -51,11 +67,12 @@ export function useEditor() {
   const [tabs, setTabs] = useState<Tab[]>([makeTab(nextTabId())]);
   const [activeTabId, setActiveTabId] = useState<string>(tabs[0].id);
   const [previewHtml, setPreviewHtml] = useState<string>("");
+  const [previewWindowPath, setPreviewWindowPath] = useState<string | null>(null);
   const [recentFiles, setRecentFiles] = useState<string[]>([]);
   const [wordCount, setWordCount] = useState<WordCountResult | null>(null);
+  const [outline, setOutline] = useState<OutlineNode[]>([]);
   const [darkMode, setDarkMode] = useState(false);
   const [fontSize, setFontSize] = useState(14);
-  const debounceRef = useRef<ReturnType<typeof setTimeout> | null>(null);
 
   // ── derived state ──────────────────────────────────────────────────────────
   const activeTab = tabs.find((t) => t.id === activeTabId) ?? tabs[0];
@@ -69,19 +86,34 @@ export function useEditor() {
   const refreshPreview = useCallback(
     (content: string, baseDirOverride?: string) => {
       const baseDir = baseDirOverride ?? (activeTab.filePath ? activeTab.filePath.replace(/[^/\\]+$/, "") : undefined);
-      Markdown.render({ content, base_dir: baseDir, dark_mode: darkMode, font_size: fontSize })
-        .then(({ html }) => setPreviewHtml(html))
+      // One request returns the preview, outline and word-count stats.
+      Markdown.document({ content, base_dir: baseDir, dark_mode: darkMode, font_size: fontSize })
+        .then(({ html, outline, stats }) => {
+          setPreviewWindowPath(null);
+          setPreviewHtml(html);
+          setOutline(outline);
+          setWordCount(stats);
+        })
         .catch(console.error);
-
-      // Debounced word-count update
-      if (debounceRef.current) clearTimeout(debounceRef.current);
-      debounceRef.current = setTimeout(() => {
-        Markdown.wordCount(content).then(setWordCount).catch(console.error);
-      }, 400);
     },
     [activeTab.filePath, darkMode, fontSize]
   );
 
+  /** Preview a file as just opened: windowed when it is very large. */
+  const previewFile = useCallback(
+    (content: string, filePath: string) => {
+      if (content.length < WINDOWED_PREVIEW_CHARS) {
+        refreshPreview(content, filePath);
+        return;
+      }
+      setPreviewHtml("");
+      setOutline([]);
+      setPreviewWindowPath(filePath);
+      Markdown.wordCount(content).then(setWordCount).catch(console.error);
+    },
+    [refreshPreview]
+  );
+
   // ── content change ─────────────────────────────────────────────────────────
   const handleContentChange = useCallback(
     (value: string | undefined) => {
@@ -129,17 +161,18 @@ export function useEditor() {
       const existing = tabs.find((t) => t.filePath === filePath);
       if (existing) {
         setActiveTabId(existing.id);
-        refreshPreview(existing.content, filePath);
+        if (existing.dirty) refreshPreview(existing.content, filePath);
+        else previewFile(existing.content, filePath);
         return;
       }
       try {
-        const { content } = await Files.read(filePath);
+        const { content, hash } = await Files.read(filePath);
         const label = filePath.split(/[/\\]/).pop() ?? filePath;
         const id = nextTabId();
-        const newTab = makeTab(id, label, content, filePath, null);
+        const newTab = { ...makeTab(id, label, content, filePath, null), saved: { content, hash } };
         setTabs((prev) => [...prev, newTab]);
         setActiveTabId(id);
-        refreshPreview(content, filePath);
+        previewFile(content, filePath);
         // Record in recent files
         Files.addRecent(filePath)
           .then(({ entries }) => setRecentFiles(entries))
@@ -149,7 +182,7 @@ export function useEditor() {
         throw err;
       }
     },
-    [tabs, refreshPreview]
+    [tabs, refreshPreview, previewFile]
   );
 
   const openTextAsTab = useCallback(
@@ -175,8 +208,19 @@ export function useEditor() {
       const path = filePath ?? activeTab.filePath;
 
       if (path) {
-        await Files.write(path, activeTab.content);
+        const content = activeTab.content;
+        const base = path === activeTab.filePath ? activeTab.saved : null;
+        let saved;
+        try {
+          if (!base) throw new Error("No saved base");
+          const edit = diffTextEdit(base.content, content);
+          saved = await Files.patch(path, edit ? [edit] : [], base.hash);
+        } catch {
+          // Changed on disk (or never read): send the whole document.
+          saved = await Files.write(path, content);
+        }
         updateTab(activeTabId, {
+          saved: { content, hash: saved.hash },
           dirty: false,
           filePath: path,
           label: path.split(/[/\\]/).pop() ?? path,
@@ -200,8 +244,9 @@ export function useEditor() {
         if (!selected) return;
 
         const resolvedPath = Array.isArray(selected) ? selected[0] : selected;
-        await Files.write(resolvedPath, activeTab.content);
+        const { hash } = await Files.write(resolvedPath, activeTab.content);
         updateTab(activeTabId, {
+          saved: { content: activeTab.content, hash },
           dirty: false,
           filePath: resolvedPath,
           browserHandle: null,
@@ -221,11 +266,72 @@ export function useEditor() {
     [activeTab, activeTabId, updateTab]
   );
 
+  // ── external changes ───────────────────────────────────────────────────────
+  // Clean tabs are reloaded when their file changes on disk. The backend
+  // sends each change with the file's hash, so our own saves (whose hash the
+  // tab already holds) and untouched files are never read again.
+  const reloadFromDisk = useCallback(
+    async (path: string, hash: string | null) => {
+      const stale = tabs.filter(
+        (t) => t.filePath === path && !t.dirty && hash !== null && t.saved?.hash !== hash
+      );
+      if (stale.length === 0) return;
+      const { content, hash: readHash } = await Files.read(path);
+      setTabs((prev) =>
+        prev.map((t) =>
+          t.filePath === path && !t.dirty
+            ? { ...t, content, saved: { content, hash: readHash } }
+            : t
+        )
+      );
+      if (stale.some((t) => t.id === activeTabId)) previewFile(content, path);
+    },
+    [tabs, activeTabId, previewFile]
+  );
+  const reloadRef = useRef(reloadFromDisk);
+  reloadRef.current = reloadFromDisk;
+
+  const watchedPaths = Array.from(
+    new Set(tabs.flatMap((t) => (t.filePath ? [t.filePath] : [])))
+  )
+    .sort()
+    .join("\n");
+
+  useEffect(() => {
+    if (!watchedPaths) return;
+    const reload = (path: string, hash: string | null) =>
+      reloadRef.current(path, hash).catch(console.error);
+    let closed = false;
+    let watcher: { close: () => void } | null = null;
+    watchFiles(
+      watchedPaths.split("\n"),
+      (event) => {
+        if (event.type === "moved") {
+          if (event.dest_path) reload(event.dest_path, event.hash);
+        } else if (event.type !== "deleted") {
+          reload(event.path, event.hash);
+        }
+      },
+      // Also sent again after a reconnect: catch up on missed changes.
+      (states) => states.forEach((state) => reload(state.path, state.hash))
+    )
+      .then((w) => {
+        if (closed) w.close();
+        else watcher = w;
+      })
+      .catch(console.error);
+    return () => {
+      closed = true;
+      watcher?.close();
+    };
+  }, [watchedPaths]);
+
   const newTab = useCallback(() => {
     const id = nextTabId();
     setTabs((prev) => [...prev, makeTab(id)]);
     setActiveTabId(id);
     setPreviewHtml("");
+    setPreviewWindowPath(null);
   }, []);
 
   const closeTab = useCallback(
@@ -251,6 +357,7 @@ export function useEditor() {
     setTabs([fresh]);
     setActiveTabId(fresh.id);
     setPreviewHtml("");
+    setPreviewWindowPath(null);
     setWordCount(null);
   }, []);
 
@@ -282,8 +389,10 @@ export function useEditor() {
     activeTabId,
     activeTab,
     previewHtml,
+    previewWindowPath,
     recentFiles,
     wordCount,
+    outline,
     darkMode,
     fontSize,
     setActiveTabId,
@@ -121,18 +121,173 @@ export type ConvertToMarkdownPayload = {
   content_base64?: string;
 };
 
+/** Identifies the saved text, as the base of a later patch. */
+export type SavedVersion = { hash: string; mtime_ns: number };
+
+export type FileRange =
+  | { start_line: number; line_count?: number }
+  | { offset: number; length?: number };
+
+export type FileRangeResult = {
+  path: string;
+  content: string;
+  start_line: number;
+  end_line: number;
+  /** Lines in the whole file. */
+  line_count: number;
+  start_byte: number;
+  end_byte: number;
+  size: number;
+  eof: boolean;
+  truncated: boolean;
+  version: string;
+};
+
+export type SearchResult = {
+  path: string;
+  title: string;
+  /** Higher is better. */
+  score: number;
+  /** HTML-escaped text around the first hit, hits wrapped in <mark>. */
+  snippet: string;
+  matches: { line: number; text: string }[];
+};
+
+export type SearchResponse = {
+  root: string;
+  query: string;
+  results: SearchResult[];
+  indexed_files: number;
+  elapsed_ms: number;
+};
+
+export type QuickOpenResult = {
+  path: string;
+  /** Path below the root, with "/" separators. */
+  relative: string;
+  name: string;
+  /** Offsets of the matched characters in `relative`, for highlighting. */
+  positions: number[];
+};
+
+export type QuickOpenResponse = {
+  root: string;
+  query: string;
+  results: QuickOpenResult[];
+  total_paths: number;
+  truncated: boolean;
+  elapsed_ms: number;
+};
+
+export type WorkspaceStatsPayload = {
+  path?: string;
+  paths?: string[];
+  extensions?: string;
+  max_files?: number;
+};
+
+export type WorkspaceStatsRecord =
+  | {
+      type: "file";
+      path: string;
+      cached: boolean;
+      size: number;
+      mtime: number;
+      words: number;
+      cjk_characters: number;
+      chars_with_spaces: number;
+      chars_without_spaces: number;
+      heading_count: number;
+      reading_time: string;
+    }
+  | { type: "error"; path: string; detail: string }
+  | {
+      type: "summary";
+      files: number;
+      cached: number;
+      errors: number;
+      truncated: boolean;
+      size: number;
+      words: number;
+      cjk_characters: number;
+      chars_with_spaces: number;
+      chars_without_spaces: number;
+      heading_count: number;
+      reading_time: string;
+      elapsed_ms: number;
+    };
+
+/**
+ * Streams per-file statistics (NDJSON) to `onRecord` as the backend finishes
+ * them; resolves with the final summary record.
+ */
+async function streamWorkspaceStats(
+  payload: WorkspaceStatsPayload,
+  onRecord: (record: WorkspaceStatsRecord) => void,
+  signal?: AbortSignal
+) {
+  const base = await getBaseUrl();
+  const res = await fetch(`${base}/api/files/stats`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payload),
+    signal,
+  });
+  if (!res.ok || !res.body) {
+    const detail = await res.text();
+    throw new Error(`API /api/files/stats → ${res.status}: ${detail}`);
+  }
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffered = "";
+  let summary: Extract<WorkspaceStatsRecord, { type: "summary" }> | null = null;
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (value) buffered += value;
+    const lines = buffered.split("\n");
+    buffered = done ? "" : lines.pop() ?? "";
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const record = JSON.parse(line) as WorkspaceStatsRecord;
+      if (record.type === "summary") summary = record;
+      onRecord(record);
+    }
+    if (done) break;
+  }
+  if (!summary) throw new Error("Workspace statistics stream ended early");
+  return summary;
+}
+
 export const Files = {
   read: (path: string) =>
-    apiFetch<{ path: string; content: string }>(
+    apiFetch<{ path: string; content: string } & SavedVersion>(
       `/api/files/read?path=${encodeURIComponent(path)}`
     ),
 
+  /** Reads one window of a (possibly huge) file; see backend/line_index.py. */
+  readRange: (path: string, range: FileRange) => {
+    const qs = new URLSearchParams({ path });
+    for (const [key, value] of Object.entries(range)) {
+      if (value !== undefined) qs.set(key, String(value));
+    }
+    return apiFetch<FileRangeResult>(`/api/files/read?${qs}`);
+  },
+
   write: (path: string, content: string) =>
-    apiFetch<{ path: string; written: boolean }>(`/api/files/write`, {
+    apiFetch<{ path: string; written: boolean } & SavedVersion>(`/api/files/write`, {
       method: "POST",
       body: JSON.stringify({ path, content }),
     }),
 
+  /**
+   * Sends only `edits` against the text whose hash is `base_hash`. Rejects
+   * with a 409 error when the file changed; fall back to `write` then.
+   */
+  patch: (path: string, edits: TextEdit[], base_hash: string) =>
+    apiFetch<{ path: string; written: boolean } & SavedVersion>(`/api/files/patch`, {
+      method: "POST",
+      body: JSON.stringify({ path, edits, base_hash }),
+    }),
+
   convertToMarkdown: (payload: ConvertToMarkdownPayload) =>
     apiFetch<{ markdown: string }>("/api/files/convert-to-markdown", {
       method: "POST",
@@ -146,6 +301,34 @@ export const Files = {
     );
   },
 
+  /** Whole tree below `path`, depth-first (each folder before its contents). */
+  listRecursive: (path: string, extensions?: string) => {
+    const qs = `path=${encodeURIComponent(path)}&recursive=true${extensions ? `&extensions=${extensions}` : ""}`;
+    return apiFetch<{ path: string; entries: FileEntry[]; truncated: boolean }>(
+      `/api/files/list?${qs}`
+    );
+  },
+
+  stats: streamWorkspaceStats,
+
+  /** Full-text search over the Markdown, text and HTML files under `root`. */
+  search: (root: string, q: string, limit?: number) => {
+    const qs = new URLSearchParams({ root, q });
+    if (limit !== undefined) qs.set("limit", String(limit));
+    return apiFetch<SearchResponse>(`/api/files/search?${qs}`);
+  },
+
+  /**
+   * Files under `root` whose path contains `q`, or its characters in order.
+   * Meant to be called on every keystroke; pass a signal to abort the
+   * previous request.
+   */
+  quickOpen: (root: string, q: string, limit?: number, signal?: AbortSignal) => {
+    const qs = new URLSearchParams({ root, q });
+    if (limit !== undefined) qs.set("limit", String(limit));
+    return apiFetch<QuickOpenResponse>(`/api/files/quick-open?${qs}`, { signal });
+  },
+
   getRecent: () =>
     apiFetch<{ entries: string[] }>("/api/files/recent"),
 
@@ -167,18 +350,135 @@ export type RenderPayload = {
   dark_mode?: boolean;
   font_family?: string;
   font_size?: number;
+  /** Return body HTML only; load styles/scripts from `theme` URLs. */
+  fragment?: boolean;
+  /** Markdown engine name from `Markdown.engines()`; omit for the default. */
+  engine?: string;
+  /** Pygments-highlight fenced code on the server (default true). */
+  highlight?: boolean;
+  /** Tag blocks with `data-line`/`data-line-end` and return `line_map`. */
+  source_map?: boolean;
+};
+
+/** `[start_line, end_line]` (1-based, inclusive) of each rendered block. */
+export type LineMap = [number, number][];
+
+export type PreviewTheme = {
+  version: string;
+  /** Path relative to the API base URL. */
+  stylesheet: string;
+  script: string;
+};
+
+export type RenderedBlock = {
+  id: string;
+  kind: string;
+  start_line: number;
+  end_line: number;
+  /** null when the block id was passed in known_ids. */
+  html: string | null;
+};
+
+export type IncrementalRenderResult = {
+  blocks: RenderedBlock[];
+  changed: string[];
+  block_count: number;
+};
+
+export type WindowRenderPayload = {
+  /** Markdown file on disk; the backend reads only the window's bytes. */
+  path: string;
+  start_line?: number;
+  line_count?: number;
+  /** Estimated pixel offset into the document; overrides start_line. */
+  offset?: number;
+  base_dir?: string;
+  dark_mode?: boolean;
+  font_family?: string;
+  font_size?: number;
+  engine?: string;
+  highlight?: boolean;
+};
+
+export type WindowBlock = {
+  kind: string;
+  start_line: number;
+  end_line: number;
+  /** Estimated position and height in pixels. */
+  top: number;
+  height: number;
+  html: string;
+};
+
+export type WindowRenderResult = {
+  /** Changes whenever the file changes on disk. */
+  version: string;
+  line_count: number;
+  block_count: number;
+  total_height: number;
+  first_block: number;
+  blocks: WindowBlock[];
+  theme: PreviewTheme;
 };
 
 export type WordCountResult = {
+  /** Includes CJK characters, each counted as one word. */
   words: number;
+  cjk_characters: number;
   chars_with_spaces: number;
   chars_without_spaces: number;
   reading_time: string;
 };
 
+export type OutlineNode = {
+  level: number;
+  text: string;
+  /** Equals the `id` of the heading in `DocumentResult.html`. */
+  anchor: string;
+  line: number;
+};
+
+export type DocumentResult = {
+  html: string;
+  theme?: PreviewTheme;
+  line_map?: LineMap;
+  outline: OutlineNode[];
+  heading_count: number;
+  stats: WordCountResult;
+};
+
 export const Markdown = {
   render: (payload: RenderPayload) =>
-    apiFetch<{ html: string }>("/api/markdown/render", {
+    apiFetch<{ html: string; line_map?: LineMap }>("/api/markdown/render", {
+      method: "POST",
+      body: JSON.stringify(payload),
+    }),
+
+  /** HTML, outline and word stats in one request. */
+  document: (payload: RenderPayload) =>
+    apiFetch<DocumentResult>("/api/markdown/document", {
+      method: "POST",
+      body: JSON.stringify(payload),
+    }),
+
+  renderFragment: (payload: Omit<RenderPayload, "fragment">) =>
+    apiFetch<{ html: string; theme: PreviewTheme }>("/api/markdown/render", {
+      method: "POST",
+      body: JSON.stringify({ ...payload, fragment: true }),
+    }),
+
+  engines: () =>
+    apiFetch<{ engines: string[]; default: string }>("/api/markdown/engines"),
+
+  renderIncremental: (content: string, known_ids: string[] = [], base_dir?: string) =>
+    apiFetch<IncrementalRenderResult>("/api/markdown/render/incremental", {
+      method: "POST",
+      body: JSON.stringify({ content, base_dir, known_ids }),
+    }),
+
+  /** Blocks of a large file around a line window or pixel offset. */
+  renderWindow: (payload: WindowRenderPayload) =>
+    apiFetch<WindowRenderResult>("/api/markdown/render/window", {
       method: "POST",
       body: JSON.stringify(payload),
     }),
@@ -202,6 +502,170 @@ export const Markdown = {
     }),
 };
 
+// ── Live preview (WebSocket) ──────────────────────────────────────────────────
+
+export type TextEdit = { offset: number; delete: number; insert: string };
+
+const codePoints = (text: string) => {
+  let count = 0;
+  for (const _ of text) count += 1;
+  return count;
+};
+
+/**
+ * The single edit that turns `before` into `after` (common prefix and
+ * suffix kept), with offsets in code points as the backend expects.
+ * Returns null when the texts are equal.
+ */
+export function diffTextEdit(before: string, after: string): TextEdit | null {
+  if (before === after) return null;
+  const limit = Math.min(before.length, after.length);
+  let start = 0;
+  while (start < limit && before.charCodeAt(start) === after.charCodeAt(start)) start++;
+  let end = 0;
+  while (
+    end < limit - start &&
+    before.charCodeAt(before.length - 1 - end) === after.charCodeAt(after.length - 1 - end)
+  ) {
+    end++;
+  }
+  // Do not split a surrogate pair at either edge.
+  if (start > 0 && /[\uD800-\uDBFF]/.test(before[start - 1])) start--;
+  if (end > 0 && /[\uDC00-\uDFFF]/.test(before[before.length - end])) end--;
+  return {
+    offset: codePoints(before.slice(0, start)),
+    delete: codePoints(before.slice(start, before.length - end)),
+    insert: after.slice(start, after.length - end),
+  };
+}
+
+/** Replace `delete` nodes at `start` with `insert`; shift later lines. */
+export type OutlinePatch = {
+  start: number;
+  delete: number;
+  insert: OutlineNode[];
+  line_delta: number;
+};
+
+export type LivePreviewMessage =
+  | {
+      type: "patch";
+      version: number;
+      start: number;
+      delete: number;
+      insert: RenderedBlock[];
+      block_count: number;
+      /** Whole outline, on the first patch after `open()`. */
+      outline?: OutlineNode[];
+      /** Outline changes since the previous patch, in order. */
+      outline_patches?: OutlinePatch[];
+    }
+  | { type: "error"; version: number; detail: string; resync: boolean };
+
+/**
+ * Opens a per-tab live-preview session. Send the document once with
+ * `open()`, then only `edit()`s; the server pushes block patches (see
+ * backend/live_preview.py for the protocol).
+ */
+export async function openLivePreview(
+  onMessage: (message: LivePreviewMessage) => void
+) {
+  const base = await getBaseUrl();
+  const socket = new WebSocket(`${base.replace(/^http/, "ws")}/api/markdown/live`);
+  const ready = new Promise<void>((resolve, reject) => {
+    socket.addEventListener("open", () => resolve(), { once: true });
+    socket.addEventListener("error", () => reject(new Error("Live preview socket failed")), { once: true });
+  });
+  socket.addEventListener("message", (event) => onMessage(JSON.parse(event.data)));
+  let version = 0;
+
+  return {
+    open: async (content: string, base_dir?: string) => {
+      await ready;
+      version += 1;
+      socket.send(JSON.stringify({ type: "open", content, base_dir, version }));
+    },
+    edit: async (edits: TextEdit[]) => {
+      await ready;
+      version += 1;
+      socket.send(JSON.stringify({ type: "edit", edits, version }));
+    },
+    close: () => socket.close(),
+  };
+}
+
+// ── File change events (SSE) ──────────────────────────────────────────────────
+
+export type FileState = {
+  exists: boolean;
+  mtime_ns: number | null;
+  size: number | null;
+  /** Same hash as Files.read returns; null for folders and very large files. */
+  hash: string | null;
+};
+
+export type FileChangeEvent = FileState & {
+  type: "created" | "modified" | "deleted" | "moved";
+  path: string;
+  /** Where a moved file went; the state fields describe that path. */
+  dest_path?: string;
+  is_directory: boolean;
+};
+
+/**
+ * Subscribes to debounced changes of `paths` (files, or folders watched
+ * recursively). `onReady` gets the current state of each path, `onChange`
+ * each change; event paths under a requested path are reported relative to
+ * it as requested, even when it is reached through a symlink. A change to a
+ * file requested under several paths is reported once for each of them.
+ */
+export async function watchFiles(
+  paths: string[],
+  onChange: (event: FileChangeEvent) => void,
+  onReady?: (states: (FileState & { path: string })[]) => void
+) {
+  const base = await getBaseUrl();
+  const qs = new URLSearchParams(paths.map((path) => ["path", path]));
+  const source = new EventSource(`${base}/api/files/events?${qs}`);
+  // Real path -> every path requested for it (a file may be open both
+  // through a symlink and directly).
+  let requested = new Map<string, string[]>();
+  const shown = (path: string): string[] => {
+    const exact = requested.get(path);
+    if (exact) return exact;
+    for (const [real, asRequested] of requested) {
+      if (path.startsWith(real + "/") || path.startsWith(real + "\\")) {
+        return asRequested.map((p) => p + path.slice(real.length));
+      }
+    }
+    return [path];
+  };
+  source.addEventListener("ready", (event) => {
+    const { paths: states } = JSON.parse((event as MessageEvent).data) as {
+      paths: (FileState & { path: string; real_path: string })[];
+    };
+    requested = new Map();
+    for (const state of states) {
+      const known = requested.get(state.real_path) ?? [];
+      requested.set(state.real_path, [...known, state.path]);
+    }
+    onReady?.(states);
+  });
+  source.addEventListener("change", (event) => {
+    const change = JSON.parse((event as MessageEvent).data) as FileChangeEvent;
+    // One event per requested path, so each caller sees the path it asked for.
+    if (change.dest_path) {
+      const [path] = shown(change.path);
+      for (const dest_path of shown(change.dest_path)) {
+        onChange({ ...change, path, dest_path });
+      }
+    } else {
+      for (const path of shown(change.path)) onChange({ ...change, path });
+    }
+  });
+  return { close: () => source.close() };
+}
+
 // ── AI API ────────────────────────────────────────────────────────────────────
 
 export type AgentChatPayload = {
@@ -1,11 +1,14 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
 
+# MathJax for offline previews; populated by scripts/vendor_mathjax.py.
+MATHJAX_DIR = 'backend/static/mathjax'
 
 a = Analysis(
     ['backend/main.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[(MATHJAX_DIR, MATHJAX_DIR)] if os.path.isdir(MATHJAX_DIR) else [],
     hiddenimports=[
         'markdown_reader.logic',
         'markdown_reader.plugins.docx_exporter',
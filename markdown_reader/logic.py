@@ -10,12 +10,13 @@ from pathlib import Path
 from tkinter import messagebox
 
 import html2text
-import markdown2
 import requests
 from docx import Document
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.shared import Inches, Pt, RGBColor
 
+from markdown_reader import markdown_engines, markdown_factory
+
 try:
     import keyring
     from keyring.errors import KeyringError
@@ -726,9 +727,12 @@ def _load_app_settings():
 
 def _save_app_settings(settings):
     """Write app settings to the per-user JSON file."""
+    global _preview_engine_cache
 
     if not isinstance(settings, dict):
         return
+    # The engine may have changed; resolve it again on the next preview.
+    _preview_engine_cache = None
 
     try:
         APP_SETTINGS_FILE_PATH.parent.mkdir(parents=True, exist_ok=True)
@@ -2109,25 +2113,58 @@ def _get_math_styles():
     """
 
 
+# MathJax vendored for the backend by scripts/vendor_mathjax.py; the desktop
+# preview loads it from disk when present so math renders offline.
+_VENDORED_MATHJAX = (
+    Path(__file__).resolve().parent.parent
+    / "backend"
+    / "static"
+    / "mathjax"
+    / "tex-chtml.js"
+)
+_MATHJAX_CDN_URL = "https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-chtml.js"
+
+
 def _get_mathjax_script():
-    return """
+    mathjax_src = (
+        _VENDORED_MATHJAX.as_uri() if _VENDORED_MATHJAX.is_file() else _MATHJAX_CDN_URL
+    )
+    return f"""
         <script>
-            window.MathJax = {
-                tex: {
+            window.MathJax = {{
+                tex: {{
                     inlineMath: [['\\\\(', '\\\\)']],
                     displayMath: [['\\\\[', '\\\\]']],
                     processEscapes: true,
                     processEnvironments: true
-                },
-                options: {
+                }},
+                options: {{
                     skipHtmlTags: ['script', 'noscript', 'style', 'textarea', 'pre', 'code']
-                }
-            };
+                }}
+            }};
         </script>
-        <script defer src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-chtml.js"></script>
+        <script defer src="{mathjax_src}"></script>
     """
 
 
+# The engine named in settings, resolved on first use and reset by
+# _save_app_settings; update_preview runs on every keystroke.
+_preview_engine_cache = None
+
+
+def _preview_engine():
+    """Return the Markdown engine chosen in settings (``markdown_engine``)."""
+    global _preview_engine_cache
+    if _preview_engine_cache is None:
+        try:
+            _preview_engine_cache = markdown_engines.get_engine(
+                _load_app_settings().get("markdown_engine")
+            )
+        except ValueError:
+            _preview_engine_cache = markdown_engines.get_engine()
+    return _preview_engine_cache
+
+
 def update_preview(app):
     """
     Updates the preview of the Markdown file when the file is changed.
@@ -2186,15 +2223,7 @@ def update_preview(app):
             # Protect math BEFORE markdown2 processes it
             protected_text, math_replacements = _protect_math(markdown_text)
 
-            html_content = markdown2.markdown(
-                protected_text,
-                extras=[
-                    "fenced-code-blocks",
-                    "code-friendly",
-                    "tables",
-                    "break-on-newline",
-                ],
-            )
+            html_content = _preview_engine().convert(protected_text)
 
             # Restore math expressions AFTER markdown2
             html_content = _restore_math(html_content, math_replacements)
@@ -2537,16 +2566,8 @@ def export_to_html(app, output_path):
                 print(f"Warning: Could not process image paths: {e}")
 
         # Convert markdown to HTML
-        # FIX APPLIED: Added "break-on-newline" to extras here as well
-        html_content = markdown2.markdown(
-            markdown_text,
-            extras=[
-                "fenced-code-blocks",
-                "code-friendly",
-                "tables",
-                "break-on-newline",
-            ],
-        )
+        # Pooled instance uses the shared preview extras (incl. "break-on-newline")
+        html_content = markdown_factory.convert(markdown_text)
 
         # Get style from app (with fallback)
         font_family = getattr(app, "current_font_family", "Consolas")
@@ -3506,15 +3527,7 @@ def export_to_pdf(app, output_path):
                 print(f"Warning: Could not process image paths: {e}")
 
         # Convert markdown to HTML
-        html_content = markdown2.markdown(
-            markdown_text,
-            extras=[
-                "fenced-code-blocks",
-                "code-friendly",
-                "tables",
-                "break-on-newline",
-            ],
-        )
+        html_content = markdown_factory.convert(markdown_text)
 
         # Get style from app (with fallback)
         font_family = getattr(app, "current_font_family", "Consolas")
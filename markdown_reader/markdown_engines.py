@@ -0,0 +1,132 @@
+"""
+markdown_engines.py
+===================
+Pluggable Markdown → HTML engines.
+
+Every preview path converts Markdown through a :class:`MarkdownEngine`
+looked up by name with :func:`get_engine`.  Two adapters ship with the app:
+
+* ``markdown2`` – the historical engine, via the per-thread instance pool in
+  :mod:`markdown_reader.markdown_factory` (default).
+* ``python-markdown`` – `Python-Markdown <https://python-markdown.github.io>`_
+  with the extensions closest to our markdown2 extras.
+
+Engines only convert Markdown; math protection, image path rewriting and
+theming stay in the callers, so an engine sees the same pre-processed text
+whichever one is selected.
+
+The process-wide default comes from the ``MARKDOWN_READER_ENGINE``
+environment variable; callers may also pass an engine name per call (the
+backend accepts ``engine`` on ``/api/markdown/render`` and the desktop app
+reads ``markdown_engine`` from its settings file).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+
+from markdown_reader import markdown_factory
+
+DEFAULT_ENGINE = "markdown2"
+
+
+class MarkdownEngine:
+    """Base class for engine adapters.
+
+    Subclasses set :attr:`name` and implement :meth:`convert`.  ``convert``
+    may be called from many threads at once, so adapters must keep any
+    per-document state thread-local.  With ``highlight=False`` fenced code
+    must not be run through Pygments.
+    """
+
+    name = ""
+
+    def convert(self, text: str, *, highlight: bool = True) -> str:
+        raise NotImplementedError
+
+
+class Markdown2Engine(MarkdownEngine):
+    """markdown2 with the app's standard preview extras."""
+
+    name = "markdown2"
+
+    def convert(self, text: str, *, highlight: bool = True) -> str:
+        if highlight:
+            return markdown_factory.convert(text)
+        extras = (*markdown_factory.PREVIEW_EXTRAS, markdown_factory.NO_HIGHLIGHT_EXTRA)
+        return markdown_factory.convert(text, extras)
+
+
+class PythonMarkdownEngine(MarkdownEngine):
+    """Python-Markdown, configured to mirror ``PREVIEW_EXTRAS``.
+
+    ``fenced_code``/``tables``/``nl2br`` match markdown2's
+    ``fenced-code-blocks``/``tables``/``break-on-newline``, and ``codehilite``
+    gives the same Pygments markup markdown2 produces for fenced code with a
+    language.  Known differences remain: ``_text_`` is emphasis here but
+    literal under markdown2's ``code-friendly``, and fences without a language
+    are also wrapped in ``<div class="codehilite">``.  Run
+    ``benchmarks/engine_compare.py`` for a current report.
+    """
+
+    name = "python-markdown"
+    extensions = ("fenced_code", "codehilite", "tables", "nl2br")
+    extension_configs = {"codehilite": {"guess_lang": False}}
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+
+    def convert(self, text: str, *, highlight: bool = True) -> str:
+        instances = getattr(self._local, "instances", None)
+        if instances is None:
+            instances = self._local.instances = {}
+        md = instances.get(highlight)
+        if md is None:
+            import markdown
+
+            extensions = [
+                ext for ext in self.extensions if highlight or ext != "codehilite"
+            ]
+            md = instances[highlight] = markdown.Markdown(
+                extensions=extensions, extension_configs=self.extension_configs
+            )
+        return md.reset().convert(text)
+
+
+_ENGINES: dict[str, MarkdownEngine] = {}
+
+
+def register_engine(engine: MarkdownEngine) -> None:
+    """Make *engine* selectable under ``engine.name`` (replacing any previous)."""
+    _ENGINES[engine.name] = engine
+
+
+register_engine(Markdown2Engine())
+register_engine(PythonMarkdownEngine())
+
+
+def available_engines() -> list[str]:
+    """Names of all registered engines, default first."""
+    return sorted(_ENGINES, key=lambda name: (name != DEFAULT_ENGINE, name))
+
+
+def default_engine_name() -> str:
+    """The configured default engine (``MARKDOWN_READER_ENGINE`` or markdown2)."""
+    name = os.environ.get("MARKDOWN_READER_ENGINE", "").strip().lower()
+    return name if name in _ENGINES else DEFAULT_ENGINE
+
+
+def get_engine(name: str | None = None) -> MarkdownEngine:
+    """Return the engine called *name*, or the default when *name* is empty.
+
+    Raises ValueError for an unknown name.
+    """
+    key = (name or "").strip().lower() or default_engine_name()
+    try:
+        return _ENGINES[key]
+    except KeyError:
+        raise ValueError(
+            f"Unknown Markdown engine: {name!r} "
+            f"(available: {', '.join(available_engines())})"
+        ) from None
@@ -0,0 +1,97 @@
+"""
+markdown_factory.py
+===================
+Per-thread pool of preconfigured ``markdown2.Markdown`` instances.
+
+``markdown2.markdown(text, extras=...)`` builds a fresh ``Markdown`` object on
+every call, re-doing the per-instance extras setup.  ``Markdown.convert``
+already resets all per-document state before converting, so one instance can
+safely be reused for any number of documents — but not concurrently, because
+that state lives on the instance.  FastAPI runs sync endpoints on a thread
+pool, so instances are kept per thread and never shared.
+
+Instances are :class:`PreviewMarkdown`, which can memoise the Pygments
+highlighting markdown2 applies to fenced code with a language: once a cache
+is installed with :func:`set_highlight_cache`, each highlighted block is
+stored under its lexer, a digest of its code and the formatter options, so
+unchanged code blocks are never lexed twice.
+
+This module only depends on markdown2, so both the FastAPI backend and the
+legacy tkinter UI can import it cheaply.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections.abc import Iterable
+from typing import Any
+
+import markdown2
+
+# Extras used by every preview/export path in the application.
+PREVIEW_EXTRAS: tuple[str, ...] = (
+    "fenced-code-blocks",
+    "code-friendly",
+    "tables",
+    "break-on-newline",
+)
+
+# Adding this extra stops markdown2 from calling Pygments; fenced code keeps a
+# ``language-…`` class instead, for client-side highlighting.
+NO_HIGHLIGHT_EXTRA = "highlightjs-lang"
+
+_local = threading.local()
+
+# Any object with ``get(key) -> str | None`` and ``put(key, html)``, e.g. a
+# ``backend.render_cache.RenderCache``; None disables memoisation.
+_highlight_cache: Any = None
+
+
+def set_highlight_cache(cache: Any) -> None:
+    """Memoise highlighted code blocks in *cache* (None to stop)."""
+    global _highlight_cache
+    _highlight_cache = cache
+
+
+class PreviewMarkdown(markdown2.Markdown):
+    """``markdown2.Markdown`` whose Pygments step goes through the highlight cache."""
+
+    def _color_with_pygments(self, codeblock: str, lexer, **formatter_opts) -> str:
+        cache = _highlight_cache
+        if cache is None:
+            return super()._color_with_pygments(codeblock, lexer, **formatter_opts)
+        key = (
+            "pygments",
+            lexer.name,
+            hashlib.blake2b(codeblock.encode("utf-8", "surrogatepass")).hexdigest(),
+            repr(sorted(formatter_opts.items())),
+        )
+        html = cache.get(key)
+        if html is None:
+            html = super()._color_with_pygments(codeblock, lexer, **formatter_opts)
+            cache.put(key, html)
+        return html
+
+
+def get_markdown(extras: Iterable[str] = PREVIEW_EXTRAS) -> PreviewMarkdown:
+    """Return this thread's ``Markdown`` instance for the given *extras*.
+
+    The instance is created on first use and reused afterwards.  Do not hand
+    it to another thread.
+    """
+    key = tuple(extras)
+    instances: dict[tuple[str, ...], PreviewMarkdown] | None = getattr(
+        _local, "instances", None
+    )
+    if instances is None:
+        instances = _local.instances = {}
+    md = instances.get(key)
+    if md is None:
+        md = instances[key] = PreviewMarkdown(extras=list(key))
+    return md
+
+
+def convert(text: str, extras: Iterable[str] = PREVIEW_EXTRAS) -> str:
+    """Convert *text* with a pooled instance; drop-in for ``markdown2.markdown``."""
+    return get_markdown(extras).convert(text)
@@ -0,0 +1,412 @@
+"""
+text_stats.py
+=============
+Single-pass word and character statistics for Markdown text.
+
+Shared by the desktop :class:`markdown_reader.word_count_bar.WordCountBar`
+and the backend ``/api/markdown/wordcount`` endpoint, so both report the
+same numbers.
+
+One compiled regex walks the raw Markdown once and finds the markup that
+must not be counted: fenced code, inline code, HTML tags, images, table
+pipes, line-start markers such as ``#``, ``>`` and list bullets, and tokens
+made only of emphasis or link syntax.  The plain text between matches is
+counted with ``str.split`` in bounded slices, and CJK characters count one
+word each.  Emphasis markers and link targets inside a word do not split
+it, so ``**bold**`` and ``[docs](https://…)`` each count as one word.  No
+stripped or padded copy of the document is ever built.
+
+For a document that is edited in place, :class:`ParagraphStats` caches the
+counts of each blank-line-separated paragraph by content and re-counts only
+paragraphs that changed.  Given the lines an edit touched, it reads and
+splits just the paragraphs around them (:meth:`ParagraphStats.recount`).
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from collections.abc import Callable
+from dataclasses import dataclass
+from itertools import accumulate
+
+# Average silent reading speed (words per minute) used by many editors.
+WPM = 238
+
+# CJK Unified Ideographs (+ Extension A/B), Hiragana, Katakana, Hangul.
+_CJK = (
+    r"\u4e00-\u9fff"
+    r"\u3400-\u4dbf"
+    r"\U00020000-\U0002a6df"
+    r"\u3040-\u309f"
+    r"\u30a0-\u30ff"
+    r"\uac00-\ud7af"
+)
+
+# Markup that may sit inside a word without splitting it: emphasis and
+# strikethrough markers, link brackets and link/reference targets.
+_IGNORABLE = r"\](?:\([^()\n]*\)|\[[^\[\]\n]*\])|[*_~\[\]]"
+
+# Markup recognised at the start of a line: fenced code up to its closing
+# fence (or the end of the text), horizontal rules, table delimiter rows and
+# (nested) block markers.
+_BLOCK = (
+    r"(?P<fence> {0,3}(?:"
+    r"(?P<tick>`{3,})[^`\n]*$"
+    r"(?:\n(?! {0,3}(?P=tick)`*[ \t]*(?:\n|\Z))[^\n]*)*"
+    r"|(?P<tilde>~{3,})[^\n]*"
+    r"(?:\n(?! {0,3}(?P=tilde)~*[ \t]*(?:\n|\Z))[^\n]*)*"
+    r")(?:\n[^\n]*)?)"
+    r"|(?P<marker>[ \t]*[-*_]{3,}[ \t]*$"
+    r"|[ \t]*\|?(?:[ \t]*:?-+:?[ \t]*\|)+(?:[ \t]*:?-+:?)?[ \t]*$"
+    r"|[ \t]*(?:(?:>|(?:#{1,6}|[-*+]|\d+\.)(?!\S))[ \t]*)+)"
+)
+_BLOCK_RE = re.compile(_BLOCK, re.MULTILINE)
+# A line break that inline markup may span: not into a blank line or a
+# fence line, both of which end the paragraph.
+_INLINE_NEWLINE = r"\n(?![ \t]*\n| {0,3}(?:`{3}|~{3}))"
+
+# Everything that is not a plain word.  The pattern opens with a character
+# class so the regex engine can skip ordinary text without trying each
+# alternative; the alternatives then look back at that first character.
+_MARKUP_RE = re.compile(
+    rf"[\n`<!|*_~\[\]{_CJK}](?:"
+    rf"(?<=\n)(?:{_BLOCK})"
+    # Inline code: a backtick run up to the next run of the same length,
+    # within one paragraph.
+    r"|(?<=`)(?<!``)(?P<code>(?P<ticks>`*)"
+    rf"(?:[^`\n]+|{_INLINE_NEWLINE}|(?!`(?P=ticks)(?!`))`+)*+`(?P=ticks)(?!`))"
+    rf"|(?<=<)(?P<tag>[/!?]?[A-Za-z](?:[^<>\n]|{_INLINE_NEWLINE})*>)"
+    r"|(?<=!)(?P<image>\[[^\[\]\n]*\]\([^()\n]*\))"
+    r"|(?<=\|)(?P<pipe>)"
+    # Tokens made only of emphasis or link markup, e.g. ``**`` or ``[](x)``.
+    rf"|(?<![^\s][*_~\[\]])(?<=[*_~\[\]])(?P<markup>(?:{_IGNORABLE})*+)(?=\s|\Z)"
+    rf"|(?<=[{_CJK}])(?P<cjk>[{_CJK}]*)"
+    r")",
+    re.MULTILINE,
+)
+_IGNORABLE_RE = re.compile(_IGNORABLE)
+_FENCE_LINE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})(.*)$", re.MULTILINE)
+_SPACE_RE = re.compile(r"\s")
+# Plain text is split in pieces of about this many characters, so counting
+# never holds more than a small slice and its word list in memory.
+_CHUNK = 1 << 16
+
+
+def _count_plain(text: str, start: int, end: int) -> int:
+    """Count whitespace-separated words in ``text[start:end]``."""
+    count = 0
+    while end - start > _CHUNK:
+        space = _SPACE_RE.search(text, start + _CHUNK, end)
+        cut = space.start() if space else end
+        count += len(text[start:cut].split())
+        start = cut
+    return count + len(text[start:end].split())
+
+
+def _markup(text: str):
+    """Yield ``(kind, start, end)`` for each piece of markup in *text*."""
+    pos = 0
+    first = _BLOCK_RE.match(text)
+    if first is not None:
+        yield first.lastgroup, 0, first.end()
+        pos = first.end()
+    for match in _MARKUP_RE.finditer(text, pos):
+        yield match.lastgroup, match.start(), match.end()
+
+
+@dataclass(frozen=True, slots=True)
+class TextStats:
+    """Counts for one piece of Markdown text.
+
+    ``words`` includes CJK characters (one word each); ``cjk_characters``
+    reports them separately.  Stats of consecutive pieces can be added.
+    """
+
+    words: int = 0
+    cjk_characters: int = 0
+    chars_with_spaces: int = 0
+    chars_without_spaces: int = 0
+
+    def __add__(self, other: TextStats) -> TextStats:
+        return TextStats(
+            self.words + other.words,
+            self.cjk_characters + other.cjk_characters,
+            self.chars_with_spaces + other.chars_with_spaces,
+            self.chars_without_spaces + other.chars_without_spaces,
+        )
+
+    def __sub__(self, other: TextStats) -> TextStats:
+        return TextStats(
+            self.words - other.words,
+            self.cjk_characters - other.cjk_characters,
+            self.chars_with_spaces - other.chars_with_spaces,
+            self.chars_without_spaces - other.chars_without_spaces,
+        )
+
+    @property
+    def reading_time(self) -> str:
+        return reading_time(self.words)
+
+    def as_dict(self) -> dict:
+        """JSON shape returned by the ``/wordcount`` endpoint."""
+        return {
+            "words": self.words,
+            "cjk_characters": self.cjk_characters,
+            "chars_with_spaces": self.chars_with_spaces,
+            "chars_without_spaces": self.chars_without_spaces,
+            "reading_time": self.reading_time,
+        }
+
+
+def text_stats(text: str) -> TextStats:
+    """Return word, CJK and character counts for Markdown *text*.
+
+    Spaces, tabs and newlines are the whitespace left out of
+    ``chars_without_spaces``.
+    """
+    words = cjk = pos = 0
+    for kind, start, end in _markup(text):
+        words += _count_plain(text, pos, start)
+        if kind == "cjk":
+            cjk += end - start
+        pos = end
+    words += _count_plain(text, pos, len(text))
+    length = len(text)
+    blank = text.count(" ") + text.count("\n") + text.count("\t")
+    return TextStats(words + cjk, cjk, length, length - blank)
+
+
+def count_words(text: str) -> int:
+    """Count the words of Markdown *text*, one per CJK character."""
+    return text_stats(text).words
+
+
+def strip_markdown(text: str) -> str:
+    """Return *text* with the markup skipped by :func:`text_stats` removed.
+
+    Words keep their text without emphasis markers or link targets; other
+    markup becomes a single space.  Counting never builds this copy.
+    """
+    parts = []
+    pos = 0
+    for kind, start, end in _markup(text):
+        parts.append(_IGNORABLE_RE.sub("", text[pos:start]))
+        parts.append(text[start:end] if kind == "cjk" else " ")
+        pos = end
+    parts.append(_IGNORABLE_RE.sub("", text[pos:]))
+    return "".join(parts)
+
+
+def _fence_after(paragraph: str, fence: str | None) -> str | None:
+    """Return the fence still open after *paragraph*, given the one before."""
+    for match in _FENCE_LINE_RE.finditer(paragraph):
+        marker, rest = match.groups()
+        if fence is None:
+            if marker[0] == "~" or "`" not in rest:
+                fence = marker
+        elif marker[0] == fence[0] and len(marker) >= len(fence) and not rest.strip():
+            fence = None
+    return fence
+
+
+def split_paragraphs(text: str) -> list[str]:
+    """Split *text* at blank lines, keeping fenced code blocks whole.
+
+    The statistics of *text* are the sum of those of its paragraphs, except
+    ``chars_with_spaces`` which leaves out the ``"\n\n"`` between them.
+    """
+    return _split(text)[0]
+
+
+def _split(text: str) -> tuple[list[str], str | None]:
+    """:func:`split_paragraphs`, plus the fence left open at the end."""
+    pieces = text.split("\n\n")
+    if "```" not in text and "~~~" not in text:
+        return pieces, None
+    paragraphs = []
+    run: list[str] = []
+    fence = None
+    for piece in pieces:
+        if fence is not None or "```" in piece or "~~~" in piece:
+            fence = _fence_after(piece, fence)
+        if fence is not None:
+            run.append(piece)
+        elif run:
+            run.append(piece)
+            paragraphs.append("\n\n".join(run))
+            run = []
+        else:
+            paragraphs.append(piece)
+    if run:
+        paragraphs.append("\n\n".join(run))
+    return paragraphs, fence
+
+
+class ParagraphStats:
+    """Incremental :func:`text_stats` for a document that is edited in place.
+
+    Per-paragraph statistics are cached by paragraph content, so after an
+    edit only the paragraphs whose content changed are counted again.  When
+    the caller knows which lines changed, :meth:`edit` reads only the
+    paragraphs around them instead of the whole document.
+
+    Usage::
+
+        cache = ParagraphStats()
+        stats = cache.update(document)     # after loading or any edit
+        cache.changed(3, 5, -1)            # lines 3-5 became 2 lines
+        stats = cache.recount(read_lines)  # reads only around lines 3-4
+        selected = cache.stats(selection)  # reuses the document's paragraphs
+    """
+
+    def __init__(self) -> None:
+        self._cache: dict[str, TextStats] = {}
+        # Paragraphs counted from scratch so far (cache misses).
+        self.counted = 0
+        # The document as of the last update() or edit(): its paragraphs,
+        # their statistics and line counts, and the sum of those statistics.
+        self._paragraphs: list[str] | None = None
+        self._counts: list[TextStats] = []
+        self._lines: list[int] = []
+        self._line_count = 0
+        self._sum = TextStats()
+        # Lines changed since then (see changed()), in current numbering,
+        # and the number of lines added.
+        self._dirty: tuple[int, int] | None = None
+        self._shift = 0
+
+    def update(self, text: str) -> TextStats:
+        """Return the statistics of *text* and make it the cached document."""
+        paragraphs = split_paragraphs(text)
+        counts = self._count(paragraphs)
+        # Only the current document's paragraphs stay cached.
+        self._cache = dict(zip(paragraphs, counts, strict=True))
+        self._paragraphs = paragraphs
+        self._counts = counts
+        self._lines = [paragraph.count("\n") + 1 for paragraph in paragraphs]
+        self._line_count = text.count("\n") + 1
+        self._sum = sum(counts, TextStats())
+        self._dirty = None
+        self._shift = 0
+        return self._total()
+
+    def changed(self, first_line: int, last_line: int, added_lines: int) -> None:
+        """Note an edit to the cached document, for :meth:`recount`.
+
+        Lines ``first_line..last_line`` (1-based, inclusive, as numbered
+        before the edit) were replaced by ``last_line - first_line + 1 +
+        added_lines`` lines; the lines around them are unchanged.
+        """
+        if self._paragraphs is None:
+            return
+        last = last_line + added_lines
+        if self._dirty is None:
+            self._dirty = (first_line, last)
+        else:
+            # Earlier changes below this edit move with it.
+            low, high = self._dirty
+            if low > last_line:
+                low += added_lines
+            if high > last_line:
+                high += added_lines
+            self._dirty = (min(low, first_line), max(high, last))
+        self._shift += added_lines
+
+    def recount(self, read_lines: Callable[[int, int], str]) -> TextStats | None:
+        """Return the statistics of the cached document after :meth:`changed`.
+
+        ``read_lines(first, last)`` must return lines *first* to *last*
+        (1-based, inclusive) of the edited document, joined by ``"\n"``;
+        only the paragraphs around the changed lines are read.
+
+        Returns None when there is no cached document or the edits leave a
+        code fence open before later paragraphs; call :meth:`update` with
+        the whole text instead.
+        """
+        paragraphs = self._paragraphs
+        if paragraphs is None:
+            return None
+        if self._dirty is None:
+            return self._total()
+        shift = self._shift
+        line_count = self._line_count + shift
+        first_line = min(max(self._dirty[0], 1), line_count)
+        last_line = min(max(self._dirty[1], first_line), line_count)
+        old_last = min(max(last_line - shift, 1), self._line_count)
+
+        # starts[k] is the first line of paragraph k; a blank line follows
+        # each paragraph but the last.
+        starts = list(
+            accumulate(self._lines, lambda start, n: start + n + 1, initial=1)
+        )
+        first = bisect_right(starts, first_line) - 1
+        last = max(bisect_right(starts, old_last) - 1, first)
+        # One more paragraph on each side: typing into the blank line between
+        # two paragraphs joins them.
+        first = max(first - 1, 0)
+        last = min(last + 1, len(paragraphs) - 1)
+        start = starts[first]
+        end = starts[last + 1] - 2 + shift
+
+        pieces, fence = _split(read_lines(start, end))
+        if fence is not None and last < len(paragraphs) - 1:
+            # The paragraphs after these now split differently.
+            return None
+        counts = self._count(pieces)
+        self._sum = (
+            self._sum - sum(self._counts[first : last + 1], TextStats())
+        ) + sum(counts, TextStats())
+        paragraphs[first : last + 1] = pieces
+        self._counts[first : last + 1] = counts
+        self._lines[first : last + 1] = [piece.count("\n") + 1 for piece in pieces]
+        self._line_count = line_count
+        self._dirty = None
+        self._shift = 0
+        self._cache.update(zip(pieces, counts, strict=True))
+        if len(self._cache) > 2 * len(paragraphs) + 64:
+            self._cache = dict(zip(paragraphs, self._counts, strict=True))
+        return self._total()
+
+    def stats(self, text: str) -> TextStats:
+        """Return the statistics of *text* without changing the cache."""
+        paragraphs = split_paragraphs(text)
+        total = sum(self._count(paragraphs), TextStats())
+        # Blank lines between paragraphs hold only whitespace.
+        return TextStats(
+            total.words, total.cjk_characters, len(text), total.chars_without_spaces
+        )
+
+    def _count(self, paragraphs: list[str]) -> list[TextStats]:
+        cache = self._cache
+        fresh: dict[str, TextStats] = {}
+        counts = []
+        for paragraph in paragraphs:
+            stats = cache.get(paragraph) or fresh.get(paragraph)
+            if stats is None:
+                stats = text_stats(paragraph)
+                self.counted += 1
+                fresh[paragraph] = stats
+            counts.append(stats)
+        return counts
+
+    def _total(self) -> TextStats:
+        total = self._sum
+        # Each "\n\n" between paragraphs is two characters, both blank.
+        separators = 2 * (len(self._counts) - 1)
+        return TextStats(
+            total.words,
+            total.cjk_characters,
+            total.chars_with_spaces + separators,
+            total.chars_without_spaces,
+        )
+
+
+def reading_time(word_count: int) -> str:
+    """Return a human-readable estimated reading time string."""
+    if word_count == 0:
+        return "< 1 min read"
+    minutes = word_count / WPM
+    if minutes < 1:
+        return "< 1 min read"
+    return f"{round(minutes)} min read"
@@ -17,117 +17,25 @@ Integration points (in app.py / the editor module):
 Dependencies: tkinter (stdlib), ttkbootstrap (already in requirements.txt)
 """
 
-import re
 import tkinter as tk
 
 import ttkbootstrap as ttk
 
-# Average silent reading speed (words per minute) used by many editors.
-_WPM = 238
+from markdown_reader.text_stats import ParagraphStats
 
 # Delay (ms) after the last keystroke before recomputing stats.
 # Keeps the UI responsive on large documents.
 _DEBOUNCE_MS = 400
 
-
-def _strip_markdown(text: str) -> str:
-    """
-    Remove common Markdown syntax tokens so that word count reflects
-    readable prose rather than raw markup characters.
-
-    Handles: ATX headings, setext headings, bold/italic markers, inline code,
-    fenced code blocks, blockquote markers, link/image syntax, HTML tags,
-    horizontal rules, and table pipe characters.
-    """
-    # Fenced code blocks  (``` ... ``` or ~~~ ... ~~~)
-    text = re.sub(r"```[\s\S]*?```", " ", text)
-    text = re.sub(r"~~~[\s\S]*?~~~", " ", text)
-
-    # Inline code
-    text = re.sub(r"`[^`]*`", " ", text)
-
-    # HTML tags
-    text = re.sub(r"<[^>]+>", " ", text)
-
-    # Images  ![alt](url)
-    text = re.sub(r"!\[[^\]]*\]\([^)]*\)", " ", text)
-
-    # Links  [text](url)  — keep the link text
-    text = re.sub(r"\[([^\]]*)\]\([^)]*\)", r"\1", text)
-
-    # Reference-style links  [text][ref]
-    text = re.sub(r"\[([^\]]*)\]\[[^\]]*\]", r"\1", text)
-
-    # ATX headings  (# Heading)
-    text = re.sub(r"^#{1,6}\s+", "", text, flags=re.MULTILINE)
-
-    # Bold / italic  (**text**, __text__, *text*, _text_)
-    text = re.sub(r"\*{1,3}|_{1,3}", "", text)
-
-    # Strikethrough  ~~text~~
-    text = re.sub(r"~~", "", text)
-
-    # Blockquote markers
-    text = re.sub(r"^>\s?", "", text, flags=re.MULTILINE)
-
-    # Horizontal rules
-    text = re.sub(r"^[-*_]{3,}\s*$", "", text, flags=re.MULTILINE)
-
-    # Table pipe characters
-    text = re.sub(r"\|", " ", text)
-
-    # Unordered list markers at line start
-    text = re.sub(r"^[\s]*[-*+]\s+", "", text, flags=re.MULTILINE)
-
-    # Ordered list markers
-    text = re.sub(r"^\s*\d+\.\s+", "", text, flags=re.MULTILINE)
-
-    return text
-
-
-def _count_words(text: str) -> int:
-    """
-    Count words in *stripped* text.
-
-    Uses Unicode-aware splitting so that CJK characters (each of which is
-    semantically one word) are counted individually, while ASCII/Latin words
-    are split on whitespace boundaries.
-    """
-    if not text.strip():
-        return 0
-
-    # CJK Unified Ideographs and common CJK extensions
-    cjk_pattern = re.compile(
-        r"[\u4e00-\u9fff"  # CJK Unified Ideographs
-        r"\u3400-\u4dbf"  # CJK Extension A
-        r"\U00020000-\U0002a6df"  # CJK Extension B
-        r"\u3040-\u309f"  # Hiragana
-        r"\u30a0-\u30ff"  # Katakana
-        r"\uac00-\ud7af]"  # Hangul Syllables
-    )
-
-    # Replace each CJK character with a whitespace-delimited token so that
-    # str.split() picks them up as individual words.
-    spaced = cjk_pattern.sub(r" \g<0> ", text)
-    return len(spaced.split())
-
-
-def _reading_time(word_count: int) -> str:
-    """Return a human-readable estimated reading time string."""
-    if word_count == 0:
-        return "< 1 min read"
-    minutes = word_count / _WPM
-    if minutes < 1:
-        return "< 1 min read"
-    minutes = round(minutes)
-    return f"{minutes} min read"
+# Widget commands that change the text.
+_EDITS = frozenset({"insert", "delete", "replace"})
 
 
 class WordCountBar(ttk.Frame):
     """
     A slim status bar widget that lives at the bottom of an editor tab.
 
-    Displays:
+    Displays (see :mod:`markdown_reader.text_stats`):
       • Word count (Markdown-stripped)
       • Character count with spaces
       • Character count without spaces
@@ -148,6 +56,17 @@ class WordCountBar(ttk.Frame):
 
         self._text_widget: tk.Text | None = None
         self._debounce_id: str | None = None
+        # The attached widget's own Tcl command, renamed while _dispatch
+        # stands in for it.
+        self._widget_command: str | None = None
+
+        # Per-paragraph counts of the attached document.  _dispatch notes the
+        # lines each edit touches, so a refresh reads and re-counts only the
+        # paragraphs around them.  Selection-only events reuse the last
+        # document summary without reading the text again.
+        self._paragraph_stats = ParagraphStats()
+        self._summary: str | None = None
+        self._recount_all = True
 
         # ── layout ──────────────────────────────────────────────────────────
         # Single label on the left for all stats; padding keeps it away from
@@ -173,13 +92,18 @@ class WordCountBar(ttk.Frame):
         """
         self._detach()
         self._text_widget = text_widget
+        self._paragraph_stats = ParagraphStats()
+        self._recount_all = True
+        self._redirect(text_widget)
 
-        # KeyRelease fires after the text widget has been updated, which is
-        # exactly when we want to schedule a recount.
-        text_widget.bind("<KeyRelease>", self._on_change, add="+")
+        # <<Modified>> fires for every kind of edit (typing, paste, undo/redo,
+        # inserts from code), but only when the modified flag goes from
+        # False to True, so _on_modified clears the flag again each time.
+        text_widget.edit_modified(False)
+        text_widget.bind("<<Modified>>", self._on_modified, add="+")
 
         # <<Selection>> fires when the selection changes (mouse drag, Shift+arrow, etc.)
-        text_widget.bind("<<Selection>>", self._on_change, add="+")
+        text_widget.bind("<<Selection>>", self._on_selection, add="+")
 
         # Immediate update when first attached (e.g., file just loaded).
         self.refresh()
@@ -187,23 +111,86 @@ class WordCountBar(ttk.Frame):
     def refresh(self) -> None:
         """Force an immediate statistics refresh (e.g., on tab switch)."""
         self._cancel_debounce()
+        self._summary = None
         self._update_stats()
 
+    def destroy(self) -> None:
+        self._detach()
+        super().destroy()
+
     # ── private helpers ──────────────────────────────────────────────────────
 
     def _detach(self) -> None:
         """Remove bindings from the previously attached widget, if any."""
-        if self._text_widget is not None:
+        widget = self._text_widget
+        if widget is not None:
             try:
-                self._text_widget.unbind("<KeyRelease>")
-                self._text_widget.unbind("<<Selection>>")
+                widget.unbind("<<Modified>>")
+                widget.unbind("<<Selection>>")
             except tk.TclError:
                 pass  # widget may have been destroyed already
+            if self._widget_command is not None:
+                try:
+                    widget.tk.deletecommand(widget._w)
+                    widget.tk.call("rename", self._widget_command, widget._w)
+                except tk.TclError:
+                    pass
         self._text_widget = None
+        self._widget_command = None
         self._cancel_debounce()
 
-    def _on_change(self, _event=None) -> None:
-        """Schedule a debounced statistics update."""
+    def _redirect(self, widget: tk.Text) -> None:
+        """Route *widget*'s Tcl command through :meth:`_dispatch`.
+
+        Tk reports an edit with <<Modified>> but not where it happened; as
+        in idlelib's WidgetRedirector, the widget command is renamed and a
+        Python command takes its place, so every insert and delete (from
+        typing, paste or code) passes through here.
+        """
+        command = f"{widget._w}_wordcount"
+        widget.tk.call("rename", widget._w, command)
+        widget.tk.createcommand(widget._w, self._dispatch)
+        self._widget_command = command
+
+    def _dispatch(self, operation, *args):
+        """Run a widget command, noting the lines an edit touches."""
+        call = self.tk.call
+        command = self._widget_command
+        if operation not in _EDITS or not args:
+            if operation == "edit" and args[:1] in (("undo",), ("redo",)):
+                # Tk replays the edits itself; count the whole text again
+                # rather than rely on the replay passing through here.
+                self._recount_all = True
+            return call(command, operation, *args)
+
+        def line(index) -> int:
+            return int(str(call(command, "index", index)).split(".")[0])
+
+        # insert index chars ?tags chars ...?, delete index1 ?index2 ...?,
+        # replace index1 index2 chars ?tags chars ...?
+        if operation == "delete":
+            indices = args
+        else:
+            indices = args[:1] if operation == "insert" else args[:2]
+        lines_before = line("end-1c")
+        touched = [min(line(index), lines_before) for index in indices]
+        result = call(command, operation, *args)
+        self._paragraph_stats.changed(
+            min(touched), max(touched), line("end-1c") - lines_before
+        )
+        return result
+
+    def _on_modified(self, _event=None) -> None:
+        """Schedule a debounced statistics update after an edit."""
+        widget = self._text_widget
+        if widget is None or not widget.edit_modified():
+            return  # the event for our own reset of the flag
+        widget.edit_modified(False)
+        self._summary = None
+        self._on_selection()
+
+    def _on_selection(self, _event=None) -> None:
+        """Schedule a debounced update; the document itself is unchanged."""
         self._cancel_debounce()
         self._debounce_id = self.after(_DEBOUNCE_MS, self._update_stats)
 
@@ -218,23 +205,25 @@ class WordCountBar(ttk.Frame):
             self._stats_var.set("")
             return
 
-        # tk.Text always appends a trailing newline; strip it.
-        full_text: str = self._text_widget.get("1.0", "end-1c")
-
-        stripped = _strip_markdown(full_text)
-        word_count = _count_words(stripped)
-        char_with = len(full_text)
-        char_without = len(
-            full_text.replace(" ", "").replace("\n", "").replace("\t", "")
-        )
-        reading = _reading_time(word_count)
-
-        parts = [
-            f"{word_count:,} words",
-            f"{char_with:,} chars",
-            f"{char_without:,} chars (no spaces)",
-            reading,
-        ]
+        if self._summary is None:
+            stats = None
+            if not self._recount_all:
+                stats = self._paragraph_stats.recount(self._read_lines)
+            if stats is None:
+                # tk.Text always appends a trailing newline; strip it.
+                full_text: str = self._text_widget.get("1.0", "end-1c")
+                stats = self._paragraph_stats.update(full_text)
+                self._recount_all = False
+            self._summary = "  ".join(
+                [
+                    f"{stats.words:,} words",
+                    f"{stats.chars_with_spaces:,} chars",
+                    f"{stats.chars_without_spaces:,} chars (no spaces)",
+                    stats.reading_time,
+                ]
+            )
+
+        parts = [self._summary]
 
         # ── selection stats ──────────────────────────────────────────────────
         sel_info = self._selection_stats()
@@ -243,6 +232,9 @@ class WordCountBar(ttk.Frame):
 
         self._stats_var.set("  ".join(parts))
 
+    def _read_lines(self, first: int, last: int) -> str:
+        return self._text_widget.get(f"{first}.0", f"{last}.end")
+
     def _selection_stats(self) -> str | None:
         """
         Return a formatted selection-count string, or None if no selection.
@@ -258,7 +250,6 @@ class WordCountBar(ttk.Frame):
         if not sel_text:
             return None
 
-        sel_stripped = _strip_markdown(sel_text)
-        sel_words = _count_words(sel_stripped)
-        sel_chars = len(sel_text)
-        return f"{sel_words:,} words, {sel_chars:,} chars"
+        # Paragraphs selected whole are already counted in the cache.
+        stats = self._paragraph_stats.stats(sel_text)
+        return f"{stats.words:,} words, {stats.chars_with_spaces:,} chars"
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: pooled markdown2.Markdown instances vs. markdown2.markdown().
+
+Measures per-call time for small documents (the typing case), where
+per-instance setup is the largest share of the work.
+
+Usage examples:
+  python scripts/bench_markdown_pool.py
+  python scripts/bench_markdown_pool.py --number 20000 --repeat 7
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import markdown2
+
+from markdown_reader.markdown_factory import PREVIEW_EXTRAS, convert
+
+SAMPLES: dict[str, str] = {
+    "one line": "Hello *world*",
+    "paragraph": (
+        "Markdown Reader renders **bold**, *italic* and `code` spans, "
+        "plus [links](https://example.com).\nA second line follows."
+    ),
+    "small note": (
+        "# Title\n\nSome text with `code`.\n\n- one\n- two\n\n"
+        "```python\nprint('hi')\n```\n\n| a | b |\n|---|---|\n| 1 | 2 |\n"
+    ),
+}
+
+
+def _best_us(stmt, number: int, repeat: int) -> float:
+    return min(timeit.repeat(stmt, number=number, repeat=repeat)) / number * 1e6
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=5000, help="calls per run")
+    parser.add_argument("--repeat", type=int, default=5, help="runs (best is kept)")
+    args = parser.parse_args(argv)
+
+    extras = list(PREVIEW_EXTRAS)
+    print(
+        f"{'sample':<12} {'fresh µs':>10} {'pooled µs':>10} {'saved µs':>9} {'saved':>7}"
+    )
+    for name, text in SAMPLES.items():
+        fresh = _best_us(
+            lambda t=text: markdown2.markdown(t, extras=extras),
+            args.number,
+            args.repeat,
+        )
+        pooled = _best_us(lambda t=text: convert(t), args.number, args.repeat)
+        saved = fresh - pooled
+        print(
+            f"{name:<12} {fresh:>10.1f} {pooled:>10.1f} {saved:>9.1f} "
+            f"{saved / fresh:>7.1%}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Vendor MathJax into backend/static/mathjax for offline previews.
+
+Downloads the pinned ``mathjax`` npm package (or reads a tarball given with
+``--tarball``) and copies only what the preview loads: the ``tex-chtml.js``
+component, the CHTML web fonts and the licence.  A gzip copy of the script is
+written next to it so the backend can serve it compressed without doing any
+work per request.
+
+The download is checked against :data:`MATHJAX_SHA512`, pinned next to the
+version.  Vendoring another version needs its digest passed with ``--sha512``.
+
+Run this before building the sidecar; release builds bundle the result.
+
+Usage examples:
+  python scripts/vendor_mathjax.py
+  python scripts/vendor_mathjax.py --tarball ~/Downloads/mathjax-3.2.2.tgz
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import sys
+import tarfile
+import urllib.request
+
+MATHJAX_VERSION = "3.2.2"
+# SHA-512 of the npm tarball of MATHJAX_VERSION (npm's ``dist.integrity``, in hex).
+MATHJAX_SHA512 = (
+    "06df9249553c7811b6ef30a155ec0e89c62ced7b1db78d2a9b8f94a47c97ee4d"
+    "3f3bd36588f73ec7bee4d7f144b0fb2328f64626fb5164cd6f3be81e5b43a11b"
+)
+TARBALL_URL = "https://registry.npmjs.org/mathjax/-/mathjax-{version}.tgz"
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET = os.path.join(ROOT, "backend", "static", "mathjax")
+
+# Paths inside the npm tarball → paths under TARGET.
+_SCRIPT = "package/es5/tex-chtml.js"
+_FONTS = "package/es5/output/chtml/fonts/woff-v2/"
+_LICENSE = "package/LICENSE"
+
+
+def _read_tarball(args: argparse.Namespace) -> bytes:
+    if args.tarball:
+        with open(args.tarball, "rb") as f:
+            return f.read()
+    url = TARBALL_URL.format(version=args.version)
+    print(f"Downloading {url}")
+    with urllib.request.urlopen(url, timeout=60) as response:
+        return response.read()
+
+
+def vendor(data: bytes, target: str, version: str) -> int:
+    """Extract the preview's MathJax files from *data* into *target*."""
+    staging = target + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    count = 0
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as archive:
+        for member in archive.getmembers():
+            name = member.name
+            if not member.isfile():
+                continue
+            if name == _SCRIPT:
+                relative = "tex-chtml.js"
+            elif name.startswith(_FONTS) and name.endswith(".woff"):
+                relative = "output/chtml/fonts/woff-v2/" + os.path.basename(name)
+            elif name == _LICENSE:
+                relative = "LICENSE"
+            else:
+                continue
+            path = os.path.join(staging, relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with archive.extractfile(member) as src, open(path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            count += 1
+
+    script = os.path.join(staging, "tex-chtml.js")
+    if not os.path.isfile(script):
+        shutil.rmtree(staging, ignore_errors=True)
+        raise SystemExit(f"{_SCRIPT} not found in the tarball")
+    with open(script, "rb") as src, gzip.open(script + ".gz", "wb", 9) as dst:
+        shutil.copyfileobj(src, dst)
+    with open(os.path.join(staging, "VERSION"), "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+    return count
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--version", default=MATHJAX_VERSION)
+    parser.add_argument("--tarball", help="use a local npm tarball instead")
+    parser.add_argument(
+        "--sha512",
+        help="expected SHA-512 (hex) of the tarball; defaults to the pinned "
+        "digest for the pinned version",
+    )
+    args = parser.parse_args(argv)
+    expected = args.sha512
+    if expected is None:
+        if args.version != MATHJAX_VERSION:
+            parser.error(f"--sha512 is required for MathJax {args.version}")
+        expected = MATHJAX_SHA512
+
+    data = _read_tarball(args)
+    digest = hashlib.sha512(data).hexdigest()
+    if digest != expected.lower():
+        print(f"SHA-512 mismatch: expected {expected}, got {digest}", file=sys.stderr)
+        return 1
+
+    count = vendor(data, TARGET, args.version)
+    print(f"Vendored MathJax {args.version} ({count} files) into {TARGET}")
+    print(f"Tarball SHA-512: {digest}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
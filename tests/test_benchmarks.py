@@ -0,0 +1,49 @@
+"""
+tests/test_benchmarks.py
+========================
+Tests for the synthetic corpus generator and report helpers in
+``benchmarks/``.
+"""
+
+import pytest
+
+from benchmarks.corpus import generate_document, parse_mix, parse_size
+from benchmarks.render_bench import compare, percentile
+
+
+def test_generate_document_is_deterministic_and_sized():
+    first = generate_document(20_000, seed=3)
+    assert first == generate_document(20_000, seed=3)
+    assert first != generate_document(20_000, seed=4)
+    assert 20_000 <= len(first) < 25_000
+
+
+def test_generate_document_respects_mix():
+    text = generate_document(5_000, {"code": 1}, seed=1)
+    assert text.startswith("```")
+    assert "$$" not in text
+
+
+def test_parse_size_and_mix():
+    assert parse_size("10k") == 10_000
+    assert parse_size("1.5m") == 1_500_000
+    assert parse_size("750") == 750
+    assert parse_mix("prose=4,code") == {"prose": 4.0, "code": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("poetry=2")
+
+
+def test_percentile_nearest_rank():
+    samples = [5.0, 1.0, 3.0, 2.0, 4.0]
+    assert percentile(samples, 50) == 3.0
+    assert percentile(samples, 95) == 5.0
+    assert percentile([], 50) == 0.0
+
+
+def test_compare_flags_only_regressions_beyond_threshold():
+    baseline = {"results": {"render@10": {"p50_ms": 10.0, "p95_ms": 20.0}}}
+    current = {"results": {"render@10": {"p50_ms": 10.5, "p95_ms": 25.0}}}
+    regressions = compare(current, baseline, 0.10)
+    assert len(regressions) == 1
+    assert "p95_ms" in regressions[0]
+    assert compare(current, baseline, 0.30) == []
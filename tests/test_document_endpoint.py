@@ -0,0 +1,113 @@
+"""
+tests/test_document_endpoint.py
+===============================
+Tests for the composite ``/api/markdown/document`` endpoint.
+"""
+
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.render_cache import render_cache
+from benchmarks.corpus import generate_document
+
+client = TestClient(app)
+
+DOC = """# Intro
+
+Hello *world* now.
+
+```bash
+# not a heading
+echo hi
+```
+
+## Intro
+
+Setext
+======
+
+### Last
+"""
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    render_cache.clear()
+    yield
+    render_cache.clear()
+
+
+def _document(content: str, **options) -> dict:
+    response = client.post(
+        "/api/markdown/document", json={"content": content, **options}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_outline_skips_headings_in_fenced_code():
+    result = _document(DOC, fragment=True)
+    assert [(n["level"], n["anchor"], n["line"]) for n in result["outline"]] == [
+        (1, "intro", 1),
+        (2, "intro-1", 10),
+        (3, "last", 15),
+    ]
+    assert result["heading_count"] == 3
+
+
+def test_rendered_heading_ids_match_outline_anchors():
+    html = _document(DOC, fragment=True)["html"]
+    assert '<h1 id="intro">Intro</h1>' in html
+    assert '<h2 id="intro-1">Intro</h2>' in html
+    assert '<h3 id="last">Last</h3>' in html
+    # The setext heading has no outline node and must not steal an anchor.
+    assert "<h1>Setext</h1>" in html
+
+
+def test_full_document_mode_keeps_theme_and_wrapper():
+    result = _document("# Title\n", fragment=False)
+    assert result["html"].startswith("<!DOCTYPE html>")
+    assert '<h1 id="title">Title</h1>' in result["html"]
+    assert "theme" not in result
+    assert "theme" in _document("# Title\n", fragment=True)
+
+
+def test_stats_match_wordcount_endpoint_on_mixed_documents():
+    for seed in range(3):
+        text = generate_document(8_000, seed=seed)
+        stats = _document(text, fragment=True)["stats"]
+        expected = client.post("/api/markdown/wordcount", json={"content": text})
+        assert stats == expected.json()
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "$$\n```\n$$\nword word\n",
+        "<div>\n```\n\n漢字",
+        "```\nunclosed fence\n\nwords after it\n",
+        "<!-- comment\n\nstill a comment -->\ntext\n",
+    ],
+)
+def test_stats_match_wordcount_endpoint_across_block_kinds(text):
+    stats = _document(text, fragment=True)["stats"]
+    expected = client.post("/api/markdown/wordcount", json={"content": text})
+    assert stats == expected.json()
+
+
+def test_outline_matches_outline_endpoint_on_mixed_documents():
+    for seed in range(3):
+        text = generate_document(8_000, seed=seed)
+        outline = _document(text, fragment=True)["outline"]
+        expected = client.post("/api/markdown/outline", json={"content": text})
+        assert outline == expected.json()["outline"]
+
+
+def test_unknown_engine_is_rejected():
+    response = client.post(
+        "/api/markdown/document", json={"content": "# x", "engine": "nope"}
+    )
+    assert response.status_code == 400
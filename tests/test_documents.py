@@ -0,0 +1,124 @@
+"""
+tests/test_documents.py
+=======================
+Tests for patch-based saves (``backend/documents.py``) and the
+``/api/files/patch`` endpoint.
+"""
+
+from __future__ import annotations
+
+import os
+import stat
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import documents
+from backend.documents import (
+    DocumentStore,
+    StaleBaseError,
+    apply_text_edits,
+    atomic_write_text,
+)
+from backend.main import app
+from backend.render_cache import content_digest
+
+client = TestClient(app)
+
+
+def test_apply_text_edits_in_order():
+    edits = [
+        {"offset": 0, "delete": 5, "insert": "Howdy"},
+        {"offset": 5, "delete": 0, "insert": ","},
+    ]
+    assert apply_text_edits("Hello world", edits) == "Howdy, world"
+    with pytest.raises(ValueError):
+        apply_text_edits("abc", [{"offset": 2, "delete": 2, "insert": ""}])
+
+
+def test_patches_chain_on_returned_hashes(tmp_path):
+    path = tmp_path / "doc.md"
+    path.write_text("# Title\n\nBody 漢\n", encoding="utf-8")
+    store = DocumentStore()
+    base = store.read(str(path))
+    first = store.patch(
+        str(path), [{"offset": 15, "delete": 0, "insert": "!"}], base.digest
+    )
+    second = store.patch(
+        str(path), [{"offset": 2, "delete": 5, "insert": "Heading"}], first.digest
+    )
+    assert path.read_text(encoding="utf-8") == "# Heading\n\nBody 漢!\n"
+    assert second.digest == content_digest(second.text)
+    assert second.stamp[0] == path.stat().st_mtime_ns
+
+
+def test_stale_base_is_rejected(tmp_path):
+    path = tmp_path / "doc.md"
+    path.write_text("one\n", encoding="utf-8")
+    store = DocumentStore()
+    base = store.read(str(path))
+    path.write_text("changed elsewhere\n", encoding="utf-8")
+    edit = [{"offset": 0, "delete": 0, "insert": "x"}]
+    with pytest.raises(StaleBaseError):
+        store.patch(str(path), edit, base.digest)
+    with pytest.raises(StaleBaseError):
+        store.patch(str(path), edit, base_mtime_ns=base.stamp[0] - 1)
+    assert path.read_text(encoding="utf-8") == "changed elsewhere\n"
+
+    current = store.read(str(path))
+    store.patch(str(path), edit, base_mtime_ns=current.stamp[0])
+    assert path.read_text(encoding="utf-8") == "xchanged elsewhere\n"
+
+
+def test_atomic_write_keeps_mode_and_leaves_no_temp_files(tmp_path):
+    path = tmp_path / "doc.md"
+    path.write_text("old", encoding="utf-8")
+    os.chmod(path, 0o640)
+    atomic_write_text(str(path), "new")
+    assert path.read_text(encoding="utf-8") == "new"
+    assert stat.S_IMODE(path.stat().st_mode) == 0o640
+    assert os.listdir(tmp_path) == ["doc.md"]
+
+
+def test_atomic_write_falls_back_to_in_place_write(tmp_path, monkeypatch):
+    path = tmp_path / "doc.md"
+    path.write_text("old", encoding="utf-8")
+    inode = path.stat().st_ino
+
+    def read_only_directory(*args, **kwargs):
+        raise PermissionError(13, "Permission denied", str(tmp_path))
+
+    monkeypatch.setattr(documents.tempfile, "mkstemp", read_only_directory)
+    st = atomic_write_text(str(path), "new")
+    assert path.read_text(encoding="utf-8") == "new"
+    assert st.st_ino == inode
+
+
+def test_full_write_keeps_hardlinks(tmp_path):
+    path = tmp_path / "doc.md"
+    path.write_text("old", encoding="utf-8")
+    link = tmp_path / "link.md"
+    os.link(path, link)
+    DocumentStore().write(str(path), "new")
+    assert link.read_text(encoding="utf-8") == "new"
+
+
+def test_patch_endpoint(tmp_path):
+    path = str(tmp_path / "doc.md")
+    written = client.post("/api/files/write", json={"path": path, "content": "abc"})
+    base = written.json()["hash"]
+    assert client.get("/api/files/read", params={"path": path}).json()["hash"] == base
+
+    edit = {"offset": 3, "delete": 0, "insert": "d"}
+    patched = client.post(
+        "/api/files/patch", json={"path": path, "edits": [edit], "base_hash": base}
+    )
+    assert patched.status_code == 200
+    assert patched.json()["hash"] == content_digest("abcd")
+
+    stale = {"path": path, "edits": [edit], "base_hash": base}
+    assert client.post("/api/files/patch", json=stale).status_code == 409
+    bad = {"path": path, "edits": [{"offset": 9}], "base_hash": content_digest("abcd")}
+    assert client.post("/api/files/patch", json=bad).status_code == 400
+    missing = {**stale, "path": str(tmp_path / "nope.md")}
+    assert client.post("/api/files/patch", json=missing).status_code == 404
@@ -1,7 +1,7 @@
 """
 test_features.py
 ================
-Unit tests for word_count_bar.py and recent_files.py.
+Unit tests for the word count helpers (text_stats.py) and recent_files.py.
 
 Run with:
     python -m pytest tests/test_features.py -v
@@ -27,10 +27,12 @@ from markdown_reader.recent_files import (
     _middle_ellipsis,
     _safe_write_json,
 )
-from markdown_reader.word_count_bar import _count_words, _reading_time, _strip_markdown
+from markdown_reader.text_stats import count_words as _count_words
+from markdown_reader.text_stats import reading_time as _reading_time
+from markdown_reader.text_stats import strip_markdown as _strip_markdown
 
 # ===========================================================================
-# Tests for word_count_bar helpers
+# Tests for word count helpers
 # ===========================================================================
 
 
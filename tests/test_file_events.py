@@ -0,0 +1,171 @@
+"""
+tests/test_file_events.py
+=========================
+Tests for the debounced change notifications in ``backend/file_events.py``
+and ``GET /api/files/events``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.documents import atomic_write_text
+from backend.file_events import FileEventHub, _merge, file_event_hub
+from backend.main import app
+from backend.render_cache import content_digest
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def notes(tmp_path):
+    root = tmp_path / "notes"
+    root.mkdir()
+    (root / "a.md").write_text("one", encoding="utf-8")
+    return root
+
+
+@pytest.fixture
+def hub():
+    hub = FileEventHub(debounce=0.1)
+    yield hub
+    hub.shutdown()
+
+
+async def _collect(subscription, count, timeout=5.0):
+    """The next *count* events, or fewer if the timeout passes first."""
+    events = []
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while len(events) < count and loop.time() < deadline:
+        try:
+            batch = await asyncio.wait_for(
+                subscription.queue.get(), deadline - loop.time()
+            )
+        except TimeoutError:
+            break
+        events.extend(batch)
+    return events
+
+
+def _summary(events, root):
+    real = os.path.realpath(root)
+    return [
+        (
+            e["type"],
+            os.path.relpath(e["path"], real),
+            e.get("dest_path") and os.path.relpath(e["dest_path"], real),
+        )
+        for e in events
+    ]
+
+
+def test_merge_combines_events_within_a_window():
+    assert _merge(None, "modified") == "modified"
+    assert _merge("created", "modified") == "created"
+    assert _merge("created", "deleted") is None
+    assert _merge("deleted", "created") == "modified"
+    assert _merge("modified", "deleted") == "deleted"
+
+
+def test_atomic_save_arrives_as_one_modified_event(hub, notes):
+    note = notes / "a.md"
+
+    async def run():
+        subscription = hub.subscribe([str(note)])
+        try:
+            atomic_write_text(str(note), "two")
+            with open(note, "a", encoding="utf-8") as f:
+                f.write("!")
+            return await _collect(subscription, 2, timeout=1.0)
+        finally:
+            hub.unsubscribe(subscription)
+
+    (event,) = asyncio.run(run())
+    assert _summary([event], notes) == [("modified", "a.md", None)]
+    assert event["exists"] is True
+    assert event["size"] == 4
+    assert event["hash"] == content_digest("two!")
+    assert event["mtime_ns"] == os.stat(note).st_mtime_ns
+
+
+def test_folder_and_file_subscriptions_see_only_their_paths(hub, notes):
+    async def run():
+        folder = hub.subscribe([str(notes)])
+        single = hub.subscribe([str(notes / "a.md")])
+        try:
+            (notes / "b.md").write_text("bee", encoding="utf-8")
+            created = await _collect(folder, 1)
+            (notes / "b.md").rename(notes / "c.md")
+            moved = await _collect(folder, 1)
+            (notes / "a.md").unlink()
+            deleted = await _collect(folder, 1)
+            return created, moved, deleted, await _collect(single, 1)
+        finally:
+            hub.unsubscribe(folder)
+            hub.unsubscribe(single)
+
+    created, moved, deleted, single = asyncio.run(run())
+    assert _summary(created, notes) == [("created", "b.md", None)]
+    assert created[0]["hash"] == content_digest("bee")
+    assert _summary(moved, notes) == [("moved", "b.md", "c.md")]
+    assert moved[0]["hash"] == content_digest("bee")
+    assert _summary(deleted, notes) == [("deleted", "a.md", None)]
+    assert deleted[0]["exists"] is False and deleted[0]["hash"] is None
+    assert _summary(single, notes) == [("deleted", "a.md", None)]
+    assert hub._watches == {}
+
+
+def test_unwanted_events_are_not_hashed(hub, notes, monkeypatch):
+    from backend import file_events
+
+    described = []
+    original = file_events.describe
+
+    def recording(path, is_directory=False):
+        described.append(os.path.basename(path))
+        return original(path, is_directory)
+
+    monkeypatch.setattr(file_events, "describe", recording)
+
+    async def run():
+        subscription = hub.subscribe([str(notes / "a.md")])
+        try:
+            # Both files live in the watched folder; only a.md is wanted.
+            (notes / "other.md").write_text("x", encoding="utf-8")
+            (notes / "a.md").write_text("two", encoding="utf-8")
+            return await _collect(subscription, 2, timeout=1.0)
+        finally:
+            hub.unsubscribe(subscription)
+
+    events = asyncio.run(run())
+    assert _summary(events, notes) == [("modified", "a.md", None)]
+    assert described == ["a.md"]
+
+
+def test_events_endpoint_opens_with_the_current_state(notes):
+    note = str(notes / "a.md")
+    # The test client reads the whole response, so end the stream the way
+    # application shutdown does.
+    stop = threading.Timer(0.5, file_event_hub.shutdown)
+    stop.start()
+    try:
+        response = client.get("/api/files/events", params={"path": note})
+    finally:
+        stop.join()
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    event, data = response.text.splitlines()[:2]
+    assert event == "event: ready"
+    (state,) = json.loads(data.removeprefix("data: "))["paths"]
+    assert state["path"] == note
+    assert state["hash"] == content_digest("one")
+
+    missing = client.get("/api/files/events", params={"path": str(notes / "nope")})
+    assert missing.status_code == 404
@@ -0,0 +1,68 @@
+"""
+tests/test_highlight.py
+=======================
+Tests for server-side Pygments highlighting and the per-code-block cache.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from backend.highlight import code_block_cache, highlight_css
+from backend.render_cache import render_cache
+from backend.renderer import render_markdown
+from backend.theme import theme_css
+
+RUNBOOK = "\n\n".join(
+    f"Step {i}\n\n```python\ndef step_{i}():\n    return {i}\n```" for i in range(20)
+)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_caches():
+    render_cache.clear()
+    code_block_cache.clear()
+    yield
+    render_cache.clear()
+    code_block_cache.clear()
+
+
+def test_fenced_code_is_highlighted_by_default():
+    html = render_markdown("```python\nimport os\n```", fragment=True)
+    assert '<div class="codehilite">' in html
+    assert '<span class="kn">import</span>' in html
+
+
+def test_highlight_false_leaves_language_class_for_the_client():
+    html = render_markdown("```python\nimport os\n```", fragment=True, highlight=False)
+    assert "codehilite" not in html
+    assert "language-python" in html
+
+
+def test_unchanged_code_blocks_are_not_relexed():
+    render_markdown(RUNBOOK, fragment=True)
+    assert code_block_cache.stats()["misses"] == 20
+
+    # Editing prose re-renders the document but lexes no code.
+    render_markdown(RUNBOOK + "\n\nOne more paragraph.", fragment=True)
+    stats = code_block_cache.stats()
+    assert stats["misses"] == 20
+    assert stats["hits"] == 20
+
+
+def test_highlighted_blocks_are_shared_across_themes():
+    render_markdown(RUNBOOK, dark_mode=False)
+    render_markdown(RUNBOOK, dark_mode=True)
+    assert code_block_cache.stats()["misses"] == 20
+
+
+def test_theme_stylesheet_carries_token_colours_once():
+    light = theme_css(dark_mode=False, font_family="serif", font_size=14)
+    dark = theme_css(dark_mode=True, font_family="serif", font_size=14)
+    assert highlight_css(dark_mode=False) in light
+    assert highlight_css(dark_mode=True) in dark
+    assert light.count(".codehilite .k ") == 1
+    assert all(
+        line.startswith(".codehilite")
+        for line in highlight_css(dark_mode=True).splitlines()
+    )
@@ -0,0 +1,144 @@
+"""
+tests/test_image_index.py
+=========================
+Tests for header-only image dimension probing and the mtime/size-keyed index
+that adds ``width``/``height`` to rendered images.
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+import zlib
+
+import pytest
+
+from backend.image_index import (
+    ImageIndex,
+    add_image_dimensions,
+    image_index,
+    read_dimensions,
+)
+from backend.incremental import incremental_renderer
+from backend.render_cache import render_cache
+from backend.renderer import render_markdown
+
+
+def _png(width: int, height: int) -> bytes:
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    chunk = b"IHDR" + ihdr
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + struct.pack(">I", len(ihdr))
+        + chunk
+        + struct.pack(">I", zlib.crc32(chunk))
+    )
+
+
+def _jpeg(width: int, height: int) -> bytes:
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    sof0 = b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x00" * 3
+    return b"\xff\xd8" + app0 + sof0 + b"\xff\xd9"
+
+
+IMAGES = {
+    "a.png": (_png(640, 480), (640, 480)),
+    "b.jpg": (_jpeg(1024, 768), (1024, 768)),
+    "c.gif": (b"GIF89a" + struct.pack("<HH", 32, 16) + b"\x00" * 8, (32, 16)),
+    "d.bmp": (
+        b"BM" + b"\x00" * 16 + struct.pack("<ii", 200, -100) + b"\x00" * 8,
+        (200, 100),
+    ),
+    "e.webp": (
+        b"RIFF\x00\x00\x00\x00WEBPVP8X"
+        + b"\x00" * 8
+        + (299).to_bytes(3, "little")
+        + (149).to_bytes(3, "little"),
+        (300, 150),
+    ),
+    "f.svg": (b'<?xml version="1.0"?><svg width="120px" height="60">', (120, 60)),
+}
+
+
+@pytest.fixture
+def images(tmp_path):
+    for name, (data, _size) in IMAGES.items():
+        (tmp_path / name).write_bytes(data)
+    image_index.clear()
+    render_cache.clear()
+    yield tmp_path
+    image_index.clear()
+    render_cache.clear()
+
+
+@pytest.mark.parametrize("name", sorted(IMAGES))
+def test_read_dimensions_from_header(images, name):
+    assert read_dimensions(str(images / name)) == IMAGES[name][1]
+
+
+def test_unknown_and_relative_svg_sizes_are_none(tmp_path):
+    (tmp_path / "x.txt").write_text("not an image")
+    (tmp_path / "r.svg").write_text('<svg width="100%" height="50%"></svg>')
+    assert read_dimensions(str(tmp_path / "x.txt")) is None
+    assert read_dimensions(str(tmp_path / "r.svg")) is None
+    assert read_dimensions(str(tmp_path / "missing.png")) is None
+
+
+def test_each_image_is_probed_once_per_change(images):
+    index = ImageIndex()
+    paths = [str(images / name) for name in IMAGES]
+    first = index.lookup(paths + paths[:2])
+    assert {p: first[p] for p in paths} == {
+        str(images / n): size for n, (_d, size) in IMAGES.items()
+    }
+    assert index.probes == len(IMAGES)
+
+    index.lookup(paths)
+    assert index.probes == len(IMAGES)
+
+    png = images / "a.png"
+    png.write_bytes(_png(10, 20))
+    os.utime(png, ns=(1, 1))
+    assert index.lookup([str(png)]) == {str(png): (10, 20)}
+    assert index.probes == len(IMAGES) + 1
+
+
+def test_add_image_dimensions_rewrites_only_local_unsized_images(images):
+    png = (images / "a.png").as_posix()
+    html = (
+        f'<p><img src="file://{png}" alt="a" /></p>'
+        f'<img src="file://{png}" width="5">'
+        '<img src="https://example.com/x.png" alt="remote" />'
+    )
+    out = add_image_dimensions(html, ImageIndex())
+    assert f'<img src="file://{png}" alt="a" width="640" height="480" />' in out
+    assert f'<img src="file://{png}" width="5">' in out
+    assert '<img src="https://example.com/x.png" alt="remote" />' in out
+
+
+def test_render_markdown_adds_dimensions(images):
+    text = "![photo](b.jpg)\n\n![missing](nope.png)\n"
+    html = render_markdown(text, base_dir=str(images), fragment=True)
+    assert 'width="1024" height="768"' in html
+    assert html.count("width=") == 1
+
+
+def test_cached_renders_pick_up_a_resized_image(images):
+    png = images / "a.png"
+    text = "![a](a.png)\n"
+    blocks = incremental_renderer.render(text, base_dir=str(images))["blocks"]
+    renders = [
+        lambda: render_markdown(text, base_dir=str(images), fragment=True),
+        lambda: render_markdown(text, base_dir=str(images), source_map=True),
+        lambda: incremental_renderer.render(text, base_dir=str(images))["blocks"][0][
+            "html"
+        ],
+    ]
+    for render in renders:
+        assert 'width="640" height="480"' in render()
+    assert blocks[0]["html"].count("width=") == 1
+
+    png.write_bytes(_png(300, 40))
+    os.utime(png, ns=(5, 5))
+    for render in renders:
+        assert 'width="300" height="40"' in render()
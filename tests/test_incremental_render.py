@@ -0,0 +1,207 @@
+"""
+tests/test_incremental_render.py
+================================
+Unit tests for the block splitter in ``backend/blocks.py`` and the
+block-level incremental renderer in ``backend/incremental.py``.
+"""
+
+from __future__ import annotations
+
+import re
+
+from backend.blocks import reference_definitions, split_blocks
+from backend.incremental import IncrementalRenderer
+from backend.renderer import render_fragment
+
+SAMPLE = """# Title
+
+Intro paragraph
+continues here.
+
+```python
+x = 1
+
+y = 2
+```
+
+- one
+- two
+
+  nested paragraph
+- three
+
+| a | b |
+|---|---|
+| 1 | 2 |
+
+$$
+E = mc^2
+$$
+
+Closing with $x$ inline math and a [ref link][r].
+
+[r]: https://example.com
+"""
+
+
+def _normalise(html: str) -> str:
+    return re.sub(r"\s+", " ", html).strip()
+
+
+# ── split_blocks ─────────────────────────────────────────────────────────────
+
+
+def test_block_kinds():
+    kinds = [b.kind for b in split_blocks(SAMPLE)]
+    assert kinds == [
+        "heading",
+        "paragraph",
+        "code",
+        "list",
+        "table",
+        "math",
+        "paragraph",
+        "reference",
+    ]
+
+
+def test_block_line_ranges():
+    blocks = split_blocks(SAMPLE)
+    assert (blocks[0].start_line, blocks[0].end_line) == (1, 1)
+    assert (blocks[1].start_line, blocks[1].end_line) == (3, 4)
+    # The fenced block keeps its internal blank line.
+    assert (blocks[2].start_line, blocks[2].end_line) == (6, 10)
+    assert (blocks[3].start_line, blocks[3].end_line) == (12, 16)
+
+
+def test_empty_document_has_no_blocks():
+    assert split_blocks("") == []
+    assert split_blocks("\n\n  \n") == []
+
+
+def test_heading_interrupts_paragraph():
+    blocks = split_blocks("text\n## Heading\nmore")
+    assert [b.kind for b in blocks] == ["paragraph", "heading", "paragraph"]
+
+
+def test_unclosed_fence_runs_to_end():
+    blocks = split_blocks("```\ncode\n\nstill code")
+    assert len(blocks) == 1
+    assert blocks[0].kind == "code"
+
+
+HTML_BLOCKS = """<div align="center">
+  <img src="x.png">
+
+  <p>hi</p>
+</div>
+
+<details>
+<summary>More</summary>
+
+Hidden *text*
+
+</details>
+
+<!-- a comment
+
+with a blank line -->
+
+After
+"""
+
+
+def test_html_blocks_keep_their_blank_lines():
+    blocks = split_blocks(HTML_BLOCKS)
+    assert [(b.kind, b.start_line, b.end_line) for b in blocks] == [
+        ("html", 1, 5),
+        ("html", 7, 12),
+        ("html", 14, 16),
+        ("paragraph", 18, 18),
+    ]
+
+
+def test_html_block_interrupts_paragraph():
+    blocks = split_blocks("text\n<div>x</div>\n\n<span>inline</span> text")
+    assert [b.kind for b in blocks] == ["paragraph", "html", "paragraph"]
+
+
+def test_reference_definitions_collected():
+    refs = reference_definitions(split_blocks(SAMPLE))
+    assert refs == "[r]: https://example.com"
+
+
+# ── IncrementalRenderer ──────────────────────────────────────────────────────
+
+
+def test_blocks_concatenate_to_full_render():
+    result = IncrementalRenderer().render(SAMPLE)
+    incremental = "".join(b["html"] for b in result["blocks"])
+    assert _normalise(incremental) == _normalise(render_fragment(SAMPLE))
+
+
+def test_html_blocks_concatenate_to_full_render():
+    result = IncrementalRenderer().render(HTML_BLOCKS)
+    incremental = "".join(b["html"] for b in result["blocks"])
+    assert _normalise(incremental) == _normalise(render_fragment(HTML_BLOCKS))
+
+
+def test_ids_stable_across_unrelated_edits():
+    renderer = IncrementalRenderer()
+    before = renderer.render(SAMPLE)
+    after = renderer.render(SAMPLE.replace("Intro paragraph", "Edited intro"))
+    before_ids = [b["id"] for b in before["blocks"]]
+    after_ids = [b["id"] for b in after["blocks"]]
+    assert before_ids[0] == after_ids[0]
+    assert before_ids[1] != after_ids[1]
+    assert before_ids[2:] == after_ids[2:]
+
+
+def test_known_ids_are_not_resent():
+    renderer = IncrementalRenderer()
+    first = renderer.render(SAMPLE)
+    known = {b["id"] for b in first["blocks"]}
+    edited = SAMPLE.replace("Intro paragraph", "Edited intro")
+    second = renderer.render(edited, known_ids=known)
+    assert len(second["changed"]) == 1
+    assert [b["html"] is not None for b in second["blocks"]].count(True) == 1
+
+
+def test_only_dirty_blocks_rerendered(monkeypatch):
+    from backend import incremental
+
+    renderer = IncrementalRenderer()
+    renderer.render(SAMPLE)
+
+    calls = []
+    original = incremental.render_fragment
+
+    def counting(text, **kwargs):
+        calls.append(text)
+        return original(text, **kwargs)
+
+    monkeypatch.setattr(incremental, "render_fragment", counting)
+    renderer.render(SAMPLE.replace("- two", "- deux"))
+    assert len(calls) == 1
+    assert "deux" in calls[0]
+
+
+def test_duplicate_blocks_get_unique_ids():
+    result = IncrementalRenderer().render("same\n\nsame\n\nsame")
+    ids = [b["id"] for b in result["blocks"]]
+    assert len(set(ids)) == 3
+
+
+def test_reference_links_resolve_in_isolation():
+    result = IncrementalRenderer().render(SAMPLE)
+    closing = result["blocks"][6]["html"]
+    assert 'href="https://example.com"' in closing
+
+
+def test_changing_reference_changes_dependent_block_id():
+    renderer = IncrementalRenderer()
+    before = renderer.render(SAMPLE)
+    after = renderer.render(SAMPLE.replace("example.com", "example.org"))
+    assert before["blocks"][6]["id"] != after["blocks"][6]["id"]
+    # Blocks without links are unaffected.
+    assert before["blocks"][0]["id"] == after["blocks"][0]["id"]
@@ -0,0 +1,105 @@
+"""
+tests/test_line_index.py
+========================
+Tests for ranged reads through ``backend/line_index.py`` and the ranged mode
+of ``GET /api/files/read``.
+"""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+import backend.line_index as line_index
+from backend.line_index import LineIndexCache
+from backend.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    # Tiny blocks so short test files span many index entries.
+    monkeypatch.setattr(line_index, "_BLOCK_BYTES", 16)
+
+
+def _write(tmp_path, text: str):
+    path = tmp_path / "log.txt"
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+
+def test_line_windows_match_a_full_split(tmp_path):
+    rnd = random.Random(5)
+    text = "".join(
+        rnd.choice(["a", "é", "漢", "\n", "words here "]) for _ in range(3000)
+    )
+    lines = text.split("\n")
+    path = _write(tmp_path, text)
+    cache = LineIndexCache()
+    for _ in range(200):
+        start, count = rnd.randrange(1, len(lines) + 1), rnd.randrange(1, 40)
+        result = cache.read(path, start_line=start, line_count=count)
+        window = lines[start - 1 : start - 1 + count]
+        tail = "\n" if start - 1 + count < len(lines) else ""
+        assert result["content"] == "\n".join(window) + tail
+        assert result["start_line"] == start
+        assert result["line_count"] == len(lines)
+    assert cache.builds == 1
+
+
+def test_byte_windows_never_split_characters(tmp_path):
+    text = "é漢\n" * 50
+    path = _write(tmp_path, text)
+    cache = LineIndexCache()
+    for offset in range(0, 30):
+        result = cache.read(path, offset=offset, length=7)
+        assert "�" not in result["content"]
+        data = text.encode("utf-8")
+        assert result["content"] == data[
+            result["start_byte"] : result["end_byte"]
+        ].decode("utf-8")
+        assert result["start_line"] == data[: result["start_byte"]].count(b"\n") + 1
+
+
+def test_index_is_rebuilt_when_the_file_changes(tmp_path):
+    path = _write(tmp_path, "one\ntwo\n")
+    cache = LineIndexCache()
+    assert cache.read(path, start_line=2, line_count=1)["content"] == "two\n"
+    _write(tmp_path, "one\nTWO\nthree")
+    result = cache.read(path, start_line=2, line_count=5)
+    assert (result["content"], result["line_count"], result["eof"]) == (
+        "TWO\nthree",
+        3,
+        True,
+    )
+    assert cache.builds == 2
+
+
+def test_oversized_window_is_cut_at_a_line_boundary(tmp_path, monkeypatch):
+    monkeypatch.setattr(line_index, "MAX_RANGE_BYTES", 10)
+    path = _write(tmp_path, "abcd\nefgh\nijkl\n")
+    result = LineIndexCache().read(path, start_line=1, line_count=3)
+    assert result["content"] == "abcd\nefgh\n"
+    assert (result["end_line"], result["truncated"]) == (2, True)
+
+
+def test_empty_file(tmp_path):
+    result = LineIndexCache().read(_write(tmp_path, ""), start_line=1)
+    assert (result["content"], result["line_count"], result["eof"]) == ("", 1, True)
+
+
+def test_read_endpoint_ranged_mode(tmp_path):
+    path = _write(tmp_path, "a\r\nb\nc\n")
+    full = client.get("/api/files/read", params={"path": path}).json()
+    assert (full["path"], full["content"]) == (path, "a\nb\nc\n")
+
+    ranged = client.get(
+        "/api/files/read", params={"path": path, "start_line": 2, "line_count": 1}
+    ).json()
+    assert ranged["content"] == "b\n" and ranged["line_count"] == 4
+
+    both = {"path": path, "start_line": 1, "offset": 0}
+    assert client.get("/api/files/read", params=both).status_code == 400
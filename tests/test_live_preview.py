@@ -0,0 +1,104 @@
+"""
+tests/test_live_preview.py
+==========================
+Tests for the WebSocket live-preview session in ``backend/live_preview.py``
+and the ``/api/markdown/live`` endpoint.
+"""
+
+from __future__ import annotations
+
+from fastapi.testclient import TestClient
+
+from backend.incremental import IncrementalRenderer
+from backend.live_preview import LivePreviewSession
+from backend.main import app
+
+DOC = "# Title\n\nFirst paragraph.\n\nSecond paragraph.\n\n- a\n- b\n"
+
+
+def _session() -> LivePreviewSession:
+    return LivePreviewSession(renderer=IncrementalRenderer())
+
+
+def test_open_sends_every_block():
+    session = _session()
+    (patch,) = session.process([{"type": "open", "content": DOC, "version": 1}])
+    assert patch["type"] == "patch"
+    assert (patch["start"], patch["delete"]) == (0, 0)
+    assert len(patch["insert"]) == patch["block_count"] == 4
+    assert patch["version"] == 1
+
+
+def test_edit_patches_only_changed_block():
+    session = _session()
+    session.process([{"type": "open", "content": DOC}])
+    offset = DOC.index("Second")
+    (patch,) = session.process(
+        [
+            {
+                "type": "edit",
+                "version": 2,
+                "edits": [{"offset": offset, "delete": 6, "insert": "Third"}],
+            }
+        ]
+    )
+    assert (patch["start"], patch["delete"]) == (2, 1)
+    assert len(patch["insert"]) == 1
+    assert "Third paragraph." in patch["insert"][0]["html"]
+    assert session.text == DOC.replace("Second", "Third")
+
+
+def test_burst_of_edits_rendered_once():
+    session = _session()
+    session.process([{"type": "open", "content": ""}])
+    edits = [
+        {"type": "edit", "version": v, "edits": [{"offset": v - 1, "insert": ch}]}
+        for v, ch in enumerate("hello", start=1)
+    ]
+    replies = session.process(edits)
+    assert len(replies) == 1
+    assert replies[0]["version"] == 5
+    assert "hello" in replies[0]["insert"][0]["html"]
+
+
+def test_inserted_block_shifts_nothing_else():
+    session = _session()
+    session.process([{"type": "open", "content": DOC}])
+    (patch,) = session.process(
+        [{"type": "edit", "edits": [{"offset": 0, "insert": "Intro\n\n"}]}]
+    )
+    assert (patch["start"], patch["delete"]) == (0, 0)
+    assert len(patch["insert"]) == 1
+
+
+def test_out_of_range_edit_requests_resync():
+    session = _session()
+    session.process([{"type": "open", "content": "abc"}])
+    (reply,) = session.process(
+        [{"type": "edit", "edits": [{"offset": 2, "delete": 5}]}]
+    )
+    assert reply["type"] == "error"
+    assert reply["resync"] is True
+    assert session.text == "abc"
+    # After a resync the next patch resends everything.
+    (patch,) = session.process([{"type": "open", "content": "abc"}])
+    assert len(patch["insert"]) == 1
+
+
+def test_websocket_round_trip():
+    client = TestClient(app)
+    with client.websocket_connect("/api/markdown/live") as ws:
+        ws.send_json({"type": "open", "content": "# Hi\n\nThere", "version": 0})
+        first = ws.receive_json()
+        assert first["block_count"] == 2
+
+        ws.send_json(
+            {"type": "edit", "version": 1, "edits": [{"offset": 4, "insert": "!"}]}
+        )
+        second = ws.receive_json()
+        assert second["version"] == 1
+        assert (second["start"], second["delete"]) == (0, 1)
+        assert "Hi!" in second["insert"][0]["html"]
+
+        ws.send_text("not json")
+        assert ws.receive_json()["type"] == "error"
@@ -0,0 +1,118 @@
+"""
+tests/test_markdown_engines.py
+==============================
+Tests for the pluggable Markdown engine layer and its use by the renderer.
+"""
+
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.render_cache import render_cache
+from backend.renderer import render_markdown
+from benchmarks.engine_compare import compare_engines, normalise_html
+from markdown_reader import logic, markdown_engines
+from markdown_reader.markdown_engines import available_engines, get_engine
+
+client = TestClient(app)
+
+SAMPLE = "# Title\n\nSome *text* and $x^2$.\n\n| a | b |\n|---|---|\n| 1 | 2 |\n"
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    render_cache.clear()
+    yield
+    render_cache.clear()
+
+
+def test_both_engines_are_registered_with_markdown2_first():
+    assert available_engines()[:1] == ["markdown2"]
+    assert "python-markdown" in available_engines()
+
+
+@pytest.mark.parametrize("name", ["markdown2", "python-markdown"])
+def test_engines_render_core_syntax(name):
+    html = get_engine(name).convert(SAMPLE)
+    assert "<h1>Title</h1>" in html
+    assert "<em>text</em>" in html
+    assert "<table>" in html
+
+
+def test_unknown_engine_raises_value_error():
+    with pytest.raises(ValueError, match="Unknown Markdown engine"):
+        get_engine("commonmark-rs")
+
+
+def test_default_engine_comes_from_environment(monkeypatch):
+    monkeypatch.setenv("MARKDOWN_READER_ENGINE", "python-markdown")
+    assert get_engine().name == "python-markdown"
+    monkeypatch.setenv("MARKDOWN_READER_ENGINE", "nonsense")
+    assert get_engine().name == markdown_engines.DEFAULT_ENGINE
+
+
+def test_preview_engine_is_resolved_once_until_settings_are_saved(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setattr(logic, "APP_SETTINGS_FILE_PATH", tmp_path / "settings.json")
+    monkeypatch.setattr(logic, "_preview_engine_cache", None)
+    logic._save_app_settings({"markdown_engine": "python-markdown"})
+    assert logic._preview_engine() is get_engine("python-markdown")
+
+    loads = []
+    load = logic._load_app_settings
+    monkeypatch.setattr(logic, "_load_app_settings", lambda: loads.append(1) or load())
+    logic._preview_engine()
+    assert loads == []
+
+    logic._save_app_settings({"markdown_engine": "markdown2"})
+    assert logic._preview_engine() is get_engine("markdown2")
+    assert len(loads) == 1
+
+
+def test_render_markdown_keeps_math_with_either_engine():
+    for name in available_engines():
+        html = render_markdown(SAMPLE, fragment=True, engine=name)
+        assert '<span class="math-inline">\\(x^2\\)</span>' in html
+
+
+def test_cache_is_keyed_by_engine():
+    text = "line one\nline two\n\n```\ncode\n```\n"
+    first = render_markdown(text, fragment=True, engine="markdown2")
+    second = render_markdown(text, fragment=True, engine="python-markdown")
+    assert first != second
+
+
+def test_render_endpoint_accepts_engine_and_rejects_unknown():
+    ok = client.post(
+        "/api/markdown/render",
+        json={"content": "# Hi", "fragment": True, "engine": "python-markdown"},
+    )
+    assert ok.status_code == 200
+    assert "<h1>Hi</h1>" in ok.json()["html"]
+
+    bad = client.post("/api/markdown/render", json={"content": "# Hi", "engine": "x"})
+    assert bad.status_code == 400
+
+
+def test_engines_endpoint_lists_engines():
+    body = client.get("/api/markdown/engines").json()
+    assert body["default"] == "markdown2"
+    assert set(body["engines"]) >= {"markdown2", "python-markdown"}
+
+
+def test_normalise_html_ignores_attribute_order_and_layout():
+    a = '<div class="x">\n<p><img src="a.png" alt="a" /></p>\n</div>'
+    b = '<div class="x"><p><img alt="a" src="a.png" /></p></div>'
+    assert normalise_html(a) == normalise_html(b)
+
+
+def test_compare_engines_reports_throughput_and_differences():
+    corpus = {"doc": "# Same\n\n_under_ score\n"}
+    result = compare_engines(["markdown2", "python-markdown"], corpus, iterations=1)
+    engines = result["engines"]
+    assert engines["markdown2"]["docs_per_second"] > 0
+    assert "differing" not in engines["markdown2"]
+    assert engines["python-markdown"]["identical"] in (0, 1)
@@ -0,0 +1,51 @@
+"""
+tests/test_markdown_factory.py
+==============================
+Unit tests for the per-thread ``markdown2.Markdown`` pool in
+``markdown_reader/markdown_factory.py``.
+"""
+
+from __future__ import annotations
+
+import threading
+
+import markdown2
+
+from markdown_reader.markdown_factory import PREVIEW_EXTRAS, convert, get_markdown
+
+
+def test_same_thread_reuses_instance():
+    assert get_markdown() is get_markdown()
+
+
+def test_profiles_get_separate_instances():
+    assert get_markdown(("tables",)) is not get_markdown()
+    assert get_markdown(["tables"]) is get_markdown(("tables",))
+
+
+def test_threads_never_share_instances():
+    seen = []
+
+    def worker():
+        seen.append(get_markdown())
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ids = {id(md) for md in seen} | {id(get_markdown())}
+    assert len(ids) == 4
+
+
+def test_output_matches_module_helper():
+    text = "# Title\n\n```\ncode\n```\n\n| a | b |\n|---|---|\n| 1 | 2 |\nline\nbreak"
+    expected = markdown2.markdown(text, extras=list(PREVIEW_EXTRAS))
+    assert convert(text) == expected
+
+
+def test_no_state_leaks_between_documents():
+    convert("[x][ref]\n\n[ref]: https://example.com")
+    # A reused instance must not remember the previous document's references.
+    assert "example.com" not in convert("[x][ref]")
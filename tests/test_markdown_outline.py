@@ -1,8 +1,8 @@
 """
 tests/test_markdown_outline.py
 ===============================
-Unit tests for the document outline extraction helpers added in
-``backend/routers/markdown.py`` (``_extract_outline``, ``_slugify``).
+Unit tests for the document outline extraction helpers in
+``backend/outline.py`` (``extract_outline``, ``slugify``).
 
 These tests cover:
 - ATX heading detection at all six levels
@@ -18,7 +18,8 @@ from __future__ import annotations
 import pytest
 
 # Import directly from the module under test.
-from backend.routers.markdown import _extract_outline, _slugify
+from backend.outline import extract_outline as _extract_outline
+from backend.outline import slugify as _slugify
 
 
 # ── _slugify ─────────────────────────────────────────────────────────────────
@@ -0,0 +1,157 @@
+"""
+tests/test_mathjax_assets.py
+============================
+Tests for the vendored MathJax bundle: the vendoring script, the
+``/api/markdown/mathjax/...`` route and the URLs the renderer emits.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import importlib.util
+import io
+import os
+import tarfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import render_helpers
+from backend.main import app
+from backend.render_cache import render_cache
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_spec = importlib.util.spec_from_file_location(
+    "vendor_mathjax", os.path.join(_ROOT, "scripts", "vendor_mathjax.py")
+)
+vendor_mathjax = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(vendor_mathjax)
+
+client = TestClient(app)
+
+SCRIPT = b"/* MathJax */ window.MathJax = window.MathJax || {};" * 200
+
+
+def _npm_tarball() -> bytes:
+    files = {
+        "package/es5/tex-chtml.js": SCRIPT,
+        "package/es5/tex-svg.js": b"unused",
+        "package/es5/output/chtml/fonts/woff-v2/MathJax_Main-Regular.woff": b"wOFF",
+        "package/LICENSE": b"Apache-2.0",
+    }
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def vendored(tmp_path, monkeypatch):
+    target = str(tmp_path / "mathjax")
+    vendor_mathjax.vendor(_npm_tarball(), target, "3.2.2")
+    monkeypatch.setattr(render_helpers, "MATHJAX_DIR", target)
+    render_helpers.mathjax_version.cache_clear()
+    render_cache.clear()
+    yield target
+    render_helpers.mathjax_version.cache_clear()
+    render_cache.clear()
+
+
+@pytest.fixture
+def not_vendored(tmp_path, monkeypatch):
+    monkeypatch.setattr(render_helpers, "MATHJAX_DIR", str(tmp_path / "missing"))
+    render_helpers.mathjax_version.cache_clear()
+    yield
+    render_helpers.mathjax_version.cache_clear()
+
+
+def test_vendor_copies_only_what_the_preview_loads(vendored):
+    found = sorted(
+        os.path.relpath(os.path.join(dirpath, name), vendored)
+        for dirpath, _dirs, names in os.walk(vendored)
+        for name in names
+    )
+    assert found == [
+        "LICENSE",
+        "VERSION",
+        os.path.join(
+            "output", "chtml", "fonts", "woff-v2", "MathJax_Main-Regular.woff"
+        ),
+        "tex-chtml.js",
+        "tex-chtml.js.gz",
+    ]
+    with gzip.open(os.path.join(vendored, "tex-chtml.js.gz")) as f:
+        assert f.read() == SCRIPT
+
+
+def test_vendoring_verifies_the_tarball_digest(tmp_path, monkeypatch):
+    tarball = tmp_path / "mathjax.tgz"
+    tarball.write_bytes(_npm_tarball())
+    target = tmp_path / "mathjax"
+    monkeypatch.setattr(vendor_mathjax, "TARGET", str(target))
+
+    # The fake tarball does not match the pinned digest.
+    assert vendor_mathjax.main(["--tarball", str(tarball)]) == 1
+    assert not target.exists()
+    with pytest.raises(SystemExit):
+        vendor_mathjax.main(["--tarball", str(tarball), "--version", "9.9.9"])
+
+    digest = hashlib.sha512(tarball.read_bytes()).hexdigest()
+    assert vendor_mathjax.main(["--tarball", str(tarball), "--sha512", digest]) == 0
+    assert (target / "tex-chtml.js").read_bytes() == SCRIPT
+
+
+def test_mathjax_url_falls_back_to_cdn(not_vendored):
+    assert render_helpers.mathjax_url() == render_helpers.MATHJAX_CDN_URL
+
+
+def test_mathjax_url_points_at_versioned_local_route(vendored):
+    version = render_helpers.mathjax_version()
+    assert render_helpers.mathjax_url() == (
+        f"/api/markdown/mathjax/{version}/tex-chtml.js"
+    )
+    script = render_helpers.get_mathjax_script("http://127.0.0.1:9000")
+    assert f"http://127.0.0.1:9000/api/markdown/mathjax/{version}/" in script
+
+
+def test_route_serves_pinned_script_compressed_and_immutable(vendored):
+    url = render_helpers.mathjax_url()
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "immutable" in response.headers["cache-control"]
+    assert response.content == SCRIPT  # httpx decodes gzip transparently
+
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.content == SCRIPT
+
+
+def test_route_serves_fonts_and_revalidates_stale_versions(vendored):
+    response = client.get(
+        "/api/markdown/mathjax/old/output/chtml/fonts/woff-v2/MathJax_Main-Regular.woff"
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "font/woff"
+    assert response.headers["cache-control"] == "no-cache"
+
+
+def test_route_rejects_paths_outside_the_bundle(vendored):
+    version = render_helpers.mathjax_version()
+    assert client.get(f"/api/markdown/mathjax/{version}/missing.js").status_code == 404
+    escaped = client.get(f"/api/markdown/mathjax/{version}/..%2F..%2Fsecret")
+    assert escaped.status_code == 404
+
+
+def test_route_is_404_when_not_vendored(not_vendored):
+    assert client.get("/api/markdown/mathjax/x/tex-chtml.js").status_code == 404
+
+
+def test_full_document_loads_mathjax_from_the_backend(vendored):
+    html = client.post("/api/markdown/render", json={"content": "$x$"}).json()["html"]
+    assert f"http://testserver{render_helpers.mathjax_url()}" in html
+    assert "cdn.jsdelivr.net" not in html
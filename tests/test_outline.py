@@ -0,0 +1,113 @@
+"""
+tests/test_outline.py
+=====================
+Tests for fence-aware outline extraction and the incremental
+:class:`backend.outline.OutlineIndex`.
+"""
+
+from __future__ import annotations
+
+import random
+
+from backend.live_preview import LivePreviewSession
+from backend.outline import OutlineIndex, edit_line_range, extract_outline
+from benchmarks.corpus import generate_document
+
+FENCED = """# Real
+
+```bash
+# not a heading
+```
+
+~~~~
+## still code
+```
+~~~~
+
+   ### Indented three
+
+    # indented code
+
+## Tail ##
+"""
+
+
+def _apply(nodes: list[dict], patch: dict) -> list[dict]:
+    start, delete = patch["start"], patch["delete"]
+    rest = [
+        {**node, "line": node["line"] + patch["line_delta"]}
+        for node in nodes[start + delete :]
+    ]
+    return nodes[:start] + patch["insert"] + rest
+
+
+def test_headings_in_fenced_code_are_skipped():
+    outline = extract_outline(FENCED)
+    assert [(n["level"], n["text"], n["line"]) for n in outline] == [
+        (1, "Real", 1),
+        (3, "Indented three", 12),
+        (2, "Tail", 16),
+    ]
+
+
+def test_unclosed_fence_hides_the_rest_of_the_document():
+    assert extract_outline("# A\n```\n# B\n") == extract_outline("# A\n")
+
+
+def test_incremental_updates_match_full_scans():
+    rnd = random.Random(7)
+    snippets = ["# Added\n", "## Intro\n", "```\n", "~~~\n", "\n", "x", "#", ""]
+    text = generate_document(20_000, seed=3) + "\n## Intro\n\n## Intro\n"
+    index = OutlineIndex(text)
+    client = index.outline()
+    for _ in range(400):
+        offset = rnd.randrange(len(text) + 1)
+        delete = min(rnd.choice([0, 0, 1, 5, 40]), len(text) - offset)
+        insert = rnd.choice(snippets)
+        patch = index.replace_lines(*edit_line_range(text, offset, delete, insert))
+        text = text[:offset] + insert + text[offset + delete :]
+        expected = extract_outline(text)
+        assert index.outline() == expected
+        if patch is not None:
+            client = _apply(client, patch)
+        assert client == expected
+
+
+def test_patch_covers_only_the_edited_heading():
+    text = "".join(f"## Section {i}\n\nBody.\n\n" for i in range(1000))
+    index = OutlineIndex(text)
+    offset = text.index("Section 500") + len("Section 500")
+    patch = index.replace_lines(*edit_line_range(text, offset, 0, "!"))
+    assert patch["start"] == 500 and patch["delete"] == 1
+    assert [n["text"] for n in patch["insert"]] == ["Section 500!"]
+
+    offset = text.index("Body.")
+    assert index.replace_lines(*edit_line_range(text, offset, 0, "x")) is None
+
+
+def test_duplicate_anchors_are_renumbered_after_an_edit():
+    text = "# Intro\n\n# Other\n\n# Intro\n"
+    index = OutlineIndex(text)
+    patch = index.replace_lines(0, 1, ["# Preface"])
+    assert patch["start"] == 0 and patch["delete"] == 3
+    assert [n["anchor"] for n in index.outline()] == ["preface", "other", "intro"]
+
+
+def test_live_preview_sends_outline_then_patches():
+    session = LivePreviewSession()
+    (reply,) = session.process([{"type": "open", "content": "# A\n\ntext\n"}])
+    assert [n["anchor"] for n in reply["outline"]] == ["a"]
+
+    (reply,) = session.process(
+        [{"type": "edit", "edits": [{"offset": 0, "delete": 0, "insert": "# B\n"}]}]
+    )
+    assert "outline" not in reply
+    (patch,) = reply["outline_patches"]
+    assert _apply([{"level": 1, "text": "A", "anchor": "a", "line": 1}], patch) == (
+        extract_outline(session.text)
+    )
+
+    (reply,) = session.process(
+        [{"type": "edit", "edits": [{"offset": 9, "delete": 0, "insert": "!"}]}]
+    )
+    assert "outline_patches" not in reply
@@ -0,0 +1,79 @@
+"""
+tests/test_process_render.py
+============================
+Tests for the out-of-process rendering path in ``backend/process_render.py``.
+
+Worker processes use the "spawn" start method, so each pool costs about a
+second to start; the tests share one pool where they can.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from backend import renderer
+from backend.process_render import ProcessRenderer, RenderTimeoutError
+
+
+@pytest.fixture(scope="module")
+def pool():
+    process_renderer = ProcessRenderer(threshold=20, timeout=60)
+    yield process_renderer
+    process_renderer.shutdown()
+
+
+def test_threshold_decides_offload():
+    process_renderer = ProcessRenderer(threshold=10)
+    assert not process_renderer.should_offload("short")
+    assert process_renderer.should_offload("x" * 10)
+
+
+def test_zero_threshold_disables_pool():
+    process_renderer = ProcessRenderer(threshold=0)
+    assert not process_renderer.enabled
+    assert not process_renderer.should_offload("x" * 10_000_000)
+
+
+def test_pool_output_matches_in_process(pool):
+    text = "# Title\n\nSome $x$ math and `code`."
+    expected = renderer.render_uncached(
+        text,
+        base_dir=None,
+        fragment=False,
+        dark_mode=True,
+        font_family="serif",
+        font_size=16,
+    )
+    assert pool.render(text, dark_mode=True, font_family="serif", font_size=16) == (
+        expected
+    )
+
+
+def test_render_markdown_dispatches_large_documents(pool, monkeypatch):
+    calls = []
+    original = pool.render
+
+    def tracking(text, **kwargs):
+        calls.append(len(text))
+        return original(text, **kwargs)
+
+    monkeypatch.setattr(pool, "render", tracking)
+    monkeypatch.setattr(renderer, "process_renderer", pool)
+
+    renderer.render_markdown("tiny", use_cache=False)
+    html = renderer.render_markdown("a long enough paragraph", use_cache=False)
+    assert calls == [len("a long enough paragraph")]
+    assert "<p>a long enough paragraph</p>" in html
+
+
+def test_deadline_cancels_and_pool_recovers():
+    process_renderer = ProcessRenderer(threshold=1, timeout=0.05)
+    try:
+        big = "Paragraph with *emphasis* and $x$.\n\n" * 50_000
+        with pytest.raises(RenderTimeoutError):
+            process_renderer.render(big)
+
+        process_renderer.timeout = 60
+        assert "<p>ok</p>" in process_renderer.render("ok", fragment=True)
+    finally:
+        process_renderer.shutdown()
@@ -0,0 +1,176 @@
+"""
+tests/test_quick_open.py
+========================
+Tests for the trigram quick-open index in ``backend/quick_open.py`` and
+``GET /api/files/quick-open``.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.quick_open import QuickOpenIndex, _PathSet, quick_open_index
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    root = tmp_path / "ws"
+    for relative in [
+        "README.md",
+        "docs/readme-old.txt",
+        "docs/guide/install.md",
+        "src/render/markdown.py",
+        "src/render/preview.ts",
+        "src/readers/base.py",
+        ".git/config",
+        "notes/.hidden.md",
+    ]:
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x", encoding="utf-8")
+    return root
+
+
+@pytest.fixture
+def index():
+    index = QuickOpenIndex()
+    yield index
+    index.shutdown()
+
+
+def _relative(result):
+    return [r["relative"] for r in result["results"]]
+
+
+def _eventually(check, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline, "watcher did not catch up"
+        time.sleep(0.05)
+
+
+def test_ranks_name_prefix_then_name_then_path_then_fuzzy(index, workspace):
+    result = index.search(str(workspace), "read")
+    assert _relative(result) == [
+        "README.md",
+        "docs/readme-old.txt",
+        "src/readers/base.py",
+        # Only contains r, e, a, d in that order.
+        "src/render/markdown.py",
+    ]
+    assert result["total_paths"] == 6
+
+    assert _relative(index.search(str(workspace), "rdme")) == [
+        "README.md",
+        "docs/readme-old.txt",
+    ]
+    (first,) = index.search(str(workspace), "Mark Down")["results"]
+    assert first["relative"] == "src/render/markdown.py"
+    assert first["name"] == "markdown.py"
+    assert first["positions"] == list(range(11, 19))
+
+
+def test_positions_point_at_the_matched_characters(index, workspace):
+    (readme,) = index.search(str(workspace), "rdme", limit=1)["results"]
+    assert readme["positions"] == [0, 3, 4, 5]
+    (install,) = index.search(str(workspace), "inst", limit=1)["results"]
+    assert install["positions"] == [11, 12, 13, 14]
+    assert install["path"] == str(workspace / "docs" / "guide" / "install.md")
+
+
+def test_short_queries_match_file_name_prefixes(index, workspace):
+    assert _relative(index.search(str(workspace), "in")) == ["docs/guide/install.md"]
+    assert _relative(index.search(str(workspace), "x")) == []
+    assert _relative(index.search(str(workspace), "  ")) == []
+
+
+def test_refined_queries_match_a_fresh_search():
+    rng = random.Random(7)
+    words = ["src", "read", "render", "note", "index", "main", "test", "docs"]
+    paths = {
+        "/".join(rng.choice(words) for _ in range(rng.randint(1, 4)))
+        + f"{rng.randint(0, 99)}.{rng.choice(['md', 'py', 'txt'])}"
+        for _ in range(600)
+    }
+    typed = _PathSet("/ws")
+    for path in paths:
+        typed.add(path)
+    typed.remove(sorted(paths)[0])
+
+    for query in ["rendermain", "srcnote.md", "idxtest", "readnote9"]:
+        for length in range(1, len(query) + 1):
+            prefix = query[:length]
+            fresh = _PathSet("/ws")
+            for path in typed.paths:
+                if path is not None:
+                    fresh.add(path)
+            got = [r["relative"] for r in typed.search(prefix, 10)]
+            assert got == [r["relative"] for r in fresh.search(prefix, 10)]
+            if length >= 3:
+                pattern = re.compile(".*".join(map(re.escape, prefix)))
+                expected = {p for p in typed.paths if p and pattern.search(p)}
+                assert set(got) <= expected
+                assert len(got) == min(10, len(expected))
+
+
+def test_a_larger_limit_adds_the_fuzzy_tier_to_a_cached_query():
+    paths = _PathSet("/ws")
+    for relative in ["db_x.md", "db_z.md", "d/b/_y.md"]:
+        paths.add(relative)
+    assert [r["relative"] for r in paths.search("db_", 2)] == ["db_x.md", "db_z.md"]
+    assert [r["relative"] for r in paths.search("db_", 50)] == [
+        "db_x.md",
+        "db_z.md",
+        "d/b/_y.md",
+    ]
+
+
+def test_removed_paths_disappear_and_compact(workspace):
+    paths = _PathSet(str(workspace))
+    for i in range(10):
+        paths.add(f"dir/file{i}.md")
+    paths.search("file", 50)
+    paths.remove_below("dir")
+    assert paths.search("file", 50) == []
+    # More than half the ids were deleted, so the lists were rebuilt.
+    assert len(paths.paths) == len(paths.ids) == 0
+    paths.add("dir/file3.md")
+    assert [r["relative"] for r in paths.search("fil", 50)] == ["dir/file3.md"]
+
+
+def test_watcher_keeps_the_index_current(index, workspace):
+    assert _relative(index.search(str(workspace), "zebra")) == []
+    (workspace / "docs" / "zebra.md").write_text("z", encoding="utf-8")
+    (workspace / "README.md").unlink()
+    _eventually(lambda: _relative(index.search(str(workspace), "zebra")))
+    assert _relative(index.search(str(workspace), "readme")) == ["docs/readme-old.txt"]
+
+    (workspace / "docs").rename(workspace / "manuals")
+    _eventually(
+        lambda: _relative(index.search(str(workspace), "zebra")) == ["manuals/zebra.md"]
+    )
+
+
+def test_quick_open_endpoint(workspace):
+    try:
+        response = client.get(
+            "/api/files/quick-open", params={"root": str(workspace), "q": "prev"}
+        )
+        assert response.status_code == 200
+        assert _relative(response.json()) == ["src/render/preview.ts"]
+
+        missing = client.get(
+            "/api/files/quick-open",
+            params={"root": str(workspace / "nope"), "q": "x"},
+        )
+        assert missing.status_code == 404
+    finally:
+        quick_open_index.shutdown()
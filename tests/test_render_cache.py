@@ -0,0 +1,124 @@
+"""
+tests/test_render_cache.py
+==========================
+Unit tests for the content-addressed render cache in
+``backend/render_cache.py`` and its use by ``backend.renderer.render_markdown``.
+"""
+
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import renderer
+from backend.highlight import code_block_cache
+from backend.image_index import image_index
+from backend.incremental import incremental_renderer
+from backend.main import app
+from backend.render_cache import RenderCache, content_digest, render_cache
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    render_cache.clear()
+    yield
+    render_cache.clear()
+
+
+# ── RenderCache ──────────────────────────────────────────────────────────────
+
+
+def test_get_miss_then_hit():
+    cache = RenderCache(max_bytes=100)
+    assert cache.get("a") is None
+    cache.put("a", "html")
+    assert cache.get("a") == "html"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_evicts_least_recently_used_by_size():
+    cache = RenderCache(max_bytes=10)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    cache.get("a")  # "b" is now the oldest
+    cache.put("c", "cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get("c") == "cccc"
+    assert cache.stats()["size_bytes"] == 8
+    assert cache.evictions == 1
+
+
+def test_oversized_value_not_stored():
+    cache = RenderCache(max_bytes=4)
+    cache.put("a", "abc")
+    cache.put("big", "x" * 5)
+    assert cache.get("big") is None
+    assert cache.get("a") == "abc"
+
+
+def test_replacing_key_updates_size():
+    cache = RenderCache(max_bytes=100)
+    cache.put("a", "x" * 10)
+    cache.put("a", "x" * 3)
+    assert cache.stats()["size_bytes"] == 3
+    assert len(cache) == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = RenderCache(enabled=False)
+    cache.put("a", "html")
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_content_digest_is_stable():
+    assert content_digest("# Hi") == content_digest("# Hi")
+    assert content_digest("# Hi") != content_digest("# Ho")
+
+
+# ── render_markdown integration ──────────────────────────────────────────────
+
+
+def test_render_markdown_hits_cache(monkeypatch):
+    calls = []
+    original = renderer._render_document
+
+    def counting(*args):
+        calls.append(args)
+        return original(*args)
+
+    monkeypatch.setattr(renderer, "_render_document", counting)
+
+    first = renderer.render_markdown("# Title")
+    second = renderer.render_markdown("# Title")
+    assert first == second
+    assert len(calls) == 1
+    assert render_cache.hits == 1
+
+
+def test_render_options_are_part_of_key():
+    light = renderer.render_markdown("text", dark_mode=False)
+    dark = renderer.render_markdown("text", dark_mode=True)
+    assert light != dark
+    renderer.render_markdown("text", font_size=18)
+    assert render_cache.stats()["entries"] == 3
+
+
+def test_use_cache_false_bypasses_cache():
+    renderer.render_markdown("# Title", use_cache=False)
+    assert render_cache.stats()["entries"] == 0
+
+
+def test_clear_endpoint_drops_every_render_cache(tmp_path):
+    image = tmp_path / "pixel.gif"
+    image.write_bytes(b"GIF89a\x01\x00\x01\x00\x00\x00\x00;")
+    text = "# Title\n\n```python\nx = 1\n```\n\n![pixel](pixel.gif)\n"
+    renderer.render_markdown(text, base_dir=str(tmp_path))
+    incremental_renderer.render(text, base_dir=str(tmp_path))
+    assert len(render_cache) and len(incremental_renderer.cache)
+    assert len(code_block_cache) and len(image_index)
+
+    stats = TestClient(app).delete("/api/markdown/render/cache").json()
+    assert stats["entries"] == 0 and stats["code_blocks"]["entries"] == 0
+    assert not len(incremental_renderer.cache) and not len(image_index)
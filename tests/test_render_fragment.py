@@ -0,0 +1,107 @@
+"""
+tests/test_render_fragment.py
+=============================
+Tests for fragment-only rendering and the cacheable theme endpoints
+(``/api/markdown/theme.css`` and ``/api/markdown/theme.js``).
+"""
+
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.render_cache import render_cache
+from backend.renderer import render_markdown
+from backend.theme import theme_version
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    render_cache.clear()
+    yield
+    render_cache.clear()
+
+
+def test_fragment_has_no_document_wrapper():
+    html = render_markdown("# Hi", fragment=True)
+    assert "<h1>Hi</h1>" in html
+    assert "<style>" not in html
+    assert "<html" not in html
+
+
+def test_full_document_still_inlines_theme():
+    html = render_markdown("# Hi", dark_mode=True)
+    assert "<!DOCTYPE html>" in html
+    assert "#1e1e1e" in html
+    assert "copy-button" in html
+    assert "MathJax" in html
+
+
+def test_fragment_cache_shared_across_themes():
+    render_markdown("text", fragment=True, dark_mode=False)
+    render_markdown("text", fragment=True, dark_mode=True, font_size=20)
+    assert render_cache.hits == 1
+    assert render_cache.stats()["entries"] == 1
+
+
+def test_render_endpoint_fragment_returns_theme_urls():
+    response = client.post(
+        "/api/markdown/render",
+        json={"content": "# Hi", "fragment": True, "dark_mode": True},
+    )
+    body = response.json()
+    assert "<style>" not in body["html"]
+    theme = body["theme"]
+    assert theme["stylesheet"].startswith("/api/markdown/theme.css?")
+    assert f"v={theme['version']}" in theme["stylesheet"]
+
+
+def test_render_endpoint_default_is_full_document():
+    body = client.post("/api/markdown/render", json={"content": "# Hi"}).json()
+    assert body["html"].startswith("<!DOCTYPE html>")
+    assert "theme" not in body
+
+
+def test_theme_versions_differ_per_combination():
+    light = theme_version(dark_mode=False, font_family="serif", font_size=14)
+    dark = theme_version(dark_mode=True, font_family="serif", font_size=14)
+    bigger = theme_version(dark_mode=False, font_family="serif", font_size=16)
+    assert len({light, dark, bigger}) == 3
+
+
+def test_theme_css_pinned_version_is_immutable():
+    theme = client.post(
+        "/api/markdown/render", json={"content": "", "fragment": True}
+    ).json()["theme"]
+    response = client.get(theme["stylesheet"])
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/css")
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["etag"] == f'"{theme["version"]}"'
+
+
+def test_theme_css_unpinned_must_revalidate():
+    response = client.get("/api/markdown/theme.css?dark_mode=true")
+    assert response.headers["cache-control"] == "no-cache"
+    assert "#1e1e1e" in response.text
+
+
+def test_theme_css_conditional_request_returns_304():
+    first = client.get("/api/markdown/theme.css")
+    second = client.get(
+        "/api/markdown/theme.css", headers={"If-None-Match": first.headers["etag"]}
+    )
+    assert second.status_code == 304
+    assert second.content == b""
+
+
+def test_theme_js_defines_enhance_hook():
+    theme = client.post(
+        "/api/markdown/render", json={"content": "", "fragment": True}
+    ).json()["theme"]
+    response = client.get(theme["script"])
+    assert "markdownReaderEnhance" in response.text
+    assert "immutable" in response.headers["cache-control"]
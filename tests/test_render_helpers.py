@@ -0,0 +1,106 @@
+"""
+tests/test_render_helpers.py
+============================
+Unit tests for the single-pass Markdown pre-processing scanner in
+``backend/render_helpers.py`` (``preprocess_markdown``, ``protect_math``,
+``restore_math``, ``fix_image_paths``).
+"""
+
+from __future__ import annotations
+
+from backend.render_helpers import (
+    fix_image_paths,
+    preprocess_markdown,
+    protect_math,
+    restore_math,
+)
+
+# ── math protection ──────────────────────────────────────────────────────────
+
+
+def test_inline_and_display_math_protected():
+    text, replacements = protect_math("a $x$ b\n\n$$\ny\n$$")
+    assert "$" not in text
+    values = list(replacements.values())
+    assert values[0] == '<span class="math-inline">\\(x\\)</span>'
+    assert values[1] == '<div class="math-display">\\[\ny\n\\]</div>'
+
+
+def test_math_inside_fenced_code_untouched():
+    source = "```\ncost = $a + $b\n$$\n```\n\n~~~\n$x$\n~~~"
+    text, replacements = protect_math(source)
+    assert text == source
+    assert replacements == {}
+
+
+def test_math_inside_inline_code_untouched():
+    text, replacements = protect_math("`$x$` and ``$y$`` but $z$")
+    assert text.startswith("`$x$` and ``$y$`` but MATHPLACEHOLDER")
+    assert len(replacements) == 1
+
+
+def test_escaped_dollar_is_not_math():
+    source = r"costs \$5 or \$6"
+    assert protect_math(source) == (source, {})
+
+
+def test_unclosed_fence_does_not_hide_math():
+    _, replacements = protect_math("```\n$x$")
+    assert len(replacements) == 1
+
+
+# ── restoration ──────────────────────────────────────────────────────────────
+
+
+def test_restore_strips_paragraph_around_display_math():
+    _, replacements = protect_math("$$x$$")
+    html = restore_math("<p>MATHPLACEHOLDER0X</p>", replacements)
+    assert html == '<div class="math-display">\\[x\\]</div>'
+
+
+def test_restore_keeps_paragraph_around_inline_math():
+    _, replacements = protect_math("$x$")
+    html = restore_math("<p>MATHPLACEHOLDER0X</p>", replacements)
+    assert html == '<p><span class="math-inline">\\(x\\)</span></p>'
+
+
+def test_restore_ignores_unknown_placeholders():
+    assert restore_math("MATHPLACEHOLDER9X", {"MATHPLACEHOLDER0X": "v"}) == (
+        "MATHPLACEHOLDER9X"
+    )
+
+
+def test_many_formulas_round_trip():
+    source = " ".join(f"${i}$" for i in range(2000))
+    text, replacements = protect_math(source)
+    restored = restore_math(text, replacements)
+    assert restored.count("math-inline") == 2000
+    assert "MATHPLACEHOLDER" not in restored
+
+
+# ── image paths ──────────────────────────────────────────────────────────────
+
+
+def test_relative_image_resolved(tmp_path):
+    result = fix_image_paths("![cat](img/cat.png)", str(tmp_path))
+    assert result == f"![cat](file://{tmp_path.as_posix()}/img/cat.png)"
+
+
+def test_absolute_and_remote_images_untouched():
+    source = "![a](https://x/y.png) ![b](/abs.png) ![c](file:///c.png)"
+    assert fix_image_paths(source, "/base") == source
+
+
+def test_image_inside_code_untouched():
+    source = "```\n![a](a.png)\n```\n`![b](b.png)`"
+    assert fix_image_paths(source, "/base") == source
+
+
+def test_fix_image_paths_leaves_math_alone():
+    assert fix_image_paths("$x$", "/base") == "$x$"
+
+
+def test_single_sweep_does_both():
+    text, replacements = preprocess_markdown("![a](a.png) $x$", "/base")
+    assert text == "![a](file:///base/a.png) MATHPLACEHOLDER0X"
+    assert len(replacements) == 1
@@ -0,0 +1,174 @@
+"""
+tests/test_search_index.py
+==========================
+Tests for the persistent full-text index in ``backend/search_index.py`` and
+``GET /api/files/search``.
+"""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import search_index as search_index_module
+from backend.main import app
+from backend.search_index import SearchIndex, build_query, search_index
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def notes(tmp_path):
+    root = tmp_path / "notes"
+    (root / "guides").mkdir(parents=True)
+    (root / ".trash").mkdir()
+    (root / "guides" / "setup.md").write_text(
+        "# Setup\n\nRun the installer.\n\nThen read the install guide.\n",
+        encoding="utf-8",
+    )
+    (root / "todo.txt").write_text("buy milk\ninstall shelves\n", encoding="utf-8")
+    (root / "page.html").write_text(
+        "<html><title>Café page</title>\n<body><p>Résumé\nof the\n"
+        "<b>installation</b></p></body></html>",
+        encoding="utf-8",
+    )
+    (root / ".trash" / "old.md").write_text("install", encoding="utf-8")
+    (root / "image.png").write_bytes(b"install")
+    return root
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(str(tmp_path / "index.sqlite3"))
+    yield index
+    index.shutdown()
+
+
+def _paths(result, root):
+    return [r["path"][len(str(root)) + 1 :] for r in result["results"]]
+
+
+def _eventually(check, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline, "watcher did not catch up"
+        time.sleep(0.05)
+
+
+def test_build_query_quotes_words_and_prefixes_the_last():
+    assert build_query('install "guide') == ('"install" "guide"*', ["install", "guide"])
+    with pytest.raises(ValueError):
+        build_query(" -- ")
+
+
+def test_ranked_results_with_snippets_and_lines(index, notes):
+    result = index.search(str(notes), "install")
+    assert sorted(_paths(result, notes)) == ["guides/setup.md", "page.html", "todo.txt"]
+    assert result["indexed_files"] == 3
+
+    (setup,) = index.search(str(notes), "install guide")["results"]
+    assert setup["title"] == "Setup"
+    assert "<mark>install</mark> <mark>guide</mark>" in setup["snippet"]
+    # Only the last word matches as a prefix, as in the index.
+    assert setup["matches"] == [{"line": 5, "text": "Then read the install guide."}]
+
+    (page,) = index.search(str(notes), "resume")["results"]
+    assert page["title"] == "Café page"
+    assert page["matches"] == [{"line": 2, "text": "Résumé"}]
+
+
+def test_lines_and_marks_agree_with_the_index(index, tmp_path):
+    root = tmp_path / "words"
+    root.mkdir()
+    (root / "art.md").write_text(
+        "start here\n\nrestart it\n\nthe art of code\n", encoding="utf-8"
+    )
+    (hit,) = index.search(str(root), "art")["results"]
+    assert hit["matches"] == [{"line": 5, "text": "the art of code"}]
+    assert "<mark>" not in hit["snippet"].replace("<mark>art</mark>", "")
+
+    (hit,) = index.search(str(root), "the co")["results"]
+    assert "<mark>the</mark> art of <mark>code</mark>" in hit["snippet"]
+
+
+def test_index_persists_and_only_rereads_changed_files(tmp_path, notes):
+    db = str(tmp_path / "index.sqlite3")
+    first = SearchIndex(db)
+    first.search(str(notes), "milk")
+    first.shutdown()
+    assert first.indexed == 3
+
+    (notes / "todo.txt").write_text("buy oat milk\n", encoding="utf-8")
+    second = SearchIndex(db)
+    try:
+        assert _paths(second.search(str(notes), "oat"), notes) == ["todo.txt"]
+        assert second.indexed == 1
+    finally:
+        second.shutdown()
+
+
+def test_watcher_updates_the_index_without_rescanning(index, notes):
+    index.search(str(notes), "install")
+    (notes / "guides" / "new.md").write_text("# Zebra crossing\n", encoding="utf-8")
+    (notes / "todo.txt").unlink()
+    _eventually(lambda: _paths(index.search(str(notes), "zebra"), notes))
+    assert _paths(index.search(str(notes), "milk"), notes) == []
+
+    (notes / "guides").rename(notes / "manuals")
+    _eventually(
+        lambda: _paths(index.search(str(notes), "zebra"), notes) == ["manuals/new.md"]
+    )
+
+
+def test_least_recently_searched_root_stops_being_watched(tmp_path, monkeypatch):
+    watcher = search_index_module.workspace_watcher
+    unwatch = watcher.unwatch
+    unwatched = []
+
+    def record(watch):
+        unwatched.append(watch)
+        unwatch(watch)
+
+    monkeypatch.setattr(watcher, "unwatch", record)
+    roots = []
+    for name in ("a", "b", "c"):
+        root = tmp_path / name
+        root.mkdir()
+        (root / "note.md").write_text(f"shared {name}\n", encoding="utf-8")
+        roots.append(str(root))
+    index = SearchIndex(str(tmp_path / "index.sqlite3"), max_roots=2)
+    try:
+        index.search(roots[0], "shared")
+        index.search(roots[1], "shared")
+        index.search(roots[0], "shared")
+        index.search(roots[2], "shared")
+        assert list(index._roots) == [roots[0], roots[2]]
+        assert [watch.path for watch in unwatched] == [roots[1]]
+
+        # An evicted root is synced again when it is searched next.
+        (tmp_path / "b" / "note.md").write_text("changed b\n", encoding="utf-8")
+        assert _paths(index.search(roots[1], "changed"), roots[1]) == ["note.md"]
+    finally:
+        index.shutdown()
+
+
+def test_search_endpoint(tmp_path, notes, monkeypatch):
+    monkeypatch.setattr(search_index, "db_path", str(tmp_path / "api.sqlite3"))
+    search_index.shutdown()
+    try:
+        response = client.get(
+            "/api/files/search", params={"root": str(notes), "q": "shel"}
+        )
+        assert response.status_code == 200
+        assert _paths(response.json(), notes) == ["todo.txt"]
+
+        bad = client.get("/api/files/search", params={"root": str(notes), "q": "*"})
+        assert bad.status_code == 400
+        missing = client.get(
+            "/api/files/search", params={"root": str(notes / "nope"), "q": "x"}
+        )
+        assert missing.status_code == 404
+    finally:
+        search_index.shutdown()
@@ -0,0 +1,105 @@
+"""
+tests/test_source_map.py
+========================
+Tests for source-mapped renders: ``data-line`` attributes on top-level blocks
+and the ``line_map`` returned by ``/render`` and ``/document``.
+"""
+
+from __future__ import annotations
+
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.incremental import incremental_renderer
+from backend.main import app
+from backend.render_cache import render_cache
+from benchmarks.corpus import generate_document
+
+client = TestClient(app)
+
+DOC = """# Intro
+
+Hello *world*
+second line
+
+```python
+x = 1
+```
+
+[ref]: https://example.com
+
+- one
+- two
+
+$$
+x^2
+$$
+"""
+
+_DATA_LINE_RE = re.compile(r'data-line="(\d+)" data-line-end="(\d+)"')
+
+
+@pytest.fixture(autouse=True)
+def _fresh_caches():
+    render_cache.clear()
+    incremental_renderer.cache.clear()
+    yield
+    render_cache.clear()
+    incremental_renderer.cache.clear()
+
+
+def _post(path: str, content: str, **options) -> dict:
+    response = client.post(
+        f"/api/markdown/{path}", json={"content": content, **options}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_blocks_are_tagged_with_their_source_lines():
+    result = _post("render", DOC, fragment=True, source_map=True)
+    assert result["line_map"] == [[1, 1], [3, 4], [6, 8], [12, 13], [15, 17]]
+    html = result["html"]
+    assert '<h1 data-line="1" data-line-end="1">Intro</h1>' in html
+    assert '<p data-line="3" data-line-end="4">' in html
+    assert '<ul data-line="12" data-line-end="13">' in html
+    assert '<div data-line="15" data-line-end="17" class="math-display">' in html
+
+
+def test_attributes_match_line_map_on_generated_documents():
+    for seed in range(3):
+        text = generate_document(6_000, seed=seed)
+        result = _post("render", text, fragment=True, source_map=True)
+        tagged = [[int(a), int(b)] for a, b in _DATA_LINE_RE.findall(result["html"])]
+        assert tagged == result["line_map"]
+
+
+def test_untagged_blocks_are_not_listed():
+    text = "Intro\n\n<!-- note -->\n\n[r]: https://example.com\n\nEnd"
+    for engine in (None, "python-markdown"):
+        result = _post("render", text, fragment=True, source_map=True, engine=engine)
+        assert result["line_map"] == [[1, 1], [7, 7]]
+        assert "<!-- note -->" in result["html"]
+
+
+def test_mapped_body_renders_like_the_plain_one():
+    plain = _post("render", DOC, fragment=True)["html"]
+    mapped = _post("render", DOC, fragment=True, source_map=True)["html"]
+    assert "line_map" not in _post("render", DOC, fragment=True)
+    assert _DATA_LINE_RE.sub("", mapped).replace(" >", ">").split() == plain.split()
+
+
+def test_full_document_and_engine_options_are_kept():
+    result = _post("render", DOC, source_map=True, engine="python-markdown")
+    assert result["html"].startswith("<!DOCTYPE html>")
+    assert 'data-line="6" data-line-end="8"' in result["html"]
+    assert len(result["line_map"]) == 5
+
+
+def test_document_endpoint_keeps_heading_ids_with_source_lines():
+    result = _post("document", DOC, fragment=True, source_map=True)
+    assert '<h1 id="intro" data-line="1" data-line-end="1">Intro</h1>' in result["html"]
+    assert result["line_map"][0] == [1, 1]
+    assert result["outline"][0]["line"] == 1
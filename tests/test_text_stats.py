@@ -0,0 +1,194 @@
+"""
+tests/test_text_stats.py
+========================
+Tests for the single-pass statistics engine in
+:mod:`markdown_reader.text_stats` and the ``/wordcount`` endpoint built on it.
+"""
+
+from __future__ import annotations
+
+import random
+import tracemalloc
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from benchmarks.corpus import generate_document
+from markdown_reader import text_stats as engine
+from markdown_reader.text_stats import (
+    ParagraphStats,
+    TextStats,
+    split_paragraphs,
+    strip_markdown,
+    text_stats,
+)
+
+client = TestClient(app)
+
+
+def test_fenced_code_is_skipped_up_to_the_matching_fence():
+    text = "intro\n\n````md\n```\nnot counted\n```\n````\n\n  ~~~\n# no\n~~~\nend"
+    assert text_stats(text).words == 2
+    # An unclosed fence runs to the end of the document.
+    assert text_stats("# Title\n```\nnever closed\n").words == 1
+    # Triple backticks within a line are inline code, not a fence.
+    assert text_stats("```code``` after").words == 1
+
+
+def test_markup_only_tokens_and_block_markers_are_not_words():
+    text = (
+        "# Heading\n"
+        "> - [ ] task **done**\n"
+        "1. [link text](https://example.com/a) and ![alt](i.png)\n"
+        "| a | b |\n|---|:-:|\n"
+        "***\n"
+        "x ** y <span>z</span> a < b"
+    )
+    words = strip_markdown(text).split()
+    assert "**" not in words and "---" not in " ".join(words)
+    assert text_stats(text).words == len(words) == 14
+
+
+def test_cjk_characters_count_as_words():
+    stats = text_stats("Hello 世界 world, こんにちは `代码`")
+    assert stats.cjk_characters == 7
+    assert stats.words == 9
+
+
+def test_character_counts():
+    stats = text_stats("a b\tc\nd  ")
+    assert stats.chars_with_spaces == 9
+    assert stats.chars_without_spaces == 4
+
+
+def test_stats_of_consecutive_paragraphs_add_up():
+    first, second = "# One two\n\n", "three `x` 四五\n"
+    assert text_stats(first) + text_stats(second) == text_stats(first + second)
+    assert TextStats().reading_time == "< 1 min read"
+
+
+def test_chunked_counting_matches_and_keeps_memory_flat(monkeypatch):
+    text = generate_document(300_000, seed=2)
+    expected = text_stats(text)
+    monkeypatch.setattr(engine, "_CHUNK", 97)
+    assert text_stats(text) == expected
+
+    tracemalloc.start()
+    try:
+        text_stats(text)
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < len(text) // 4
+
+
+def test_fenced_code_with_blank_lines_stays_one_paragraph():
+    text = "intro\n\n```\ncode\n\nmore code\n```\n\n~~~\n\n```\n\n~~~\n\noutro"
+    assert split_paragraphs(text) == [
+        "intro",
+        "```\ncode\n\nmore code\n```",
+        "~~~\n\n```\n\n~~~",
+        "outro",
+    ]
+
+
+def test_paragraph_stats_match_full_counts_under_edits():
+    rnd = random.Random(5)
+    snippets = [
+        "\n\n",
+        "```\n",
+        "~~~~\n",
+        "x",
+        "`",
+        "<div\n",
+        "\n",
+        "**a** ",
+        "中文",
+        "#",
+    ]
+    text = generate_document(30_000, seed=5)
+    cache = ParagraphStats()
+    for _ in range(300):
+        offset = rnd.randrange(len(text) + 1)
+        delete = min(rnd.choice([0, 0, 1, 3, 30]), len(text) - offset)
+        text = text[:offset] + rnd.choice(snippets) + text[offset + delete :]
+        assert cache.update(text) == text_stats(text)
+        start = rnd.randrange(len(text))
+        selection = text[start : rnd.randrange(start, len(text) + 1)]
+        assert cache.stats(selection) == text_stats(selection)
+
+
+def test_paragraph_stats_recount_only_changed_paragraphs():
+    text = "".join(f"Paragraph {i} has some words.\n\n" for i in range(500))
+    cache = ParagraphStats()
+    cache.update(text)
+    counted = cache.counted
+    edited = text.replace("Paragraph 250 has", "Paragraph 250 now has")
+    assert cache.update(edited).words == text_stats(edited).words
+    assert cache.counted == counted + 1
+
+    # A selection of whole paragraphs is served from the cache.
+    start = edited.index("Paragraph 10 ")
+    cache.stats(edited[start : edited.index("Paragraph 20 ")])
+    assert cache.counted == counted + 1
+
+
+def _read_lines(text):
+    def read_lines(first, last):
+        return "\n".join(text.split("\n")[first - 1 : last])
+
+    return read_lines
+
+
+def test_recount_after_line_edits_matches_full_counts():
+    rnd = random.Random(7)
+    snippets = ["\n\n", "```\n", "~~~~\n", "x", "\n", "**a** ", "中文", "# "]
+    text = generate_document(30_000, seed=7)
+    cache = ParagraphStats()
+    cache.update(text)
+    fallbacks = 0
+    for _ in range(300):
+        # Several edits may arrive before one recount.
+        for _ in range(rnd.randint(1, 3)):
+            offset = rnd.randrange(len(text) + 1)
+            delete = min(rnd.choice([0, 0, 1, 3, 30, 300]), len(text) - offset)
+            insert = rnd.choice(snippets)
+            first = text.count("\n", 0, offset) + 1
+            last = first + text.count("\n", offset, offset + delete)
+            added = insert.count("\n") - (last - first)
+            text = text[:offset] + insert + text[offset + delete :]
+            cache.changed(first, last, added)
+        stats = cache.recount(_read_lines(text))
+        if stats is None:
+            fallbacks += 1
+            stats = cache.update(text)
+        assert stats == text_stats(text)
+    assert fallbacks < 100
+
+
+def test_recount_reads_only_the_edited_paragraphs():
+    text = "".join(f"Paragraph {i} has some words.\n\n" for i in range(500))
+    cache = ParagraphStats()
+    cache.update(text)
+    line = 2 * 250 + 1
+    text = text.replace("Paragraph 250 has", "Paragraph 250 now\nhas", 1)
+    cache.changed(line, line, 1)
+    reads = []
+
+    def read_lines(first, last):
+        reads.append((first, last))
+        return _read_lines(text)(first, last)
+
+    assert cache.recount(read_lines) == text_stats(text)
+    assert reads == [(line - 2, line + 3)]
+
+
+def test_wordcount_endpoint_reports_cjk_characters():
+    response = client.post("/api/markdown/wordcount", json={"content": "# 你好 world"})
+    assert response.json() == {
+        "words": 3,
+        "cjk_characters": 2,
+        "chars_with_spaces": 10,
+        "chars_without_spaces": 8,
+        "reading_time": "< 1 min read",
+    }
@@ -0,0 +1,142 @@
+"""
+tests/test_windowed.py
+======================
+Tests for the block index behind windowed rendering and the
+``/api/markdown/render/window`` endpoint.
+"""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import windowed
+from backend.blocks import split_blocks
+from backend.main import app
+from backend.windowed import DocumentIndex, render_window, window_indexes
+from benchmarks.corpus import generate_document
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_indexes():
+    window_indexes.clear()
+    yield
+    window_indexes.clear()
+
+
+@pytest.fixture
+def big_file(tmp_path):
+    path = tmp_path / "big.md"
+    text = generate_document(200_000, seed=4) + "\n[ref]: https://example.com/\n"
+    path.write_text(text, encoding="utf-8")
+    return path, text
+
+
+def test_index_matches_split_blocks_and_byte_offsets(big_file):
+    path, text = big_file
+    index = DocumentIndex.build(str(path))
+    blocks = split_blocks(text)
+    assert [(s.kind, s.start_line, s.end_line) for s in index.spans] == [
+        (b.kind, b.start_line, b.end_line) for b in blocks
+    ]
+    assert index.line_count == text.count("\n") + 1
+    assert [b.text for b in index.read_blocks(index.spans[100:140])] == [
+        b.text for b in blocks[100:140]
+    ]
+    assert index.refs == "[ref]: https://example.com/"
+    tops = [s.top for s in index.spans]
+    assert tops == sorted(tops)
+    assert index.total_height == sum(s.height for s in index.spans)
+
+
+def test_index_is_the_same_across_decoded_chunk_boundaries(big_file, monkeypatch):
+    path, _text = big_file
+    whole = DocumentIndex.build(str(path))
+    monkeypatch.setattr(windowed, "_CHUNK_LINES", 7)
+    monkeypatch.setattr(windowed, "_CACHED_CHUNKS", 1)
+    chunked = DocumentIndex.build(str(path))
+    assert chunked.spans == whole.spans
+    assert chunked.refs == whole.refs
+    assert chunked.line_count == whole.line_count
+
+
+def test_index_of_an_empty_file(tmp_path):
+    path = tmp_path / "empty.md"
+    path.write_bytes(b"")
+    index = DocumentIndex.build(str(path))
+    assert index.spans == [] and index.line_count == 1
+
+
+def test_window_covers_requested_lines_only(big_file):
+    path, text = big_file
+    result = render_window(str(path), start_line=2000, line_count=50)
+    blocks = result["blocks"]
+    index = window_indexes.get(str(path))
+    first = result["first_block"]
+    assert blocks[0]["end_line"] >= 2000 > index.spans[first - 1].end_line
+    assert blocks[-1]["start_line"] <= blocks[0]["start_line"] + 49
+    assert result["line_count"] == text.count("\n") + 1
+    assert result["block_count"] == len(split_blocks(text))
+    for block in blocks:
+        if block["html"]:
+            assert f'data-line="{block["start_line"]}"' in block["html"]
+
+
+def test_offset_selects_block_by_estimated_position(big_file):
+    path, _text = big_file
+    total = render_window(str(path), line_count=1)["total_height"]
+    result = render_window(str(path), offset=total / 2, line_count=1)
+    (block,) = result["blocks"]
+    assert block["top"] <= total / 2 < block["top"] + block["height"]
+
+
+def test_window_size_is_capped(big_file, monkeypatch):
+    path, _text = big_file
+    monkeypatch.setattr(windowed, "MAX_WINDOW_BYTES", 1024)
+    result = render_window(str(path), line_count=10_000)
+    span_bytes = sum(len(b["html"]) for b in result["blocks"])
+    assert len(result["blocks"]) < result["block_count"]
+    assert span_bytes < 64 * 1024
+
+
+def test_index_is_reused_until_the_file_changes(big_file):
+    path, _text = big_file
+    first = render_window(str(path))
+    render_window(str(path), start_line=500)
+    assert window_indexes.builds == 1
+
+    path.write_text("# Replaced\n", encoding="utf-8")
+    os.utime(path, ns=(1, 1))
+    second = render_window(str(path))
+    assert window_indexes.builds == 2
+    assert second["version"] != first["version"]
+    assert second["blocks"][0]["html"].startswith("<h1 data-line")
+
+
+def test_endpoint_returns_window_and_theme(big_file):
+    path, _text = big_file
+    response = client.post(
+        "/api/markdown/render/window",
+        json={"path": str(path), "start_line": 10, "line_count": 20},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["blocks"] and body["total_height"] > 0
+    assert body["theme"]["stylesheet"].startswith("/api/markdown/theme.css")
+
+
+def test_endpoint_errors(tmp_path):
+    missing = client.post(
+        "/api/markdown/render/window", json={"path": str(tmp_path / "nope.md")}
+    )
+    assert missing.status_code == 404
+    doc = tmp_path / "a.md"
+    doc.write_text("# a\n", encoding="utf-8")
+    bad_engine = client.post(
+        "/api/markdown/render/window", json={"path": str(doc), "engine": "nope"}
+    )
+    assert bad_engine.status_code == 400
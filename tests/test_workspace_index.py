@@ -0,0 +1,133 @@
+"""
+tests/test_workspace_index.py
+=============================
+Tests for the watched directory-listing cache in
+``backend/workspace_index.py`` and ``GET /api/files/list``.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.workspace_index import WorkspaceIndex
+from backend.workspace_watcher import workspace_watcher
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def index():
+    index = WorkspaceIndex()
+    yield index
+    index.shutdown()
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "docs" / "guide").mkdir(parents=True)
+    (tmp_path / ".git").mkdir()
+    for name in ["README.md", "docs/a.md", "docs/notes.txt", "docs/guide/b.md"]:
+        (tmp_path / name).write_text("x", encoding="utf-8")
+    return tmp_path
+
+
+def _names(entries):
+    return [e["name"] for e in entries]
+
+
+def _eventually(check, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline, "watcher did not catch up"
+        time.sleep(0.05)
+
+
+def test_listing_is_sorted_filtered_and_cached(index, tree):
+    entries, truncated = index.list(str(tree / "docs"), extensions="md")
+    assert _names(entries) == ["guide", "a.md"]
+    assert entries[1]["path"] == str(tree / "docs" / "a.md")
+    assert not truncated
+    index.list(str(tree / "docs"))
+    assert index.scans == 1
+
+
+def test_recursive_listing_is_depth_first(index, tree):
+    entries, _ = index.list(str(tree), recursive=True)
+    assert [os.path.relpath(e["path"], tree) for e in entries] == [
+        "docs",
+        os.path.join("docs", "guide"),
+        os.path.join("docs", "guide", "b.md"),
+        os.path.join("docs", "a.md"),
+        os.path.join("docs", "notes.txt"),
+        "README.md",
+    ]
+    scans = index.scans
+    index.list(str(tree / "docs" / "guide"))
+    assert index.scans == scans
+
+
+def test_watcher_invalidates_changed_folders(index, tree):
+    index.list(str(tree), recursive=True)
+    new = tree / "docs" / "guide" / "new.md"
+    new.write_text("x", encoding="utf-8")
+    _eventually(lambda: "new.md" in _names(index.list(str(tree / "docs" / "guide"))[0]))
+    new.rename(tree / "moved.md")
+    _eventually(lambda: "moved.md" in _names(index.list(str(tree))[0]))
+    assert "new.md" not in _names(index.list(str(tree / "docs" / "guide"))[0])
+
+
+def test_flat_listings_watch_only_their_folder(index, tree):
+    index.list(str(tree))
+    index.list(str(tree / "docs"))
+    assert [(p, r.recursive) for p, r in index._roots.items()] == [
+        (str(tree), False),
+        (str(tree / "docs"), False),
+    ]
+    (tree / "fresh.md").write_text("x", encoding="utf-8")
+    _eventually(lambda: "fresh.md" in _names(index.list(str(tree))[0]))
+
+    # A recursive listing replaces the flat roots it covers.
+    index.list(str(tree), recursive=True)
+    assert [(p, r.recursive) for p, r in index._roots.items()] == [(str(tree), True)]
+    scans = index.scans
+    index.list(str(tree / "docs" / "guide"))
+    assert index.scans == scans
+
+
+def test_explicit_invalidate(index, tree):
+    index.list(str(tree))
+    (tree / "fresh.md").write_text("x", encoding="utf-8")
+    index.invalidate(str(tree / "fresh.md"))
+    assert "fresh.md" in _names(index.list(str(tree))[0])
+
+
+def test_unwatchable_root_falls_back_to_mtime_checks(index, tree, monkeypatch):
+    def refuse(*args, **kwargs):
+        raise OSError("inotify watch limit reached")
+
+    index.list(str(tree / "docs"))
+    monkeypatch.setattr(workspace_watcher, "watch", refuse)
+    index.list(str(tree))
+    (tree / "fresh.md").write_text("x", encoding="utf-8")
+    assert "fresh.md" in _names(index.list(str(tree))[0])
+
+
+def test_list_endpoint(tree):
+    response = client.get(
+        "/api/files/list", params={"path": str(tree), "recursive": True}
+    )
+    body = response.json()
+    assert len(body["entries"]) == 6 and body["truncated"] is False
+
+    flat = client.get("/api/files/list", params={"path": str(tree)}).json()
+    assert _names(flat["entries"]) == ["docs", "README.md"]
+
+    path = str(tree / "created.md")
+    client.post("/api/files/write", json={"path": path, "content": "x"})
+    flat = client.get("/api/files/list", params={"path": str(tree)}).json()
+    assert "created.md" in _names(flat["entries"])
@@ -0,0 +1,109 @@
+"""
+tests/test_workspace_stats.py
+=============================
+Tests for the batch statistics scanner in ``backend/workspace_stats.py`` and
+the ``/api/files/stats`` endpoint.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.workspace_stats import (
+    WorkspaceStats,
+    collect_files,
+    file_stats,
+    workspace_stats,
+)
+from benchmarks.corpus import generate_document
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "docs" / "deep").mkdir(parents=True)
+    (tmp_path / ".git").mkdir()
+    files = {
+        "a.md": "# A\n\nOne two three.\n",
+        "docs/b.markdown": "# B\n\n## B2\n\n```\n# not a heading\n```\n",
+        "docs/deep/c.md": generate_document(20_000, seed=1),
+        "docs/notes.txt": "plain words\n",
+        ".git/d.md": "# hidden\n",
+    }
+    for name, text in files.items():
+        (tmp_path / name).write_text(text, encoding="utf-8")
+    return tmp_path
+
+
+def _records(items):
+    return {item["path"]: item for item in items if item["type"] == "file"}
+
+
+def test_collect_files_filters_and_skips_hidden(tree):
+    files, truncated = collect_files(str(tree))
+    assert [os.path.relpath(f, tree) for f in files] == [
+        "a.md",
+        os.path.join("docs", "b.markdown"),
+        os.path.join("docs", "deep", "c.md"),
+    ]
+    assert not truncated
+    assert len(collect_files(str(tree), extensions="")[0]) == 4
+    assert collect_files(str(tree), max_files=2) == (files[:2], True)
+
+
+def test_scan_reports_files_errors_and_summary(tree):
+    scanner = WorkspaceStats()
+    files, _ = collect_files(str(tree))
+    items = list(scanner.scan([*files, str(tree / "missing.md")]))
+    summary = items[-1]
+    records = _records(items)
+    assert records[files[1]]["heading_count"] == 2
+    for path in files:
+        assert {**records[path], **file_stats(path)} == records[path]
+    assert summary["type"] == "summary"
+    assert (summary["files"], summary["errors"], summary["cached"]) == (3, 1, 0)
+    assert summary["words"] == sum(r["words"] for r in records.values())
+
+
+def test_rescan_is_served_from_cache_until_a_file_changes(tree):
+    scanner = WorkspaceStats()
+    files, _ = collect_files(str(tree))
+    list(scanner.scan(files))
+    assert list(scanner.scan(files))[-1]["cached"] == 3
+
+    (tree / "a.md").write_text("# A\n\nNow four words here.\n", encoding="utf-8")
+    items = list(scanner.scan(files))
+    assert items[-1]["cached"] == 2
+    assert _records(items)[str(tree / "a.md")]["words"] == 5
+
+
+def test_pool_results_match_in_process(tree):
+    files, _ = collect_files(str(tree))
+    scanner = WorkspaceStats(workers=2, inline_bytes=0)
+    try:
+        pooled = _records(scanner.scan(files))
+    finally:
+        scanner.shutdown()
+    assert pooled == _records(WorkspaceStats().scan(files))
+
+
+def test_endpoint_streams_ndjson(tree):
+    workspace_stats.clear()
+    response = client.post(
+        "/api/files/stats",
+        json={"path": str(tree / "docs"), "paths": [str(tree / "a.md")]},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    items = [json.loads(line) for line in response.text.splitlines()]
+    assert items[-1]["type"] == "summary" and items[-1]["files"] == 3
+
+    assert client.post("/api/files/stats", json={}).status_code == 400
+    missing = client.post("/api/files/stats", json={"path": str(tree / "nope")})
+    assert missing.status_code == 404
@@ -0,0 +1,66 @@
+"""
+tests/test_workspace_watcher.py
+===============================
+Tests for the shared observer in ``backend/workspace_watcher.py``.
+"""
+
+from __future__ import annotations
+
+import threading
+
+import pytest
+from watchdog.events import FileSystemEventHandler
+
+from backend.workspace_watcher import WorkspaceWatcher
+
+
+class _Seen(FileSystemEventHandler):
+    def __init__(self):
+        self.paths: list[str] = []
+        self.event = threading.Event()
+
+    def on_created(self, event):
+        self.paths.append(event.src_path)
+        self.event.set()
+
+
+@pytest.fixture
+def watcher():
+    watcher = WorkspaceWatcher()
+    yield watcher
+    watcher.shutdown()
+
+
+def test_handlers_on_one_folder_share_a_watch(watcher, tmp_path):
+    first, second = _Seen(), _Seen()
+    first_watch = watcher.watch(str(tmp_path), first)
+    second_watch = watcher.watch(str(tmp_path), second)
+    assert len(watcher._watches) == 1
+
+    (tmp_path / "a.md").write_text("x", encoding="utf-8")
+    assert first.event.wait(5) and second.event.wait(5)
+    assert first.paths == second.paths == [str(tmp_path / "a.md")]
+
+    watcher.unwatch(first_watch)
+    watcher.unwatch(first_watch)
+    assert len(watcher._watches) == 1
+    watcher.unwatch(second_watch)
+    assert watcher._watches == {}
+
+
+def test_a_failing_handler_does_not_starve_the_others(watcher, tmp_path):
+    class Broken(FileSystemEventHandler):
+        def on_any_event(self, event):
+            raise RuntimeError("boom")
+
+    seen = _Seen()
+    watcher.watch(str(tmp_path), Broken())
+    watcher.watch(str(tmp_path), seen)
+    (tmp_path / "a.md").write_text("x", encoding="utf-8")
+    assert seen.event.wait(5)
+
+
+def test_unwatchable_folder_raises(watcher, tmp_path):
+    with pytest.raises(OSError):
+        watcher.watch(str(tmp_path / "missing"), _Seen())
+    assert watcher._watches == {}